@@ -1,5 +1,31 @@
 """aihero is a Python library for interacting with the aihero.studio API."""
 
-from .client import Client
+from importlib import import_module
+from typing import TYPE_CHECKING, Any, List
+
+if TYPE_CHECKING:
+    from .client import Client
 
 __all__ = ["Client"]
+
+# Public names and the submodule defining them. They are imported on first
+# access (PEP 562) so that `import aihero` does not pay for httpx, pydantic
+# and the schema models until they are used.
+_LAZY_ATTRIBUTES = {
+    "Client": ".client",
+}
+
+
+def __getattr__(name: str) -> Any:
+    """Import public attributes on first access."""
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    """List the lazy attributes alongside the loaded ones."""
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
@@ -0,0 +1,137 @@
+"""Helpers for bulk operations: compressed JSONL files and bounded thread pools."""
+
+import bz2
+import gzip
+import json
+import lzma
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextvars import copy_context
+from pathlib import Path
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+PathLike = Union[str, Path]
+
+_OPENERS: Dict[str, Callable[..., IO[str]]] = {
+    ".gz": gzip.open,
+    ".bz2": bz2.open,
+    ".xz": lzma.open,
+}
+
+
+def open_jsonl(path: PathLike, mode: str) -> IO[str]:
+    """Open a JSONL file for text I/O, compressed according to its suffix (.gz, .bz2, .xz)."""
+    opener = _OPENERS.get(Path(path).suffix)
+    if opener is None:
+        return open(path, mode, encoding="utf-8")
+    return opener(path, mode + "t", encoding="utf-8")
+
+
+def read_jsonl(source: Union[PathLike, IO[str]]) -> Iterator[Dict[str, Any]]:
+    """Yield one object per non-empty line of a JSONL file or stream."""
+    if isinstance(source, (str, Path)):
+        with open_jsonl(source, "r") as f:
+            yield from read_jsonl(f)
+        return
+    for line in source:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def bounded_map(
+    fn: Callable[[T], R], items: Iterable[T], max_workers: int
+) -> Iterator[Tuple[T, "Future[R]"]]:
+    """Run fn over items on a thread pool, yielding (item, future) as they complete.
+
+    At most ``2 * max_workers`` items are pulled from the iterable ahead of
+    the workers, so memory stays bounded however many items there are.
+    Exceptions are left in the futures for the caller to handle.
+    """
+    if max_workers < 1:
+        raise ValueError("max_workers should be at least 1.")
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending: Set["Future[R]"] = set()
+        submitted: Dict["Future[R]", T] = {}
+        for item in items:
+            # Copy the context so the current Deadline applies in the workers
+            future = pool.submit(copy_context().run, fn, item)
+            submitted[future] = item
+            pending.add(future)
+            if len(pending) >= 2 * max_workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield submitted.pop(future), future
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield submitted.pop(future), future
+
+
+def prefetched(iterator: Iterator[T]) -> Iterator[T]:
+    """Iterate while computing the next item in a background thread.
+
+    Useful for paged requests: the next page is fetched while the caller
+    processes the current one.
+    """
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        future = pool.submit(copy_context().run, next, iterator, None)
+        try:
+            while True:
+                item = future.result()
+                if item is None:
+                    return
+                future = pool.submit(copy_context().run, next, iterator, None)
+                yield item
+        finally:
+            # Let an abandoned fetch finish, but do not start another one
+            future.cancel()
+
+
+class Checkpoint:
+    """Progress file that lets an interrupted export resume where it stopped.
+
+    Each line records the ids written in one batch and the size of the sink
+    once that batch was safely on disk. On resume the sink is truncated back
+    to the last recorded size, dropping any partially written batch.
+    """
+
+    def __init__(self, path: PathLike):
+        self.path = Path(path)
+        self.done: Set[str] = set()
+        self.offset = 0
+        if self.path.exists():
+            for entry in read_jsonl(self.path):
+                self.done.update(entry["ids"])
+                self.offset = entry["offset"]
+
+    @property
+    def resuming(self) -> bool:
+        """Whether a previous run left progress behind."""
+        return bool(self.done)
+
+    def commit(self, ids: List[str], offset: int) -> None:
+        """Record a batch of ids as written, with the sink size after it."""
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"ids": ids, "offset": offset}) + "\n")
+        self.done.update(ids)
+        self.offset = offset
+
+    def clear(self) -> None:
+        """Remove the checkpoint once the export completed."""
+        if self.path.exists():
+            self.path.unlink()
@@ -0,0 +1,126 @@
+"""Completion callbacks: an embedded HTTP listener that wakes up waiting launches.
+
+With a listener, ``launch_workflow`` sends a ``callback_url`` along with the
+launch request and waits for the server to POST to it when the run
+finishes, instead of polling every second. Polls still happen every
+``fallback_interval`` seconds in case a callback is lost::
+
+    with CallbackListener() as listener:
+        workflow = client.launch_workflow(project_id, workflow_id, callbacks=listener)
+
+The listener binds to 127.0.0.1 on a free port by default; for a server
+elsewhere, bind a reachable interface and pass the address the server
+should use (e.g. of a tunnel or reverse proxy) as ``public_url``. Callback
+URLs carry a random token, and a callback only triggers a fetch of the
+workflow: its body is not trusted. Each launch gets its own callback URL,
+so concurrent launches of the same workflow do not wake each other up.
+"""
+
+import itertools
+import secrets
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, NamedTuple, Optional
+
+CALLBACK_PATH = "/callbacks"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Accepts POST {CALLBACK_PATH}/<token>/<workflow_id>/<launch>."""
+
+    server: "_Server"
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        parts = self.path.split("?")[0].strip("/").split("/")
+        listener = self.server.listener
+        if (
+            len(parts) == 4
+            and "/" + parts[0] == CALLBACK_PATH
+            and secrets.compare_digest(parts[1], listener.token)
+        ):
+            listener.notify("/".join(parts[2:]))
+            self.send_response(204)
+        else:
+            self.send_response(404)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        """Keep the listener quiet."""
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Any, listener: "CallbackListener"):
+        self.listener = listener
+        super().__init__(address, _Handler)
+
+
+class Expected(NamedTuple):
+    """A launch waiting for its callback."""
+
+    # Identifies the launch in the listener, "<workflow_id>/<n>"
+    key: str
+    # To send as the callback_url of the launch
+    url: str
+    # Set when the callback arrives
+    event: threading.Event
+
+
+class CallbackListener:
+    """HTTP server in a background thread, receiving run completion callbacks."""
+
+    def __init__(
+        self, host: str = "127.0.0.1", port: int = 0, public_url: Optional[str] = None
+    ):
+        self.token = secrets.token_urlsafe(16)
+        self.received = 0
+        self._events: Dict[str, threading.Event] = {}
+        self._launches = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), self)
+        self.host, self.port = self._server.server_address[:2]
+        base = public_url or f"http://{self.host}:{self.port}"
+        self.url = f"{base.rstrip('/')}{CALLBACK_PATH}/{self.token}"
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            name="aihero-callbacks",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def expect(self, workflow_id: str) -> Expected:
+        """Register a launch of the workflow before sending it, with its callback URL."""
+        event = threading.Event()
+        with self._lock:
+            key = f"{workflow_id}/{next(self._launches)}"
+            self._events[key] = event
+        return Expected(key, f"{self.url}/{key}", event)
+
+    def discard(self, expected: Expected) -> None:
+        """Stop expecting the callback of a launch."""
+        with self._lock:
+            self._events.pop(expected.key, None)
+
+    def notify(self, key: str) -> None:
+        """Wake up the launch with this key, if it is still waiting."""
+        with self._lock:
+            self.received += 1
+            event = self._events.get(key)
+        if event is not None:
+            event.set()
+
+    def close(self) -> None:
+        """Stop the server and release its port."""
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self) -> "CallbackListener":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
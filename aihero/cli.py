@@ -0,0 +1,239 @@
+"""Command line interface for AI Hero.
+
+Only the standard library is imported at module level so that argument
+parsing and ``--help`` stay fast; httpx, pydantic and the schema module are
+loaded when a command actually talks to the server.
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+Command = Callable[[Any, str, Dict[str, Any], argparse.Namespace], Any]
+
+
+def _to_json(obj: Any) -> Any:
+    """Convert command results to JSON-able values."""
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, list):
+        return [_to_json(o) for o in obj]
+    return obj
+
+
+def _get_project(client: Any, project_id: str, item: Dict[str, Any], args: Any) -> Any:
+    """Get the project details"""
+    return client.get_project(item.get("project_id", project_id))
+
+
+def _list_workflows(
+    client: Any, project_id: str, item: Dict[str, Any], args: Any
+) -> Any:
+    """List the workflows of the project"""
+    return client.list_workflows(item.get("project_id", project_id))
+
+
+def _get_workflow(client: Any, project_id: str, item: Dict[str, Any], args: Any) -> Any:
+    """Get a workflow"""
+    return client.get_workflow(item.get("project_id", project_id), item["workflow_id"])
+
+
+def _create_workflow(
+    client: Any, project_id: str, item: Dict[str, Any], args: Any
+) -> Any:
+    """Create a workflow from its JSON definition"""
+    from .schema import Step
+
+    return client.create_workflow(
+        item.get("project_id", project_id),
+        name=item["name"],
+        description=item.get("description", ""),
+        steps=[Step.from_dict(step) for step in item.get("steps", [])],
+    )
+
+
+def _launch_workflow(
+    client: Any, project_id: str, item: Dict[str, Any], args: Any
+) -> Any:
+    """Launch a workflow and wait for it to finish"""
+    return client.launch_workflow(
+        item.get("project_id", project_id),
+        item["workflow_id"],
+        verbose=args.verbose,
+        timeout=int(item.get("timeout", args.timeout)),
+        poll_interval=float(item.get("poll_interval", args.poll_interval)),
+    )
+
+
+def _upload_file(client: Any, project_id: str, item: Dict[str, Any], args: Any) -> Any:
+    """Upload a file"""
+    file = Path(item["path"])
+    client.upload_file(item.get("project_id", project_id), file)
+    return {"path": str(file), "filename": file.name}
+
+
+def _export_workflows(
+    client: Any, project_id: str, item: Dict[str, Any], args: Any
+) -> Any:
+    """Export all workflows to a JSONL file"""
+    written = client.export_workflows(
+        item.get("project_id", project_id), item["path"], max_workers=args.parallel
+    )
+    return {"path": item["path"], "exported": written}
+
+
+def _import_workflows(
+    client: Any, project_id: str, item: Dict[str, Any], args: Any
+) -> Any:
+    """Create the workflows of a JSONL export"""
+    return client.import_workflows(
+        item.get("project_id", project_id), item["path"], max_workers=args.parallel
+    )
+
+
+COMMANDS: Dict[str, Command] = {
+    "project": _get_project,
+    "list": _list_workflows,
+    "get": _get_workflow,
+    "create": _create_workflow,
+    "launch": _launch_workflow,
+    "upload": _upload_file,
+    "export": _export_workflows,
+    "import": _import_workflows,
+}
+
+
+def _run_bulk(
+    fn: Callable[[Dict[str, Any]], Any],
+    items: Iterable[Dict[str, Any]],
+    parallel: int,
+) -> Iterator[Dict[str, Any]]:
+    """Run fn over items with bounded parallelism, yielding results as they finish."""
+    from .bulk import bounded_map
+
+    indexed = ((index, item) for index, item in enumerate(items))
+    for (index, item), future in bounded_map(lambda i: fn(i[1]), indexed, parallel):
+        try:
+            yield {"index": index, "ok": True, "result": _to_json(future.result())}
+        except Exception as exc:  # pylint: disable=broad-except
+            yield {"index": index, "ok": False, "error": str(exc), "input": item}
+
+
+def _single_item(args: argparse.Namespace) -> Dict[str, Any]:
+    """Build the command input from positional arguments."""
+    if args.command in ("get", "launch"):
+        if not args.target:
+            raise SystemExit(f"aihero {args.command}: please provide a workflow_id")
+        return {"workflow_id": args.target}
+    if args.command in ("upload", "export", "import"):
+        if not args.target:
+            raise SystemExit(f"aihero {args.command}: please provide a file path")
+        return {"path": args.target}
+    if args.command == "create":
+        if not args.target or args.target == "-":
+            return json.load(sys.stdin)
+        with open(args.target, encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def _parser() -> argparse.ArgumentParser:
+    """Build the argument parser."""
+    parser = argparse.ArgumentParser(
+        prog="aihero",
+        description="AI Hero command line interface. Results are printed as JSON lines.",
+    )
+    parser.add_argument(
+        "command",
+        choices=sorted(COMMANDS),
+        help="project, list, get WORKFLOW_ID, create FILE|-, launch WORKFLOW_ID, "
+        "upload PATH, export PATH, import PATH",
+    )
+    parser.add_argument(
+        "target",
+        nargs="?",
+        help="workflow_id, JSON file or file path, depending on the command",
+    )
+    parser.add_argument(
+        "--api-key",
+        default=None,
+        help="API key (defaults to $AI_HERO_API_KEY)",
+    )
+    parser.add_argument(
+        "--project-id",
+        default=None,
+        help="Project ID (defaults to $AI_HERO_PROJECT_ID)",
+    )
+    parser.add_argument(
+        "--bulk",
+        action="store_true",
+        help='Read one JSON input per line from stdin, e.g. {"workflow_id": ...}',
+    )
+    parser.add_argument(
+        "-p",
+        "--parallel",
+        type=int,
+        default=4,
+        help="Number of concurrent requests in --bulk mode, export and import",
+    )
+    parser.add_argument(
+        "--timeout", type=int, default=60, help="launch: seconds to wait for the run"
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=1.0,
+        help="launch: seconds between status polls",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Entry point of the aihero console script."""
+    args = _parser().parse_args(argv)
+    if args.parallel < 1:
+        raise SystemExit("aihero: --parallel should be at least 1")
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    api_key = args.api_key or os.environ.get("AI_HERO_API_KEY")
+    project_id = args.project_id or os.environ.get("AI_HERO_PROJECT_ID")
+    if not api_key:
+        raise SystemExit("aihero: please provide --api-key or AI_HERO_API_KEY")
+    if not project_id:
+        raise SystemExit("aihero: please provide --project-id or AI_HERO_PROJECT_ID")
+
+    from .client import Client
+
+    client = Client(api_key=api_key)
+    command = COMMANDS[args.command]
+
+    def run(item: Dict[str, Any]) -> Any:
+        return command(client, project_id, item, args)
+
+    if not args.bulk:
+        result = _to_json(run(_single_item(args)))
+        if args.command == "list":
+            for workflow in result:
+                print(json.dumps(workflow))
+        else:
+            print(json.dumps(result))
+        return 0
+
+    failures = 0
+    from .bulk import read_jsonl
+
+    for line in _run_bulk(run, read_jsonl(sys.stdin), args.parallel):
+        failures += not line["ok"]
+        sys.stdout.write(json.dumps(line) + "\n")
+        sys.stdout.flush()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,53 +1,317 @@
 """Client for AI Hero API"""
 
+from __future__ import annotations
+
 from warnings import warn
+import asyncio
 import os
+import pickle
+import threading
 import httpx
-from typing import Optional, List, Dict
-from .exceptions import AIHeroException
-import validators
+import json
+from typing import (
+    IO,
+    AsyncIterator,
+    Iterable,
+    Iterator,
+    Optional,
+    List,
+    Dict,
+    Tuple,
+    TYPE_CHECKING,
+    Union,
+)
+from urllib.parse import urlencode
+from .compression import accept_encoding, check_encoding, compress
+from .deadline import Deadline, current_deadline, sleep, wait
+from .exceptions import AIHeroException, DeadlineExceeded, PreflightError
 import traceback
-from .schema import Project, Workflow, Step
-import time
 from pathlib import Path
 from typing import Any
+from http.cookiejar import Cookie, CookieJar
+from weakref import WeakSet
+
+if TYPE_CHECKING:
+    # The schema module builds the pydantic models at import time; it is
+    # imported on first use so that creating a Client stays cheap.
+    from .schema import Project, Workflow, Step
+    from .diff import WorkflowChanges
+    from .stream import StepEvent
+    from .template import RenderedWorkflow, WorkflowTemplate
+    from .content_store import ContentStore
+    from .history import RunHistory
+    from .callbacks import CallbackListener, Expected
+    from .preflight import Preflight
+    from .endpoints import EndpointPool
+
+if os.environ.get("AI_HERO_PROFILE"):
+    from .profiling import start_from_env
+
+    start_from_env()
 
 PRODUCTION_URL = "https://app.aihero.studio/"
 STAGING_URL = "https://staging.aihero.studio/"
 
+# Live connection pools, dropped in forked children
+_pools: "WeakSet[_Pool]" = WeakSet()
+
+
+def _after_fork_in_child() -> None:
+    """Reset the connection pools inherited from the parent process"""
+    for pool in list(_pools):
+        pool.reset_after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+class _NoCookies(CookieJar):
+    """Cookie jar keeping nothing, so that no state leaks between credentials"""
+
+    def set_cookie(self, cookie: Cookie) -> None:
+        pass
+
+    def extract_cookies(self, response: Any, request: Any) -> None:
+        pass
+
+
+class _Pool:
+    """HTTP connection pool of the current process, shared by a client and its views"""
+
+    def __init__(
+        self,
+        base_url: str,
+        transport: Optional[httpx.BaseTransport],
+        endpoints: Optional[EndpointPool] = None,
+    ):
+        self.base_url = base_url
+        # Optional httpx transport, e.g. aihero.transport.ReplayTransport
+        self.custom_transport = transport
+        self.transport = transport or Client._transport_from_env()
+        # Optional server URLs to choose from, probed through this pool
+        self.endpoints = endpoints
+        if endpoints is not None:
+            endpoints.bind(self.client)
+        self.http: Optional[httpx.Client] = None
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        _pools.add(self)
+
+    def reset_after_fork(self) -> None:
+        """Forget the connections inherited from the parent process"""
+        # Not closed: its sockets are still in use by the parent
+        self.http = None
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        if self.custom_transport is None:
+            self.transport = Client._transport_from_env()
+            return
+        # Rebuilt from its configuration, like a pickled client, since it may
+        # hold pooled connections or open files of the parent
+        try:
+            transport = pickle.loads(pickle.dumps(self.custom_transport))
+        except (TypeError, AttributeError, pickle.PicklingError):
+            warn(
+                f"Cannot rebuild the {type(self.custom_transport).__name__} of a "
+                "Client after a fork: the child shares it with the parent process. "
+                "Create the client in the child instead, or use a transport that "
+                "can be pickled (e.g. aihero.transport.RecordingTransport).",
+                RuntimeWarning,
+            )
+            return
+        self.custom_transport = self.transport = transport
+
+    def client(self) -> httpx.Client:
+        """Pooled HTTP client, created on first use"""
+        if self.pid != os.getpid():
+            # Forked without os.register_at_fork, e.g. by a C extension
+            self.reset_after_fork()
+        http = self.http
+        if http is None:
+            with self.lock:
+                if self.http is None:
+                    # Credentials are sent with each request, never stored here
+                    self.http = httpx.Client(
+                        base_url=self.base_url,
+                        transport=self.transport,
+                        cookies=_NoCookies(),
+                    )
+                http = self.http
+        return http
+
+    def close(self) -> None:
+        """Close the pooled connections"""
+        if self.endpoints is not None:
+            self.endpoints.close()
+        with self.lock:
+            http, self.http = self.http, None
+        if http is not None:
+            http.close()
+
 
 class Client:
-    """Abstraction for http operations"""
+    """Abstraction for http operations
 
-    _base_url: Optional[str] = None
-    _authorization: Optional[str] = None
+    A client can be shared by threads: requests go through one HTTP
+    connection pool per process. After a fork the child builds its own pool
+    instead of using connections inherited from the parent, and pickling a
+    client only carries its configuration, so it can be sent to process pools.
+    ``client.with_credentials(api_key)`` returns a client for another API key
+    sharing the same pool.
 
-    def __init__(self, api_key: str):
-        server_url = os.environ.get("AI_HERO_SERVER_URL", PRODUCTION_URL)
+    ``endpoints`` (server URLs or an aihero.endpoints.EndpointPool, by
+    default the comma-separated AI_HERO_ENDPOINTS) sends the requests to
+    the fastest healthy one of several gateways or proxies instead of
+    AI_HERO_SERVER_URL.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        transport: Optional[httpx.BaseTransport] = None,
+        content_store: Optional[ContentStore] = None,
+        compression: Optional[str] = None,
+        compression_threshold: int = 1024,
+        endpoints: Optional[Union[EndpointPool, List[str]]] = None,
+    ):
         assert api_key, "Please provide an api_key"
         assert isinstance(api_key, str), "api_key should be a string."
-        assert server_url, "Please provide a server_url"
-        assert server_url in [
-            STAGING_URL,
-            PRODUCTION_URL,
-        ], f"Server URL should be {PRODUCTION_URL}"
-        self._api_key = api_key
+        check_encoding(compression)
+        if endpoints is None and os.environ.get("AI_HERO_ENDPOINTS"):
+            endpoints = os.environ["AI_HERO_ENDPOINTS"].split(",")
+        if endpoints is not None:
+            from .endpoints import EndpointPool
+
+            if not isinstance(endpoints, EndpointPool):
+                endpoints = EndpointPool(
+                    url.strip() for url in endpoints if url.strip()
+                )
+            base_url = endpoints.endpoints[0].base_url
+        else:
+            server_url = os.environ.get("AI_HERO_SERVER_URL", PRODUCTION_URL)
+            assert server_url, "Please provide a server_url"
+            assert server_url in [
+                STAGING_URL,
+                PRODUCTION_URL,
+            ], f"Server URL should be {PRODUCTION_URL}"
+            if server_url != PRODUCTION_URL:
+                warn(f"Connecting to {server_url}")
+            if server_url.endswith("/"):
+                server_url = server_url[:-1]
+            base_url = f"{server_url}/api/v1"
+        self._configure(
+            api_key,
+            base_url,
+            transport=transport,
+            content_store=content_store,
+            compression=compression,
+            compression_threshold=compression_threshold,
+            endpoints=endpoints,
+        )
 
-        # Assign to self
+    def _configure(
+        self,
+        api_key: str,
+        base_url: str,
+        transport: Optional[httpx.BaseTransport] = None,
+        content_store: Optional[ContentStore] = None,
+        compression: Optional[str] = None,
+        compression_threshold: int = 1024,
+        endpoints: Optional[EndpointPool] = None,
+    ) -> None:
+        """Set the configuration and per-process state"""
+        self._api_key = api_key
+        # Optional disk-backed store for large texts of the responses
+        self._content_store = content_store
+        # Encoding of JSON request bodies of at least compression_threshold bytes
+        self._compression = compression
+        self._compression_threshold = compression_threshold
         self._authorization = f"Bearer {self._api_key}"
-        self._base_url = server_url
+        self._base_url = base_url
+        self._pool = _Pool(base_url, transport, endpoints)
+        # Names of the files uploaded by this client, by project
+        self._uploaded: Dict[str, set[str]] = {}
+
+    def with_credentials(self, api_key: str) -> Client:
+        """Client for another API key, sharing the connection pool and settings.
+
+        Views are cheap to create, e.g. one per tenant of a gateway. Each one
+        sends its own Authorization header, no cookies are kept, and closing
+        any of them closes the shared pool.
+        """
+        assert api_key, "Please provide an api_key"
+        assert isinstance(api_key, str), "api_key should be a string."
+        # Not copy(): that would go through __getstate__ and build a new pool
+        view = object.__new__(Client)
+        view.__dict__.update(self.__dict__)
+        view._api_key = api_key
+        view._authorization = f"Bearer {api_key}"
+        view._uploaded = {}
+        return view
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """Pickle the configuration only; connections are not shareable"""
+        transport = self._pool.custom_transport
+        if transport is not None:
+            try:
+                pickle.dumps(transport)
+            except (TypeError, AttributeError, pickle.PicklingError) as exc:
+                raise TypeError(
+                    f"Cannot pickle a Client using a {type(transport).__name__}, "
+                    "which cannot be pickled. Create the client in the other "
+                    "process instead, or use a transport that can be pickled "
+                    "(e.g. aihero.transport.RecordingTransport or ReplayTransport)."
+                ) from exc
+        return {
+            "api_key": self._api_key,
+            "base_url": self._base_url,
+            "transport": transport,
+            "content_store": self._content_store,
+            "compression": self._compression,
+            "compression_threshold": self._compression_threshold,
+            "endpoints": self._pool.endpoints,
+        }
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self._configure(**state)
+
+    def _http_client(self) -> httpx.Client:
+        """Pooled HTTP client of the current process"""
+        return self._pool.client()
 
-        if server_url != PRODUCTION_URL:
-            warn(f"Connecting to {self._base_url}")
-        if self._base_url.endswith("/"):
-            self._base_url = self._base_url[:-1]
-        self._base_url = f"{self._base_url}/api/v1"
+    def close(self) -> None:
+        """Close the pooled connections, shared with the views of this client"""
+        self._pool.close()
+
+    def __enter__(self) -> Client:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    @staticmethod
+    def _transport_from_env() -> Optional[httpx.BaseTransport]:
+        """Record or replay traffic when AI_HERO_RECORD / AI_HERO_REPLAY are set"""
+        if os.environ.get("AI_HERO_REPLAY"):
+            from .transport import ReplayTransport
+
+            return ReplayTransport(
+                os.environ["AI_HERO_REPLAY"],
+                time_scale=float(os.environ.get("AI_HERO_REPLAY_TIME_SCALE", "0")),
+            )
+        if os.environ.get("AI_HERO_RECORD"):
+            from .transport import RecordingTransport
+
+            return RecordingTransport(os.environ["AI_HERO_RECORD"])
+        return None
 
     def _get_headers(self) -> Any:
         """Get headers for http requests"""
         headers = {
             "Content-Type": "application/json",
             "Authorization": self._authorization,
+            "Accept-Encoding": accept_encoding(),
         }
         return headers
 
@@ -84,9 +348,77 @@ class Client:
             raise ValueError("timeout should be an int.")
         if not path.startswith("/"):
             raise ValueError("path should start with '/'")
-        if not validators.url(f"{self._base_url}{path}"):
+        import validators
+
+        if self._pool.endpoints is not None:
+            # The endpoint URLs were checked by the pool; only the path varies
+            url = f"http://localhost{path}"
+        else:
+            url = f"{self._base_url}{path}"
+        if not validators.url(url, simple_host=True):
             raise ValueError(f"Invalid path '{path}'")
 
+    def __request(
+        self,
+        method: str,
+        path: str,
+        timeout: Union[float, httpx.Timeout],
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """Send one HTTP request to the AI Hero server"""
+        headers = self._get_headers()
+        headers.update(kwargs.pop("headers", None) or {})
+        endpoints = self._pool.endpoints
+        if endpoints is not None:
+            return endpoints.request(
+                self._http_client(),
+                method,
+                path,
+                headers=headers,
+                timeout=timeout,
+                **kwargs,
+            )
+        return self._http_client().request(
+            method, path, headers=headers, timeout=timeout, **kwargs
+        )
+
+    def __decode(self, response: httpx.Response) -> Any:
+        """Parse a JSON response, moving large texts to the content store if any"""
+        if self._content_store is None:
+            return response.json()
+        return self._content_store.loads(response.content)
+
+    def __send(
+        self, method: str, path: str, timeout: float, **kwargs: Any
+    ) -> httpx.Response:
+        """Send a request within the current Deadline, if any.
+
+        The request timeout is capped by the remaining budget, and the call
+        returns as soon as the deadline is cancelled.
+        """
+        deadline = current_deadline()
+        if deadline is None:
+            return self.__request(method, path, timeout, **kwargs)
+        deadline.check()
+        return deadline.run(
+            self.__request_within, deadline, method, path, timeout, **kwargs
+        )
+
+    def __request_within(
+        self, deadline: Deadline, method: str, path: str, timeout: float, **kwargs: Any
+    ) -> httpx.Response:
+        """Send one request from a Deadline worker thread.
+
+        The budget is checked when the worker starts, so a request the caller
+        stopped waiting for while it was queued is never sent, and the
+        connect, write, read and pool timeouts are all capped by what is
+        left, which bounds a request that is abandoned once sent.
+        """
+        remaining = deadline.check()
+        if remaining is not None:
+            timeout = min(timeout, remaining)
+        return self.__request(method, path, httpx.Timeout(timeout), **kwargs)
+
     def __get(
         self,
         path: str,
@@ -101,44 +433,53 @@ class Client:
         # Validate inputs
         self.__validate_inputs(path, error_msg, network_errors, timeout)
 
-        with httpx.Client(base_url=self._base_url, timeout=timeout) as client:
-            try:
-                response = client.get(path, headers=self._get_headers())
-                response.raise_for_status()
-            except httpx.HTTPStatusError as exc:
-                traceback.print_exc()
-                msg = ""
-                if network_errors and exc.response.status_code in network_errors:
-                    raise AIHeroException(
-                        f"{error_msg}: {network_errors[exc.response.status_code]} - {exc.response.text}",
-                        status_code=exc.response.status_code,
-                    ) from exc
-                elif exc.response.status_code:
-                    raise AIHeroException(
-                        error_msg + "-" + exc.response.text,
-                        status_code=exc.response.status_code,
-                    ) from exc
-                else:
-                    msg = error_msg
-                raise AIHeroException(msg) from exc
-            return response.json()
+        response = self.__send("GET", path, timeout)
+        try:
+            response.raise_for_status()
+        except httpx.HTTPStatusError as exc:
+            traceback.print_exc()
+            msg = ""
+            if network_errors and exc.response.status_code in network_errors:
+                raise AIHeroException(
+                    f"{error_msg}: {network_errors[exc.response.status_code]} - {exc.response.text}",
+                    status_code=exc.response.status_code,
+                ) from exc
+            elif exc.response.status_code:
+                raise AIHeroException(
+                    error_msg + "-" + exc.response.text,
+                    status_code=exc.response.status_code,
+                ) from exc
+            else:
+                msg = error_msg
+            raise AIHeroException(msg) from exc
+        return self.__decode(response)
 
     def __post(
         self,
         path: str,
-        obj: dict[str, Any],
+        obj: Union[dict[str, Any], bytes],
         error_msg: str = "Error",
         network_errors: Optional[dict[int, str]] = None,
         timeout: int = 30,
+        method: str = "POST",
     ) -> Any:
-        """Post request to AI Hero server"""
+        """Post (or patch) request to AI Hero server, with obj either a dict or serialized JSON"""
         if not network_errors:
             network_errors = {}
         # Validate inputs
         self.__validate_inputs(path, error_msg, network_errors, timeout)
 
-        with httpx.Client(base_url=self._base_url, timeout=timeout) as client:
-            response = client.post(path, json=obj, headers=self._get_headers())
+        if isinstance(obj, bytes):
+            content = obj
+        else:
+            content = json.dumps(
+                obj, ensure_ascii=False, separators=(",", ":"), allow_nan=False
+            ).encode("utf-8")
+        headers = {}
+        if self._compression and len(content) >= self._compression_threshold:
+            content = compress(content, self._compression)
+            headers["Content-Encoding"] = self._compression
+        response = self.__send(method, path, timeout, content=content, headers=headers)
         try:
             response.raise_for_status()
         except httpx.HTTPStatusError as exc:
@@ -156,7 +497,7 @@ class Client:
             else:
                 msg = error_msg
             raise AIHeroException(msg) from exc
-        return response.json()
+        return self.__decode(response)
 
     def __put_bytes(
         self,
@@ -173,8 +514,7 @@ class Client:
         self.__validate_inputs(path, error_msg, network_errors, timeout)
 
         # HTTP request
-        with httpx.Client(base_url=self._base_url, timeout=timeout) as client:
-            response = client.put(path, data=content, headers=self._get_headers())
+        response = self.__send("PUT", path, timeout, content=content)
 
         # Response handling
         try:
@@ -186,6 +526,8 @@ class Client:
 
     def get_project(self, project_id: str) -> Project:
         """Get project details"""
+        from .schema import Project
+
         obj = self.__get(
             f"/projects/{project_id}",
             error_msg=f"Could fetch project details for project {project_id}",
@@ -200,16 +542,137 @@ class Client:
 
     def list_workflows(self, project_id: str) -> list[Workflow]:
         """List all workflows in the project"""
+        from .schema import Workflow
+
         workflows_list = self.__get(f"/projects/{project_id}/autonomous/workflows")[
             "workflows"
         ]
         return [Workflow.from_dict(workflow) for workflow in workflows_list]
 
-    def get_workflow(
-        self, project_id: str, workflow_id: str, verbose: bool = False
-    ) -> Workflow:
-        """Get project details"""
-        obj = self.__get(
+    def _iter_workflow_pages(
+        self,
+        project_id: str,
+        page_size: int = 100,
+        filters: Optional[Dict[str, str]] = None,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Yield pages of raw workflow dicts.
+
+        Pages are requested with ``limit`` and ``offset``, switching to
+        ``cursor`` once the server returns a ``next_cursor``. A server that
+        ignores paging returns everything in the first response, which is
+        then the only page.
+        """
+        params: Dict[str, Any] = dict(filters or {})
+        params["limit"] = page_size
+        first_id = None
+        while True:
+            obj = self.__get(
+                f"/projects/{project_id}/autonomous/workflows?{urlencode(params)}",
+                error_msg=f"Could not list workflows for project {project_id}",
+            )
+            page = obj["workflows"]
+            if not page:
+                return
+            if page[0].get("workflow_id") == first_id:
+                # Same page again: the server does not page this endpoint
+                return
+            first_id = page[0].get("workflow_id")
+            yield page
+            if "next_cursor" in obj:
+                if not obj["next_cursor"]:
+                    return
+                params.pop("offset", None)
+                params["cursor"] = obj["next_cursor"]
+                continue
+            params["offset"] = params.get("offset", 0) + len(page)
+            if "total" in obj:
+                if params["offset"] >= obj["total"]:
+                    return
+            elif len(page) != page_size:
+                return
+
+    def iter_workflows(
+        self,
+        project_id: str,
+        page_size: int = 100,
+        status: Optional[str] = None,
+        archived: Optional[bool] = None,
+        kind: Optional[str] = None,
+        prefetch: bool = True,
+    ) -> Iterator[Workflow]:
+        """Iterate over the workflows in the project, one page at a time.
+
+        Filters are sent to the server and applied again to the raw dicts
+        before validation, so workflows that do not match are never parsed.
+        With ``prefetch`` the next page is fetched in the background while
+        the caller consumes the current one.
+        """
+        from .schema import Workflow
+
+        filters: Dict[str, str] = {}
+        if status is not None:
+            filters["status"] = str(getattr(status, "value", status))
+        if archived is not None:
+            filters["archived"] = "true" if archived else "false"
+        if kind is not None:
+            filters["kind"] = str(getattr(kind, "value", kind))
+
+        def matches(obj: Dict[str, Any]) -> bool:
+            if (
+                "status" in filters
+                and obj.get("status", "success") != filters["status"]
+            ):
+                return False
+            if "kind" in filters and obj.get("kind", "simple") != filters["kind"]:
+                return False
+            if "archived" in filters and bool(obj.get("archived", False)) != archived:
+                return False
+            return True
+
+        pages = self._iter_workflow_pages(project_id, page_size, filters)
+        if prefetch:
+            from .bulk import prefetched
+
+            pages = prefetched(pages)
+        for page in pages:
+            for obj in page:
+                if matches(obj):
+                    yield Workflow.from_dict(obj)
+
+    def run_history(
+        self,
+        project_id: str,
+        history: Optional[RunHistory] = None,
+        page_size: int = 100,
+        prefetch: bool = True,
+    ) -> RunHistory:
+        """Summaries of the runs of the workflows in the project, see aihero.history.
+
+        The rows are read from the raw pages, without parsing the workflows.
+        Pass the history of a previous call to update it.
+        """
+        from .history import RunHistory
+
+        if history is None:
+            history = RunHistory()
+        pages = self._iter_workflow_pages(project_id, page_size)
+        if prefetch:
+            from .bulk import prefetched
+
+            pages = prefetched(pages)
+        for page in pages:
+            history.extend(page)
+        return history
+
+    def _list_workflow_ids(self, project_id: str) -> Iterator[str]:
+        """Iterate over the workflow ids in the project"""
+        for page in self._iter_workflow_pages(project_id):
+            for obj in page:
+                yield obj["workflow_id"]
+
+    def _get_workflow_dict(self, project_id: str, workflow_id: str) -> Dict[str, Any]:
+        """Get a workflow as the raw dict returned by the server"""
+        return self.__get(
             f"/projects/{project_id}/autonomous/workflows/{workflow_id}",
             error_msg=f"Could fetch project details for workflow {workflow_id}",
             network_errors={
@@ -218,22 +681,85 @@ class Client:
                 404: "Could not find the workflow.",
             },
         )
-        return Workflow.from_dict(obj)
 
-    def launch_workflow(
-        self,
-        project_id: str,
-        workflow_id: str,
-        verbose: bool = False,
-        timeout: int = 60,
+    def get_workflow(
+        self, project_id: str, workflow_id: str, verbose: bool = False
+    ) -> Workflow:
+        """Get project details"""
+        from .schema import Workflow
+
+        return Workflow.from_dict(self._get_workflow_dict(project_id, workflow_id))
+
+    def refresh_workflow(self, workflow: Workflow) -> Tuple[Workflow, WorkflowChanges]:
+        """Fetch the latest version of a workflow, parsing only the steps that changed.
+
+        Steps whose step_id and computed_at (or content digest) match the
+        given workflow are reused as-is. Returns the new workflow and the
+        change set.
+        """
+        from .diff import merge_workflow
+
+        data = self._get_workflow_dict(workflow.project_id, workflow.workflow_id)
+        return merge_workflow(workflow, data)
+
+    def update_workflow(
+        self, workflow: Workflow, check_version: bool = True
     ) -> Workflow:
-        """Launch the workflow"""
-        tic = time.perf_counter()
-        workflow = self.get_workflow(project_id, workflow_id)
+        """Save local changes to a fetched workflow, sending only what changed.
+
+        The changes since the workflow was fetched are sent as JSON Patch
+        operations. With ``check_version`` the server refuses the update
+        (409) if the workflow was modified in the meantime. Returns the
+        updated workflow, reusing the unchanged steps.
+        """
+        from .diff import merge_workflow, workflow_patch
+
+        operations = workflow_patch(workflow)
+        if not operations:
+            return workflow
+        body: Dict[str, Any] = {"operations": operations}
+        if check_version:
+            body["version"] = (workflow._source or {}).get("version")
+        data = self.__post(
+            f"/projects/{workflow.project_id}/autonomous/workflows/{workflow.workflow_id}",
+            obj=body,
+            method="PATCH",
+            error_msg=f"Could not update workflow {workflow.workflow_id}",
+            network_errors={
+                400: "Could not apply the changes. ",
+                403: "Could not update. Please check the API key.",
+                404: "Could not find the workflow.",
+                409: "The workflow was modified since it was fetched. ",
+            },
+        )
+        updated, _ = merge_workflow(workflow, data)
+        return updated
+
+    @staticmethod
+    def __wait(seconds: float, event: Optional[threading.Event] = None) -> None:
+        """Wait between polls (or for an event), raising DeadlineExceeded once out of time"""
+        try:
+            if event is None:
+                sleep(seconds)
+            else:
+                wait(event, seconds)
+        except DeadlineExceeded as exc:
+            raise DeadlineExceeded(
+                "Timeout while waiting for the workflow to complete."
+            ) from exc
+
+    def _launch(
+        self, project_id: str, workflow: Workflow, callback_url: Optional[str] = None
+    ) -> None:
+        """Start a run of the workflow from its first step"""
+        workflow_id = workflow.workflow_id
         first_step = workflow.steps[0]
+        obj: Dict[str, Any] = {"step_id": first_step.step_id}
+        if callback_url is not None:
+            obj["callback_url"] = callback_url
         self.__post(
             f"/projects/{project_id}/autonomous/workflows/{workflow_id}/launch",
-            obj={"step_id": first_step.step_id},
+            obj=obj,
             error_msg=f"Could launch for workflow {workflow_id}",
             network_errors={
                 400: "Please check the workflow_id.",
@@ -243,34 +769,170 @@ class Client:
             },
         )
 
+    def _start_run(
+        self, project_id: str, workflow_id: str, callback_url: Optional[str] = None
+    ) -> Workflow:
+        """Fetch the workflow and launch it; returns the workflow as it was before the run"""
+        from .diff import merge_workflow
+
+        workflow, _ = merge_workflow(
+            None, self._get_workflow_dict(project_id, workflow_id)
+        )
+        self._launch(project_id, workflow, callback_url)
+        return workflow
+
+    def _wait_for_run(
+        self,
+        workflow: Workflow,
+        poll_interval: float = 1.0,
+        verbose: bool = False,
+        expected: Optional[Expected] = None,
+        fallback_interval: float = 15.0,
+    ) -> Workflow:
+        """Poll a launched workflow until its run is over, without launching it again"""
         while True:
-            workflow = self.get_workflow(project_id, workflow_id)
+            workflow, _ = self.refresh_workflow(workflow)
             if verbose:
                 print(
-                    f"\tWorkflow {workflow_id} status:\t{workflow.status} at {workflow.updated_at}"
+                    f"\tWorkflow {workflow.workflow_id} status:\t{workflow.status} at {workflow.updated_at}"
                 )
-            if workflow.status in ["running", "pending"]:
-                time.sleep(1)
+            if workflow.status not in ["running", "pending"]:
+                return workflow
+            if expected is None:
+                self.__wait(poll_interval)
             else:
-                break
-            if time.perf_counter() - tic > timeout:
-                raise TimeoutError(
-                    "Timeout while waiting for the workflow to complete."
+                self.__wait(fallback_interval, expected.event)
+                expected.event.clear()
+
+    def launch_workflow(
+        self,
+        project_id: str,
+        workflow_id: str,
+        verbose: bool = False,
+        timeout: int = 60,
+        poll_interval: float = 1.0,
+        callbacks: Optional[CallbackListener] = None,
+        fallback_interval: float = 15.0,
+    ) -> Workflow:
+        """Launch the workflow and wait for it to finish.
+
+        With ``callbacks`` (see aihero.callbacks) the server is asked to call
+        back when the run finishes, and the workflow is only polled once
+        notified or every ``fallback_interval`` seconds.
+        """
+        expected = callbacks.expect(workflow_id) if callbacks is not None else None
+        # The timeout bounds the whole launch, requests included
+        try:
+            with Deadline(timeout):
+                workflow = self._start_run(
+                    project_id,
+                    workflow_id,
+                    expected.url if expected is not None else None,
                 )
-        return workflow
+                return self._wait_for_run(
+                    workflow, poll_interval, verbose, expected, fallback_interval
+                )
+        finally:
+            if callbacks is not None and expected is not None:
+                callbacks.discard(expected)
+
+    def stream_workflow(
+        self,
+        project_id: str,
+        workflow_id: str,
+        launch: bool = True,
+        timeout: int = 60,
+        poll_interval: float = 1.0,
+    ) -> Iterator[StepEvent]:
+        """Launch the workflow and yield step events as the run progresses.
+
+        Successive polls are diffed into STARTED, PARTIAL and COMPLETED events
+        per step; the last event is FINISHED, carrying the final workflow.
+        With ``launch=False`` an already running workflow is followed.
+        """
+        from .diff import merge_workflow
+        from .stream import EventKind, StepDiffer, StepEvent
+
+        # Generators run piecemeal, so the deadline is entered around each
+        # step of the run rather than held across yields.
+        deadline = Deadline(timeout)
+        with deadline:
+            workflow, _ = merge_workflow(
+                None, self._get_workflow_dict(project_id, workflow_id)
+            )
+            differ = StepDiffer(workflow)
+            if launch:
+                self._launch(project_id, workflow)
+
+        while True:
+            with deadline:
+                workflow, _ = self.refresh_workflow(workflow)
+            yield from differ.update(workflow)
+            if workflow.status not in ["running", "pending"]:
+                yield StepEvent(EventKind.FINISHED, workflow)
+                return
+            with deadline:
+                self.__wait(poll_interval)
+
+    async def astream_workflow(
+        self,
+        project_id: str,
+        workflow_id: str,
+        launch: bool = True,
+        timeout: int = 60,
+        poll_interval: float = 1.0,
+    ) -> AsyncIterator[StepEvent]:
+        """Async iterator form of stream_workflow.
+
+        Requests and sleeps between polls run in a worker thread, so the
+        event loop stays free while waiting.
+        """
+        events = self.stream_workflow(
+            project_id, workflow_id, launch, timeout, poll_interval
+        )
+        while True:
+            event = await asyncio.to_thread(next, events, None)
+            if event is None:
+                return
+            yield event
 
     def create_workflow(
-        self, project_id: str, name: str, description: str, steps: List[Step]
+        self,
+        project_id: str,
+        name: str,
+        description: str,
+        steps: List[Step],
+        kind: str = "simple",
+        preflight: Optional[Preflight] = None,
     ) -> Workflow:
-        """Save the workflow"""
-        obj = self.__post(
-            f"/projects/{project_id}/autonomous/workflows",
-            obj={
+        """Save the workflow.
+
+        With ``preflight`` (see Client.preflight) the steps are checked first,
+        and PreflightError is raised without sending the request if they fail.
+        """
+        if preflight is not None:
+            issues = preflight.check(steps)
+            if issues:
+                raise PreflightError(issues)
+        return self._post_workflow(
+            project_id,
+            {
                 "name": name,
-                "kind": "simple",
+                "kind": kind,
                 "description": description,
                 "steps": [step.model_dump() for step in steps],
             },
+        )
+
+    def _post_workflow(
+        self, project_id: str, body: Union[Dict[str, Any], bytes]
+    ) -> Workflow:
+        """Create a workflow from its definition"""
+        from .schema import Workflow
+
+        obj = self.__post(
+            f"/projects/{project_id}/autonomous/workflows",
+            obj=body,
             error_msg="Could not create a workflow",
             network_errors={
                 400: "Could not create the workflow. ",
@@ -280,6 +942,56 @@ class Client:
         )
         return Workflow.from_dict(obj)
 
+    def create_workflows(
+        self,
+        project_id: str,
+        template: WorkflowTemplate,
+        param_sets: Iterable[Dict[str, Any]],
+        max_workers: int = 8,
+        skip_existing: bool = True,
+    ) -> List[Workflow]:
+        """Create one workflow per parameter set from a template.
+
+        Workflows are created concurrently by ``max_workers`` threads.
+        Parameter sets rendering the same workflow are created once, and
+        with ``skip_existing`` the project is first scanned for workflows
+        with the same content, which are returned instead of being created
+        again. Returns the workflows in the order of the parameter sets.
+        """
+        from .bulk import bounded_map
+        from .schema import Workflow
+
+        rendered = [template.render(params) for params in param_sets]
+        existing: Dict[str, Dict[str, Any]] = {}
+        if skip_existing:
+            names = {item.name for item in rendered}
+            filters = {"kind": template.kind, "archived": "false"}
+            for page in self._iter_workflow_pages(project_id, filters=filters):
+                for obj in page:
+                    # Only workflows named like a rendered one are fingerprinted
+                    if obj.get("name") not in names or obj.get("archived"):
+                        continue
+                    fingerprint = template.fingerprint_of(obj)
+                    if fingerprint is not None:
+                        existing.setdefault(fingerprint, obj)
+
+        todo: Dict[str, RenderedWorkflow] = {}
+        for item in rendered:
+            if item.fingerprint not in existing:
+                todo.setdefault(item.fingerprint, item)
+
+        workflows: Dict[str, Workflow] = {
+            fingerprint: Workflow.from_dict(obj)
+            for fingerprint, obj in existing.items()
+        }
+        for item, future in bounded_map(
+            lambda item: self._post_workflow(project_id, item.body),
+            todo.values(),
+            max_workers,
+        ):
+            workflows[item.fingerprint] = future.result()
+        return [workflows[item.fingerprint] for item in rendered]
+
     def upload_file(self, project_id: str, file: Path) -> None:
         """Upload a file to the project"""
         # Read the file content
@@ -296,3 +1008,129 @@ class Client:
                 404: "Could not upload the file.",
             },
         )
+        self._uploaded.setdefault(project_id, set()).add(file.name)
+
+    def preflight(
+        self, project_id: str, uploaded: Optional[Iterable[str]] = None
+    ) -> Preflight:
+        """Local checker of steps for the project, see aihero.preflight.
+
+        Files steps are checked against the files uploaded by this client and
+        the names in ``uploaded`` (e.g. of files uploaded by other processes).
+        Without either, this client knows nothing of the project's files and
+        Files steps are not checked against a manifest.
+        """
+        from .preflight import Preflight
+
+        recorded = self._uploaded.get(project_id)
+        if recorded is None and uploaded is None:
+            return Preflight()
+        return Preflight((recorded or set()) | set(uploaded or ()))
+
+    def export_workflows(
+        self,
+        project_id: str,
+        sink: Union[str, Path, IO[str]],
+        max_workers: int = 8,
+        batch_size: int = 100,
+        checkpoint: Optional[Union[str, Path]] = None,
+    ) -> int:
+        """Export all workflows in the project to JSONL, one workflow per line.
+
+        Workflows are fetched concurrently by ``max_workers`` threads and
+        written as the server returned them, compressed if the sink path ends
+        with .gz, .bz2 or .xz. Writing to a path keeps a checkpoint file
+        (``<sink>.checkpoint`` by default) after every ``batch_size``
+        workflows, so an interrupted export resumes where it stopped when
+        called again. Returns the number of workflows written by this call.
+        """
+        from .bulk import Checkpoint, bounded_map, open_jsonl
+
+        ckpt = None
+        if isinstance(sink, (str, Path)):
+            ckpt = Checkpoint(checkpoint or f"{sink}.checkpoint")
+            offset = ckpt.offset if ckpt.resuming else 0
+            with open(sink, "ab") as f:
+                if f.tell() < offset:
+                    raise ValueError(
+                        f"{sink} is shorter than its checkpoint {ckpt.path}"
+                    )
+                # Drop whatever was written after the last checkpointed batch
+                f.truncate(offset)
+
+        workflow_ids = self._list_workflow_ids(project_id)
+        if ckpt is not None:
+            workflow_ids = (w for w in workflow_ids if w not in ckpt.done)
+
+        written = 0
+        batch: List[str] = []
+        batch_ids: List[str] = []
+
+        def flush() -> None:
+            if not batch:
+                return
+            if ckpt is None:
+                sink.write("".join(batch))  # type: ignore[union-attr]
+            else:
+                with open_jsonl(sink, "a") as f:  # type: ignore[arg-type]
+                    f.write("".join(batch))
+                ckpt.commit(batch_ids, os.path.getsize(sink))  # type: ignore[arg-type]
+            batch.clear()
+            batch_ids.clear()
+
+        try:
+            for workflow_id, future in bounded_map(
+                lambda w: self._get_workflow_dict(project_id, w),
+                workflow_ids,
+                max_workers,
+            ):
+                # default=str writes the texts held in a content store
+                batch.append(json.dumps(future.result(), default=str) + "\n")
+                batch_ids.append(workflow_id)
+                written += 1
+                if len(batch) >= batch_size:
+                    flush()
+        finally:
+            flush()
+        if ckpt is not None:
+            ckpt.clear()
+        return written
+
+    def import_workflows(
+        self,
+        project_id: str,
+        source: Union[str, Path, IO[str]],
+        max_workers: int = 8,
+    ) -> Dict[str, str]:
+        """Create the workflows of a JSONL export in the project.
+
+        Lines are streamed from the source (compressed by suffix like
+        export_workflows) and created concurrently by ``max_workers`` threads;
+        workflows repeated in the export are created once. Returns a mapping
+        from exported workflow_id to the workflow_id of the new workflow.
+        """
+        from .bulk import bounded_map, read_jsonl
+        from .schema import Step
+
+        seen = set()
+
+        def unique() -> Any:
+            for obj in read_jsonl(source):
+                if obj.get("workflow_id") in seen:
+                    continue
+                seen.add(obj.get("workflow_id"))
+                yield obj
+
+        def create(obj: Dict[str, Any]) -> Workflow:
+            return self.create_workflow(
+                project_id,
+                name=obj["name"],
+                description=obj.get("description", ""),
+                steps=[Step.from_dict(step) for step in obj.get("steps", [])],
+                kind=obj.get("kind", "simple"),
+            )
+
+        created: Dict[str, str] = {}
+        for obj, future in bounded_map(create, unique(), max_workers):
+            created[obj.get("workflow_id", "")] = future.result().workflow_id
+        return created
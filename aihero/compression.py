@@ -0,0 +1,65 @@
+"""Compression of request bodies and negotiation of response encodings.
+
+gzip is always available; zstd needs the zstandard package
+(``pip install aihero[zstd]``), which httpx then also uses to decode zstd
+responses.
+"""
+
+import gzip
+import importlib.util
+from functools import lru_cache
+from typing import Optional
+
+ENCODINGS = ("gzip", "zstd")
+
+
+def _has(module: str) -> bool:
+    """Whether a module can be imported, without importing it."""
+    return importlib.util.find_spec(module) is not None
+
+
+@lru_cache(maxsize=None)
+def accept_encoding() -> str:
+    """Accept-Encoding header listing the encodings httpx can decode here, best first."""
+    encodings = []
+    if _has("zstandard"):
+        encodings.append("zstd")
+    if _has("brotli") or _has("brotlicffi"):
+        encodings.append("br")
+    encodings.extend(["gzip", "deflate"])
+    return ", ".join(encodings)
+
+
+def check_encoding(encoding: Optional[str]) -> None:
+    """Raise ValueError for an unknown or unavailable request encoding."""
+    if encoding is None:
+        return
+    if encoding not in ENCODINGS:
+        raise ValueError(f"compression should be one of {ENCODINGS} or None.")
+    if encoding == "zstd" and not _has("zstandard"):
+        raise ValueError(
+            "zstd compression needs the zstandard package: pip install aihero[zstd]"
+        )
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """Compress a request body."""
+    if encoding == "zstd":
+        import zstandard
+
+        return zstandard.ZstdCompressor().compress(data)
+    # Level 6 is about as small as 9 for JSON, at a fraction of the time
+    return gzip.compress(data, compresslevel=6)
+
+
+def decompress(data: bytes, encoding: str) -> bytes:
+    """Decompress a body encoded with compress()."""
+    if not encoding or encoding == "identity":
+        return data
+    if encoding == "zstd":
+        import zstandard
+
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    if encoding == "gzip":
+        return gzip.decompress(data)
+    raise ValueError(f"Unsupported encoding {encoding}")
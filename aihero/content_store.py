@@ -0,0 +1,201 @@
+"""Disk-backed store for the large texts of workflow responses.
+
+``processed_files`` and ``processed_webpages`` hold the full extracted text
+of every document of a step. With ``Client(api_key, content_store=ContentStore())``
+texts above the threshold are moved to a temporary file as each response is
+parsed, and the steps hold ContentRef objects that read them back through
+a memory map when accessed.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from pydantic_core import core_schema
+
+# Fields of a step whose values (texts by file name or url) are moved to the store
+SPILLED_FIELDS = ("processed_files", "processed_webpages")
+
+
+class _Segment:
+    """Append-only temporary file, read through a memory map."""
+
+    def __init__(self, directory: Optional[str]):
+        self._file = tempfile.TemporaryFile(dir=directory)
+        self._map: Optional[mmap.mmap] = None
+        self._lock = threading.Lock()
+        self.size = 0
+
+    def append(self, data: bytes) -> int:
+        """Write data at the end of the file and return its offset."""
+        with self._lock:
+            offset = self.size
+            self._file.seek(offset)
+            self._file.write(data)
+            self.size += len(data)
+            return offset
+
+    def read(self, offset: int, length: int) -> bytes:
+        """Read back data written at offset."""
+        mapped = self._map
+        if mapped is None or len(mapped) < offset + length:
+            with self._lock:
+                self._file.flush()
+                mapped = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                # Maps still used by other readers are closed once released
+                self._map = mapped
+        return mapped[offset : offset + length]
+
+
+class ContentRef:
+    """Lazy reference to a text in a ContentStore, loaded on access.
+
+    ``str(ref)`` or ``ref.load()`` reads the text back; serializing a model
+    holding refs writes the texts. Refs to the same text compare equal
+    without being loaded.
+    """
+
+    __slots__ = ("_segment", "_offset", "length", "digest")
+
+    def __init__(self, segment: _Segment, offset: int, length: int, digest: str):
+        self._segment = segment
+        self._offset = offset
+        self.length = length
+        self.digest = digest
+
+    def load(self) -> str:
+        """Read the text from disk."""
+        return self._segment.read(self._offset, self.length).decode("utf-8")
+
+    def __str__(self) -> str:
+        return self.load()
+
+    def __repr__(self) -> str:
+        return f"ContentRef({self.length} bytes, sha256={self.digest[:12]})"
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, ContentRef):
+            return self.digest == other.digest
+        if isinstance(other, str):
+            return self.load() == other
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self.digest)
+
+    def __copy__(self) -> "ContentRef":
+        return self
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "ContentRef":
+        return self
+
+    def __reduce__(self) -> Tuple[Any, Tuple[str]]:
+        # The store is local to the process: pickle the text itself
+        return (str, (self.load(),))
+
+    @classmethod
+    def __get_pydantic_core_schema__(
+        cls, source: Any, handler: Any
+    ) -> core_schema.CoreSchema:
+        return core_schema.is_instance_schema(
+            cls,
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                _serialize_ref, info_arg=True
+            ),
+        )
+
+
+# Serialization context writing refs as their digest instead of loading
+# them, for dumps that are only compared (see aihero.diff.workflow_patch)
+REFS_AS_DIGESTS = {"content_refs": "digest"}
+
+
+def _serialize_ref(ref: ContentRef, info: Any) -> str:
+    if info.context and info.context.get("content_refs") == "digest":
+        return f"<ContentRef sha256={ref.digest}>"
+    return ref.load()
+
+
+class ContentStore:
+    """Temporary file holding texts of at least ``threshold`` characters.
+
+    Texts are stored once by content, so polling a workflow again does not
+    write its documents again. The file is created in ``directory`` (the
+    system temporary directory by default) and deleted when the store is
+    garbage collected or closed. A forked child keeps reading the texts
+    stored before the fork and writes new ones to a file of its own.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[Union[str, Path]] = None,
+        threshold: int = 64 * 1024,
+    ):
+        self.directory = str(directory) if directory is not None else None
+        self.threshold = threshold
+        self._segments: List[_Segment] = []
+        self._segment: Optional[_Segment] = None
+        self._refs: Dict[str, ContentRef] = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def __reduce__(self) -> Tuple[Any, Tuple[Optional[str], int]]:
+        # Only the configuration: the other process starts an empty store
+        return (ContentStore, (self.directory, self.threshold))
+
+    def put(self, text: str) -> ContentRef:
+        """Store a text and return a reference to it."""
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            ref = self._refs.get(digest)
+            if ref is not None:
+                return ref
+            if self._segment is None or self._pid != os.getpid():
+                # Never append to a file shared with the parent process
+                self._segment = _Segment(self.directory)
+                self._segments.append(self._segment)
+                self._pid = os.getpid()
+            offset = self._segment.append(data)
+            ref = ContentRef(self._segment, offset, len(data), digest)
+            self._refs[digest] = ref
+            return ref
+
+    @property
+    def size(self) -> int:
+        """Bytes written to disk."""
+        return sum(segment.size for segment in self._segments)
+
+    def spill(self, obj: Dict[str, Any]) -> Dict[str, Any]:
+        """Replace the large texts of a step dict by references, in place."""
+        for key in SPILLED_FIELDS:
+            texts = obj.get(key)
+            if isinstance(texts, dict):
+                for name, text in texts.items():
+                    if isinstance(text, str) and len(text) >= self.threshold:
+                        texts[name] = self.put(text)
+        return obj
+
+    def loads(self, content: Union[str, bytes]) -> Any:
+        """Parse JSON, moving large texts to the store as each object is built.
+
+        Every step is spilled right after it is parsed, so at most one
+        step's texts are held in memory besides the response body.
+        """
+        return json.loads(
+            content, object_pairs_hook=lambda pairs: self.spill(dict(pairs))
+        )
+
+    def close(self) -> None:
+        """Delete the files; references to them can no longer be loaded."""
+        with self._lock:
+            for segment in self._segments:
+                segment._file.close()
+            self._segments = []
+            self._segment = None
+            self._refs = {}
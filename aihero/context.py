@@ -0,0 +1,221 @@
+"""LLM context of a workflow, rendered step by step with memoization.
+
+The context is the ``llm_string`` of every step the agent sees, joined by
+blank lines::
+
+    renderer = ContextRenderer()
+    if renderer.count_tokens(workflow) <= budget:
+        prompt = renderer.render(workflow)
+
+Renderings are cached by the content of each step, so polling a
+workflow and rendering it again only renders the steps that changed.
+"""
+
+import json
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple
+
+from .schema import Step, Workflow
+
+SEPARATOR = "\n\n"
+
+# Step fields that are not part of any rendering, left out of step hashes
+_IGNORED_FIELDS = {
+    "step_id",
+    "description",
+    "type",
+    "mode",
+    "error",
+    "mute",
+    "pinned",
+    "feedback",
+    "partial",
+    "computed_at",
+    "reload",
+    "metadata_files",
+    "metadata_webpages",
+}
+
+
+def _utf8_length(text: str) -> int:
+    """Length of the UTF-8 encoding, without encoding ASCII text."""
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+
+def approx_tokens(text: str) -> int:
+    """Approximate number of tokens of a text, one per four bytes of UTF-8.
+
+    Close to the BPE tokenizers of the models for English and JSON, and
+    constant time for ASCII text.
+    """
+    return (_utf8_length(text) + 3) // 4
+
+
+def _json_default(value: Any) -> Any:
+    """JSON stand-in for values json cannot encode; refs are not loaded."""
+    digest = getattr(value, "digest", None)
+    if isinstance(digest, str):
+        return f"<{type(value).__qualname__} {digest}>"
+    return f"<{type(value).__qualname__} {value}>"
+
+
+def _leaf(value: Any) -> Any:
+    """Hashable form of a value that compares equal only for values that render the same.
+
+    Strings are kept as they are, so large texts are neither copied nor
+    hashed again. Containers become their compact JSON, in C; other values
+    are tagged with their type, since True == 1 == 1.0 but they render as
+    true, 1 and 1.0.
+    """
+    cls = type(value)
+    if cls is str:
+        return value
+    if cls is dict or cls is list:
+        return (cls, json.dumps(value, separators=(",", ":"), default=_json_default))
+    return (cls, _json_default(value) if cls.__hash__ is None else value)
+
+
+def _canonical(value: Any) -> Any:
+    """_leaf of a field value, keeping the texts of the top-level container by reference.
+
+    Fields such as processed_webpages map names to large texts.
+    """
+    cls = type(value)
+    if cls is dict:
+        return (cls, tuple([(key, _leaf(item)) for key, item in value.items()]))
+    if cls is list:
+        return (cls, tuple([_leaf(item) for item in value]))
+    return _leaf(value)
+
+
+@lru_cache(maxsize=None)
+def _rendered_fields(step_class: type) -> Tuple[str, ...]:
+    """Fields of a step class that its rendering may depend on."""
+    return tuple(
+        name for name in step_class.model_fields if name not in _IGNORED_FIELDS
+    )
+
+
+def step_key(step: Step) -> Tuple[Any, ...]:
+    """Content of a step that its rendering depends on, as a dict key.
+
+    The key is the content itself, not a hash of it, so two steps only
+    share a rendering if they render the same. Strings cache their hash
+    and equal ones are usually the same object, so this stays cheap for
+    steps with large texts.
+    """
+    step_class = type(step)
+    values = step.__dict__
+    return (
+        step_class.__name__,
+        *[_canonical(values[name]) for name in _rendered_fields(step_class)],
+    )
+
+
+class _Fragments(OrderedDict):  # type: ignore[type-arg]
+    """Dict dropping the oldest entries beyond max_entries, the content_cache of llm_string."""
+
+    def __init__(self, max_entries: int):
+        super().__init__()
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+    def __setitem__(self, key: str, value: str) -> None:
+        with self._lock:
+            super().__setitem__(key, value)
+            while len(self) > self.max_entries:
+                self.popitem(last=False)
+
+
+class _Context:
+    """Last rendering of a workflow."""
+
+    __slots__ = ("keys", "text")
+
+    def __init__(self, keys: List[Tuple[Any, ...]], text: str):
+        self.keys = keys
+        self.text = text
+
+
+class ContextRenderer:
+    """Renders the LLM context of workflows, reusing the renderings of unchanged steps.
+
+    Step renderings are kept in an LRU cache of up to ``max_chars``
+    characters; fragments shared between steps (pretty-printed JSON) in
+    one of ``max_fragments`` entries. The last context of up to
+    ``max_workflows`` workflows is kept as well and returned as is when
+    none of their steps changed. Texts spilled to a ContentStore are read
+    back to render Files and Webpages steps, and are cached like any other
+    rendering. Safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        max_chars: int = 16 * 1024 * 1024,
+        max_fragments: int = 4096,
+        max_workflows: int = 64,
+    ):
+        self.max_chars = max_chars
+        self.max_workflows = max_workflows
+        self._steps: "OrderedDict[Tuple[Any, ...], Tuple[str, int]]" = OrderedDict()
+        self._chars = 0
+        self._fragments = _Fragments(max_fragments)
+        self._contexts: "OrderedDict[Optional[str], _Context]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _render(self, step: Step) -> Tuple[Tuple[Any, ...], str, int]:
+        """Key, rendering and UTF-8 length of a step."""
+        key = step_key(step)
+        with self._lock:
+            cached = self._steps.get(key)
+            if cached is not None:
+                self._steps.move_to_end(key)
+                return key, cached[0], cached[1]
+        text = step.llm_string(self._fragments)
+        size = _utf8_length(text)
+        if len(text) <= self.max_chars:
+            with self._lock:
+                if key not in self._steps:
+                    self._steps[key] = (text, size)
+                    self._chars += len(text)
+                while self._chars > self.max_chars:
+                    _, (evicted, _) = self._steps.popitem(last=False)
+                    self._chars -= len(evicted)
+        return key, text, size
+
+    def render_step(self, step: Step) -> str:
+        """LLM string of a step."""
+        return self._render(step)[1]
+
+    def render(self, workflow: Workflow) -> str:
+        """LLM context of a workflow: the steps it sees, separated by blank lines."""
+        rendered = [item for item in map(self._render, workflow.steps) if item[1]]
+        keys = [key for key, _, _ in rendered]
+        with self._lock:
+            context = self._contexts.get(workflow.workflow_id)
+            if context is not None and context.keys == keys:
+                self._contexts.move_to_end(workflow.workflow_id)
+                return context.text
+        text = SEPARATOR.join(text for _, text, _ in rendered)
+        with self._lock:
+            self._contexts[workflow.workflow_id] = _Context(keys, text)
+            self._contexts.move_to_end(workflow.workflow_id)
+            while len(self._contexts) > self.max_workflows:
+                self._contexts.popitem(last=False)
+        return text
+
+    def count_tokens(self, workflow: Workflow) -> int:
+        """approx_tokens() of the context of a workflow, without joining it."""
+        sizes = [size for _, text, size in map(self._render, workflow.steps) if text]
+        size = sum(sizes) + len(SEPARATOR) * max(len(sizes) - 1, 0)
+        return (size + 3) // 4
+
+    def clear(self) -> None:
+        """Drop all cached renderings."""
+        with self._lock:
+            self._steps.clear()
+            self._chars = 0
+            self._fragments.clear()
+            self._contexts.clear()
@@ -0,0 +1,208 @@
+"""Deadlines and cancellation shared by every request of a composite operation.
+
+Entering a Deadline makes it current for the calling thread or task (it is
+stored in a context variable). Every Client request made while it is current
+gets the remaining budget as its timeout, waits between polls are cut short,
+and ``cancel()`` from any other thread aborts the operation promptly::
+
+    with Deadline(120) as deadline:
+        client.upload_file(project_id, file)
+        workflow = client.create_workflow(project_id, name, description, steps)
+        client.launch_workflow(project_id, workflow.workflow_id)
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar, Token, copy_context
+from typing import Any, Callable, List, Optional, Set, TypeVar
+from weakref import WeakSet
+
+from .exceptions import Cancelled, DeadlineExceeded
+
+T = TypeVar("T")
+
+_current: ContextVar[Optional["Deadline"]] = ContextVar("aihero_deadline", default=None)
+
+# Threads running requests under a deadline, so that the caller can stop
+# waiting on them as soon as the deadline is cancelled.
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _reset_after_fork() -> None:
+    """The pool's threads do not survive a fork; start a new pool in the child."""
+    global _executor, _executor_lock  # pylint: disable=global-statement
+    _executor = None
+    _executor_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _request_executor() -> ThreadPoolExecutor:
+    """Shared pool for requests made under a deadline."""
+    global _executor  # pylint: disable=global-statement
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=32, thread_name_prefix="aihero-request"
+            )
+        return _executor
+
+
+def current_deadline() -> Optional["Deadline"]:
+    """The deadline of the running operation, if any."""
+    return _current.get()
+
+
+class Deadline:
+    """Time budget and cancellation token for an operation.
+
+    ``timeout`` is in seconds; None means no time limit, only cancellation.
+    A deadline entered while another one is current is bounded by it and
+    is cancelled along with it.
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        self._expires_at = None if timeout is None else time.monotonic() + timeout
+        self._parent = current_deadline()
+        self._cancelled = threading.Event()
+        self._waiters: Set[threading.Event] = set()
+        self._children: "WeakSet[Deadline]" = WeakSet()
+        self._lock = threading.Lock()
+        self._tokens: List[Token] = []
+        if self._parent is not None:
+            self._parent._add_child(self)
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left, or None when there is no time limit."""
+        remaining = None
+        if self._expires_at is not None:
+            remaining = self._expires_at - time.monotonic()
+        if self._parent is not None:
+            parent = self._parent.remaining()
+            if parent is not None:
+                remaining = parent if remaining is None else min(remaining, parent)
+        return remaining
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether this deadline or an enclosing one was cancelled."""
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        """Cancel the operation and nested deadlines. Safe to call from any thread."""
+        self._cancelled.set()
+        with self._lock:
+            waiters = list(self._waiters)
+            children = list(self._children)
+        for waiter in waiters:
+            waiter.set()
+        for child in children:
+            child.cancel()
+
+    def check(self) -> Optional[float]:
+        """Raise if cancelled or expired, otherwise return the remaining seconds."""
+        if self.cancelled:
+            raise Cancelled("Operation cancelled")
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceeded("Deadline exceeded")
+        return remaining
+
+    def _add_child(self, child: "Deadline") -> None:
+        """Cancel the child deadline along with this one."""
+        with self._lock:
+            self._children.add(child)
+        if self.cancelled:
+            child.cancel()
+
+    def _add_waiter(self, event: threading.Event) -> None:
+        """Set the event when this deadline is cancelled."""
+        with self._lock:
+            self._waiters.add(event)
+        if self.cancelled:
+            event.set()
+
+    def _remove_waiter(self, event: threading.Event) -> None:
+        with self._lock:
+            self._waiters.discard(event)
+
+    def sleep(self, seconds: float) -> None:
+        """Sleep, waking up early to raise when cancelled or out of time."""
+        remaining = self.check()
+        if remaining is not None and remaining < seconds:
+            self._cancelled.wait(remaining)
+            self.check()
+            raise DeadlineExceeded("Deadline exceeded")
+        if self._cancelled.wait(seconds):
+            self.check()
+
+    def wait(self, event: threading.Event, seconds: float) -> bool:
+        """Like sleep(), returning early (and True) once the event is set."""
+        remaining = self.check()
+        self._add_waiter(event)
+        try:
+            if remaining is not None and remaining < seconds:
+                if event.wait(remaining) and not self.cancelled:
+                    return True
+                self.check()
+                raise DeadlineExceeded("Deadline exceeded")
+            event.wait(seconds)
+            self.check()
+            return event.is_set()
+        finally:
+            self._remove_waiter(event)
+
+    def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a blocking call in a worker thread and wait for it within the budget.
+
+        Cancellation or expiry returns control to the caller right away; the
+        abandoned call finishes in the background, bounded by its own timeout.
+        A request that already reached the server may still take effect: a
+        create or launch can be committed after DeadlineExceeded or Cancelled.
+        """
+        remaining = self.check()
+        done = threading.Event()
+        self._add_waiter(done)
+        try:
+            future = _request_executor().submit(copy_context().run, fn, *args, **kwargs)
+            future.add_done_callback(lambda _: done.set())
+            done.wait(remaining)
+            if future.done():
+                return future.result()
+            future.cancel()
+            self.check()
+            raise DeadlineExceeded("Deadline exceeded")
+        finally:
+            self._remove_waiter(done)
+
+    def __enter__(self) -> "Deadline":
+        self._tokens.append(_current.set(self))
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        _current.reset(self._tokens.pop())
+
+
+def sleep(seconds: float) -> None:
+    """Sleep within the current deadline, if any."""
+    deadline = current_deadline()
+    if deadline is None:
+        time.sleep(seconds)
+    else:
+        deadline.sleep(seconds)
+
+
+def wait(event: threading.Event, seconds: float) -> bool:
+    """Wait up to seconds for an event within the current deadline, if any.
+
+    Returns whether the event is set.
+    """
+    deadline = current_deadline()
+    if deadline is None:
+        return event.wait(seconds)
+    return deadline.wait(event, seconds)
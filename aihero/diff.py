@@ -0,0 +1,250 @@
+"""Incremental parsing and updating of workflows.
+
+Polling a running workflow returns the whole workflow every time, while
+only a few steps change between polls. ``merge_workflow`` parses a new
+snapshot against the previous one, reusing the validated Step instances of
+unchanged steps and parsing only the ones that changed. In the other
+direction, ``workflow_patch`` turns local edits of a fetched workflow into
+the few operations needed to apply them on the server.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pydantic import TypeAdapter
+
+from .content_store import REFS_AS_DIGESTS
+from .schema import Chat, Step, Workflow
+
+_MESSAGES = TypeAdapter(List[Dict[str, Any]])
+
+
+def _json_copy(value: Any) -> Any:
+    """Copy of decoded JSON sharing no containers with it, much faster than deepcopy."""
+    if isinstance(value, dict):
+        return {key: _json_copy(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_json_copy(item) for item in value]
+    return value
+
+
+@dataclass
+class WorkflowChanges:
+    """Step ids added, changed or removed between two snapshots of a workflow."""
+
+    added: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    reused: int = 0
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.changed or self.removed)
+
+
+def _unchanged(previous: Step, data: Dict[str, Any]) -> bool:
+    """Whether a raw step dict is the same as the one the previous Step was parsed from.
+
+    computed_at, type and the partial flag are checked first, so most
+    changed steps are told apart without looking at their content. The full
+    comparison of the raw dicts is a C-level comparison of strings, far
+    cheaper than hashing or validating them.
+    """
+    source = previous._source
+    if source is None:
+        return False
+    for key in ("computed_at", "type", "partial"):
+        if data.get(key) != source.get(key):
+            return False
+    return data == source
+
+
+def _extend_chat(previous: Chat, data: Dict[str, Any]) -> Optional[Chat]:
+    """Chat step for a raw dict whose messages extend those of previous, None otherwise.
+
+    Chat history is append-only: the messages of previous are reused as
+    they are and only the new ones are validated, so merging costs the
+    same however long the chat is. Only the last shared message is
+    compared; a chat that got shorter or whose last shared message
+    differs is parsed again in full.
+    """
+    if data.get("type") != previous.type:
+        return None
+    messages = previous.messages
+    new = data.get("messages")
+    count = len(messages)
+    if not isinstance(new, list) or len(new) < count:
+        return None
+    if count and new[count - 1] != messages[-1]:
+        return None
+    step = Chat(**{key: value for key, value in data.items() if key != "messages"})
+    appended = _MESSAGES.validate_python(_json_copy(new[count:]))
+    step.messages = messages + appended
+    return step
+
+
+def merge_workflow(
+    previous: Optional[Workflow], data: Dict[str, Any]
+) -> Tuple[Workflow, WorkflowChanges]:
+    """Build a Workflow from a raw dict, reusing unchanged steps of ``previous``.
+
+    Steps are matched by step_id, and new messages of Chat steps are
+    appended to the previous ones. Returns the new workflow and the change
+    set. With ``previous`` None every step is parsed and reported as added;
+    the result keeps what is needed to merge the next snapshot incrementally.
+    Steps are parsed from copies of their raw dicts, which stay as fetched
+    for workflow_patch.
+    """
+    changes = WorkflowChanges()
+    known: Dict[str, Step] = {}
+    if previous is not None:
+        known = {step.step_id: step for step in previous.steps if step.step_id}
+
+    steps: List[Step] = []
+    for step_data in data.get("steps", []):
+        step_id = step_data.get("step_id")
+        old = known.pop(step_id, None) if step_id else None
+        if old is not None and _unchanged(old, step_data):
+            steps.append(old)
+            changes.reused += 1
+            continue
+        step = None
+        if isinstance(old, Chat):
+            step = _extend_chat(old, step_data)
+        if step is None:
+            step = Step.from_dict(_json_copy(step_data))
+        step._source = step_data
+        steps.append(step)
+        if old is None:
+            changes.added.append(step.step_id or "")
+        else:
+            changes.changed.append(step.step_id or "")
+    changes.removed.extend(known)
+
+    workflow_data = dict(data)
+    workflow_data["steps"] = steps
+    workflow = Workflow(**workflow_data)
+    workflow._source = data
+    return workflow, changes
+
+
+# Workflow fields that can be changed by an update
+EDITABLE_FIELDS = ("name", "description", "kind", "pinned", "stage", "archived")
+
+
+def _dump(model: Any, **kwargs: Any) -> Dict[str, Any]:
+    """JSON dump for comparisons, with texts in the content store as their digests."""
+    return model.model_dump(mode="json", context=REFS_AS_DIGESTS, **kwargs)
+
+
+def _field_ops(
+    model: Any,
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    fields: Iterable[str],
+    prefix: str,
+) -> List[Dict[str, Any]]:
+    """Operations setting the fields of a model whose dump differs from its baseline.
+
+    Both sides are dumps of validated models, so normalized values (titles,
+    URLs, file names) compare equal to what was fetched. The values sent
+    are dumped again in full, with the stored texts loaded.
+    """
+    ops: List[Dict[str, Any]] = []
+    for key in fields:
+        if key in baseline and baseline[key] == current.get(key):
+            continue
+        ops.append(
+            {
+                "op": "replace" if key in baseline else "add",
+                "path": f"{prefix}/{key}",
+                "value": model.model_dump(mode="json", include={key}).get(key),
+            }
+        )
+    return ops
+
+
+def _appended_messages(
+    messages: List[Dict[str, Any]], raw: Any
+) -> Optional[List[Dict[str, Any]]]:
+    """Messages appended to the raw messages of a Chat step, None if it changed otherwise."""
+    if not isinstance(raw, list) or len(messages) <= len(raw):
+        return None
+    if messages[: len(raw)] != raw:
+        return None
+    return messages[len(raw) :]
+
+
+def workflow_patch(workflow: Workflow) -> List[Dict[str, Any]]:
+    """JSON Patch (RFC 6902) operations from the fetched version of a workflow to its current state.
+
+    The fetched raw dicts are parsed again and compared with the current
+    models, so in-place edits of nested values are seen too, and only
+    updates pay for it. Only the changed fields of changed steps are sent;
+    steps are matched by step_id, and added, removed or reordered steps
+    become add, remove and move operations. Messages appended to a Chat
+    step are added at their offsets, without sending the earlier ones.
+    Raises ValueError for a workflow that was not fetched from the server.
+    """
+    source = workflow._source
+    if source is None:
+        raise ValueError(
+            f"Workflow {workflow.workflow_id} was not fetched from the server, "
+            "there is nothing to compare it with."
+        )
+    fetched = Workflow(**{**source, "steps": []})
+    ops = _field_ops(
+        workflow,
+        _dump(workflow, include=set(EDITABLE_FIELDS)),
+        _dump(fetched, include=set(EDITABLE_FIELDS)),
+        EDITABLE_FIELDS,
+        "",
+    )
+
+    base_steps: List[Dict[str, Any]] = source.get("steps") or []
+    # Raw steps without an id got a generated one when parsed
+    parsed_ids = {id(step._source): step.step_id for step in workflow.steps}
+    ids = [raw.get("step_id") or parsed_ids.get(id(raw)) for raw in base_steps]
+    by_id = dict(zip(ids, base_steps))
+    current_ids = {step.step_id for step in workflow.steps}
+    for j in reversed(range(len(ids))):
+        if ids[j] not in current_ids:
+            ops.append({"op": "remove", "path": f"/steps/{j}"})
+            del ids[j]
+
+    for i, step in enumerate(workflow.steps):
+        if i >= len(ids) or ids[i] != step.step_id:
+            if step.step_id not in ids[i:]:
+                value = step.model_dump(mode="json")
+                ops.append({"op": "add", "path": f"/steps/{i}", "value": value})
+                ids.insert(i, step.step_id)
+                continue
+            j = ids.index(step.step_id, i)
+            ops.append({"op": "move", "from": f"/steps/{j}", "path": f"/steps/{i}"})
+            ids.insert(i, ids.pop(j))
+        value = _dump(step)
+        raw = by_id[step.step_id]
+        base = _dump(Step.from_dict({**raw, "step_id": step.step_id}))
+        if value == base:
+            continue
+        if value.get("type") != base.get("type"):
+            value = step.model_dump(mode="json")
+            ops.append({"op": "replace", "path": f"/steps/{i}", "value": value})
+            continue
+        fields: Iterable[str] = value
+        if isinstance(step, Chat):
+            appended = _appended_messages(value["messages"], base.get("messages"))
+            if appended is not None:
+                offset = len(base["messages"])
+                ops.extend(
+                    {
+                        "op": "add",
+                        "path": f"/steps/{i}/messages/{offset + k}",
+                        "value": message,
+                    }
+                    for k, message in enumerate(
+                        _MESSAGES.dump_python(step.messages[offset:], mode="json")
+                    )
+                )
+                fields = [key for key in value if key != "messages"]
+        ops.extend(_field_ops(step, value, base, fields, f"/steps/{i}"))
+    return ops
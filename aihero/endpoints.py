@@ -0,0 +1,264 @@
+"""Pool of server URLs (regional gateways, caching proxies) with health checks and failover.
+
+Each request goes to the healthy endpoint with the lowest latency. A
+background thread probes every endpoint every ``probe_interval`` seconds
+and keeps an exponentially weighted moving average (EWMA) of the probe
+latencies, so endpoints are compared on the same cheap request rather
+than on whatever the application happened to send them::
+
+    client = Client(api_key, endpoints=["https://eu.example.com/", "https://us.example.com/"])
+
+An endpoint that refuses connections, times out or answers 502, 503 or
+504 is marked down until a probe succeeds again, and the request fails
+over to the next endpoint. Requests that may have reached the server
+(anything but a refused connection) are only retried elsewhere for
+idempotent methods, so a launch is never sent twice.
+"""
+
+import os
+import threading
+import time
+import weakref
+from typing import Any, Callable, Iterable, List, Optional
+
+import httpx
+import validators
+
+# Gateway statuses meaning the endpoint, not the request, is at fault
+FAILOVER_STATUSES = (502, 503, 504)
+IDEMPOTENT_METHODS = ("GET", "HEAD", "PUT", "DELETE", "OPTIONS")
+
+
+class Endpoint:
+    """One server URL with its health and latency average."""
+
+    def __init__(self, url: str):
+        # simple_host: local proxies are commonly reached as localhost
+        if not url.startswith(("http://", "https://")) or not validators.url(
+            url, simple_host=True
+        ):
+            raise ValueError(f"Invalid endpoint URL {url}")
+        self.url = url
+        # Same API prefix as Client
+        self.base_url = f"{url.rstrip('/')}/api/v1"
+        self.healthy = True
+        self.latency: Optional[float] = None
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+    def __repr__(self) -> str:
+        latency = "-" if self.latency is None else f"{self.latency * 1000:.1f} ms"
+        state = "up" if self.healthy else "down"
+        return f"Endpoint({self.url!r}, {state}, {latency})"
+
+
+class EndpointPool:
+    """Server URLs tried from the fastest healthy one.
+
+    ``alpha`` is the weight of a new probe in the latency average. The
+    current endpoint is kept unless another one is faster by more than
+    ``tolerance`` (a fraction), so that requests do not flap between
+    endpoints of similar latency and keep reusing warm connections.
+    """
+
+    def __init__(
+        self,
+        urls: Iterable[str],
+        probe_interval: float = 10.0,
+        probe_timeout: float = 2.0,
+        probe_path: str = "/",
+        alpha: float = 0.3,
+        tolerance: float = 0.2,
+    ):
+        self.endpoints = [Endpoint(url) for url in urls]
+        if not self.endpoints:
+            raise ValueError("Please provide at least one endpoint URL.")
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.probe_path = probe_path
+        self.alpha = alpha
+        self.tolerance = tolerance
+        self._current = self.endpoints[0]
+        self._http: Optional["weakref.WeakMethod[Callable[[], httpx.Client]]"] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid = os.getpid()
+
+    def __reduce__(self) -> Any:
+        """Pickle the configuration only, like Client"""
+        return (
+            EndpointPool,
+            (
+                [endpoint.url for endpoint in self.endpoints],
+                self.probe_interval,
+                self.probe_timeout,
+                self.probe_path,
+                self.alpha,
+                self.tolerance,
+            ),
+        )
+
+    @property
+    def urls(self) -> List[str]:
+        return [endpoint.url for endpoint in self.endpoints]
+
+    def bind(self, http: Callable[[], httpx.Client]) -> None:
+        """Send the probes through a client's connection pool.
+
+        Probing the backups through the same pool keeps connections to them
+        warm, so a failover does not pay for a new TLS handshake. Probing
+        stops once the owner of the method is garbage collected.
+        """
+        self._http = weakref.WeakMethod(http)  # type: ignore[arg-type]
+
+    # Selection
+
+    def ranked(self) -> List[Endpoint]:
+        """Endpoints in the order a request tries them."""
+        self._ensure_probing()
+        with self._lock:
+            current = self._current
+            healthy = [e for e in self.endpoints if e.healthy]
+            if healthy:
+                # Unmeasured endpoints keep their listed order, after the measured ones
+                fastest = min(
+                    healthy,
+                    key=lambda e: float("inf") if e.latency is None else e.latency,
+                )
+                if (
+                    not current.healthy
+                    or current.latency is None
+                    or (
+                        fastest.latency is not None
+                        and fastest.latency < current.latency * (1 - self.tolerance)
+                    )
+                ):
+                    current = self._current = fastest
+            others = sorted(
+                (e for e in self.endpoints if e is not current),
+                key=lambda e: (
+                    not e.healthy,
+                    float("inf") if e.latency is None else e.latency,
+                ),
+            )
+        return [current] + others
+
+    def choose(self) -> Endpoint:
+        """Endpoint the next request goes to."""
+        return self.ranked()[0]
+
+    # Outcomes
+
+    def _succeeded(self, endpoint: Endpoint) -> None:
+        if endpoint.healthy:
+            return
+        with self._lock:
+            endpoint.healthy = True
+            endpoint.failures = 0
+
+    def _failed(self, endpoint: Endpoint, error: str) -> None:
+        with self._lock:
+            endpoint.healthy = False
+            endpoint.failures += 1
+            endpoint.last_error = error
+
+    def request(
+        self, http: httpx.Client, method: str, path: str, **kwargs: Any
+    ) -> httpx.Response:
+        """Send a request to the best endpoint, failing over to the others."""
+        endpoints = self.ranked()
+        retry = method.upper() in IDEMPOTENT_METHODS
+        for i, endpoint in enumerate(endpoints):
+            last = i == len(endpoints) - 1
+            try:
+                response = http.request(method, f"{endpoint.base_url}{path}", **kwargs)
+            except (httpx.ConnectError, httpx.ConnectTimeout) as exc:
+                # Nothing was sent: safe to retry elsewhere whatever the method
+                self._failed(endpoint, repr(exc))
+                if last:
+                    raise
+                continue
+            except httpx.TransportError as exc:
+                self._failed(endpoint, repr(exc))
+                if last or not retry:
+                    raise
+                continue
+            if response.status_code in FAILOVER_STATUSES:
+                self._failed(endpoint, f"HTTP {response.status_code}")
+                if not last and retry:
+                    response.close()
+                    continue
+            else:
+                self._succeeded(endpoint)
+            return response
+        raise AssertionError("unreachable")
+
+    # Probes
+
+    def probe(self, endpoint: Endpoint) -> None:
+        """Measure one endpoint and update its health and latency average.
+
+        Any answer below 500 counts: a 401 or 404 still proves the gateway
+        and its route to the API are up.
+        """
+        url = f"{endpoint.base_url}{self.probe_path}"
+        client = self._http() if self._http is not None else None
+        tic = time.perf_counter()
+        try:
+            if client is not None:
+                response = client().get(url, timeout=self.probe_timeout)
+            else:
+                response = httpx.get(url, timeout=self.probe_timeout)
+        except httpx.HTTPError as exc:
+            self._failed(endpoint, repr(exc))
+            return
+        seconds = time.perf_counter() - tic
+        if response.status_code >= 500:
+            self._failed(endpoint, f"HTTP {response.status_code}")
+            return
+        with self._lock:
+            if endpoint.latency is None:
+                endpoint.latency = seconds
+            else:
+                endpoint.latency += self.alpha * (seconds - endpoint.latency)
+            endpoint.healthy = True
+            endpoint.failures = 0
+
+    def probe_all(self) -> None:
+        """Probe every endpoint once."""
+        for endpoint in self.endpoints:
+            self.probe(endpoint)
+
+    def _ensure_probing(self) -> None:
+        """Start the probe thread on first use, after close(), and in a forked child."""
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                # Threads do not survive a fork
+                self._thread = None
+                self._pid = os.getpid()
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="aihero-endpoints", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            if self._http is not None and self._http() is None:
+                # The client was garbage collected
+                return
+            self.probe_all()
+            self._stop.wait(self.probe_interval)
+
+    def close(self) -> None:
+        """Stop probing; it starts again with the next request."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._stop.set()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
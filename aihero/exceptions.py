@@ -1,6 +1,9 @@
 """Exceptions for AI Hero"""
 
-from typing import Optional
+from typing import TYPE_CHECKING, List, Optional
+
+if TYPE_CHECKING:
+    from .preflight import Issue
 
 
 class AIHeroException(Exception):
@@ -11,7 +14,32 @@ class AIHeroException(Exception):
             message = type(self).__name__
 
         self.message = message
+        self.status_code = status_code
         if status_code:
             super().__init__(f"<Response [{status_code}]> {message}")
         else:
             super().__init__(f"{message}")
+
+
+class DeadlineExceeded(AIHeroException, TimeoutError):
+    """The time budget of an operation ran out"""
+
+
+class Cancelled(AIHeroException):
+    """The operation was cancelled through its Deadline"""
+
+
+class SchemaError(AIHeroException):
+    """A JSON schema that cannot be compiled"""
+
+
+class SchemaDependencyError(SchemaError):
+    """A JSON schema that only jsonschema, which is not installed, can compile"""
+
+
+class PreflightError(AIHeroException):
+    """Steps that failed the local checks of aihero.preflight"""
+
+    def __init__(self, issues: List["Issue"]):
+        self.issues = issues
+        super().__init__("Preflight check failed: " + "; ".join(map(str, issues)))
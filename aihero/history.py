@@ -0,0 +1,269 @@
+"""Columnar summaries of workflow runs for analytics over many runs.
+
+A RunHistory keeps one row per run (by ``run_id``) in typed arrays:
+strings are dictionary-encoded, times are seconds since the epoch and
+missing numbers are NaN (-1 for the version). Rows are filled from the
+raw workflow dicts of list and poll responses without building Workflow
+models::
+
+    history = client.run_history(project_id)
+    history.run_time_percentiles(by="name")
+    history.failure_rates(by="model_used")
+
+The aggregates and the Arrow export need NumPy (``pip install aihero[analytics]``)
+and pyarrow (``pip install aihero[arrow]``) respectively.
+"""
+
+import math
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Dictionary-encoded columns, and the numeric ones with their array type codes
+CATEGORICAL_COLUMNS = ("workflow_id", "name", "model_used", "status")
+NUMERIC_COLUMNS = {"run_time": "d", "start_at": "d", "end_at": "d", "version": "q"}
+
+# Finished runs, and those of them that count as failures
+FINISHED_STATUSES = ("success", "failed", "aborted")
+FAILED_STATUSES = ("failed", "aborted")
+
+
+def _numpy() -> Any:
+    """Import NumPy, with a hint if it is missing."""
+    try:
+        import numpy
+    except ImportError as exc:
+        raise ImportError(
+            "Run history analytics need NumPy: pip install aihero[analytics]"
+        ) from exc
+    return numpy
+
+
+def _timestamp(value: Any) -> float:
+    """Seconds since the epoch of an ISO 8601 string or datetime, NaN if missing."""
+    if value is None:
+        return math.nan
+    if isinstance(value, str):
+        if value.endswith("Z"):
+            value = value[:-1] + "+00:00"
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        # The API returns UTC times
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class _Dictionary:
+    """Column of strings stored as codes into a list of distinct values."""
+
+    def __init__(self) -> None:
+        self.values: List[Optional[str]] = []
+        self.index: Dict[Optional[str], int] = {}
+        self.codes = array("i")
+
+    def code(self, value: Optional[str]) -> int:
+        """Code of a value, added to the dictionary if new."""
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class RunHistory:
+    """Run summaries (status, times, model, version) stored column by column.
+
+    A run added again, e.g. when polling it until it finishes, updates its
+    row. The columns take 48 bytes per run, besides its run_id, against
+    kilobytes for a Workflow with its steps.
+    """
+
+    def __init__(self, workflows: Iterable[Any] = ()):
+        self.run_ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._categorical = {name: _Dictionary() for name in CATEGORICAL_COLUMNS}
+        self._numeric = {name: array(code) for name, code in NUMERIC_COLUMNS.items()}
+        self.extend(workflows)
+
+    def __len__(self) -> int:
+        return len(self.run_ids)
+
+    def add(self, workflow: Any) -> bool:
+        """Add or update the run of a raw workflow dict (or Workflow).
+
+        Returns False for a workflow that never ran.
+        """
+        if not isinstance(workflow, dict):
+            source = getattr(workflow, "_source", None)
+            workflow = source if source is not None else workflow.model_dump()
+        run_id = workflow.get("run_id")
+        if not run_id:
+            return False
+        status = workflow.get("status", "success")
+        values = {
+            "workflow_id": workflow.get("workflow_id"),
+            "name": workflow.get("name"),
+            "model_used": workflow.get("model_used"),
+            "status": str(getattr(status, "value", status)),
+        }
+        run_time = workflow.get("run_time")
+        version = workflow.get("version")
+        numbers = {
+            "run_time": math.nan if run_time is None else float(run_time),
+            "start_at": _timestamp(workflow.get("start_at")),
+            "end_at": _timestamp(workflow.get("end_at")),
+            "version": -1 if version is None else int(version),
+        }
+        row = self._rows.get(run_id)
+        if row is None:
+            self._rows[run_id] = len(self.run_ids)
+            self.run_ids.append(run_id)
+            for name, value in values.items():
+                column = self._categorical[name]
+                column.codes.append(column.code(value))
+            for name, number in numbers.items():
+                self._numeric[name].append(number)  # type: ignore[arg-type]
+        else:
+            for name, value in values.items():
+                column = self._categorical[name]
+                column.codes[row] = column.code(value)
+            for name, number in numbers.items():
+                self._numeric[name][row] = number  # type: ignore[call-overload]
+        return True
+
+    def extend(self, workflows: Iterable[Any]) -> None:
+        """Add the runs of many workflows."""
+        for workflow in workflows:
+            self.add(workflow)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the column arrays, without the run ids and string values."""
+        arrays = [column.codes for column in self._categorical.values()]
+        arrays.extend(self._numeric.values())
+        return sum(len(values) * values.itemsize for values in arrays)
+
+    def column(self, name: str) -> Any:
+        """NumPy copy of a numeric column, or of the codes of a categorical one."""
+        numpy = _numpy()
+        if name in self._numeric:
+            values = self._numeric[name]
+        else:
+            values = self._categorical[name].codes
+        # A copy: arrays with an exported buffer can no longer grow
+        return numpy.frombuffer(values, dtype=values.typecode).copy()
+
+    def categories(self, name: str) -> List[Optional[str]]:
+        """Values of a categorical column, by code."""
+        return self._categorical[name].values
+
+    def _grouped(self, by: str, mask: Any) -> Tuple[Any, List[Optional[str]]]:
+        """Codes of the selected rows and the group names by code."""
+        if by not in self._categorical:
+            raise ValueError(f"by should be one of {CATEGORICAL_COLUMNS}.")
+        return self.column(by)[mask], self.categories(by)
+
+    def run_time_percentiles(
+        self, by: str = "workflow_id", percentiles: Sequence[float] = (50, 95, 99)
+    ) -> Dict[Optional[str], Tuple[float, ...]]:
+        """Percentiles of run_time per group, by linear interpolation like numpy.percentile.
+
+        Runs without a run_time are left out.
+        """
+        numpy = _numpy()
+        run_time = self.column("run_time")
+        valid = ~numpy.isnan(run_time)
+        codes, names = self._grouped(by, valid)
+        # Sort by group, then run time: each group is a sorted slice
+        order = numpy.lexsort((run_time[valid], codes))
+        codes, values = codes[order], run_time[valid][order]
+        groups, starts, counts = numpy.unique(
+            codes, return_index=True, return_counts=True
+        )
+        columns = []
+        for percentile in percentiles:
+            position = starts + (counts - 1) * (percentile / 100)
+            low = numpy.floor(position).astype(numpy.intp)
+            high = numpy.ceil(position).astype(numpy.intp)
+            columns.append(
+                values[low] + (values[high] - values[low]) * (position - low)
+            )
+        return {
+            names[group]: tuple(float(column[i]) for column in columns)
+            for i, group in enumerate(groups)
+        }
+
+    def _status_mask(self, statuses: Sequence[str]) -> Any:
+        """Rows whose status is one of statuses."""
+        numpy = _numpy()
+        index = self._categorical["status"].index
+        codes = [index[status] for status in statuses if status in index]
+        return numpy.isin(self.column("status"), codes)
+
+    def failure_rates(self, by: str = "workflow_id") -> Dict[Optional[str], float]:
+        """Share of the finished runs of each group that failed or were aborted."""
+        numpy = _numpy()
+        finished = self._status_mask(FINISHED_STATUSES)
+        failed = self._status_mask(FAILED_STATUSES)[finished]
+        codes, names = self._grouped(by, finished)
+        totals = numpy.bincount(codes, minlength=len(names))
+        failures = numpy.bincount(codes, weights=failed, minlength=len(names))
+        return {
+            names[code]: float(failures[code] / totals[code])
+            for code in numpy.flatnonzero(totals)
+        }
+
+    def throughput(self, by: str = "model_used") -> Dict[Optional[str], float]:
+        """Successful runs per hour of each group, between its first start and last end."""
+        numpy = _numpy()
+        start_at, end_at = self.column("start_at"), self.column("end_at")
+        success = self._status_mask(("success",))
+        mask = success & ~numpy.isnan(start_at) & ~numpy.isnan(end_at)
+        codes, names = self._grouped(by, mask)
+        counts = numpy.bincount(codes, minlength=len(names))
+        first = numpy.full(len(names), numpy.inf)
+        last = numpy.full(len(names), -numpy.inf)
+        numpy.minimum.at(first, codes, start_at[mask])
+        numpy.maximum.at(last, codes, end_at[mask])
+        rates = {}
+        for code in numpy.flatnonzero(counts):
+            hours = (last[code] - first[code]) / 3600
+            rates[names[code]] = float(counts[code] / hours) if hours > 0 else math.inf
+        return rates
+
+    def to_arrow(self) -> Any:
+        """pyarrow Table of the runs, with dictionary-encoded strings and nulls for missing values."""
+        numpy = _numpy()
+        try:
+            import pyarrow
+        except ImportError as exc:
+            raise ImportError(
+                "Arrow export needs pyarrow: pip install aihero[arrow]"
+            ) from exc
+
+        columns: Dict[str, Any] = {"run_id": pyarrow.array(self.run_ids)}
+        for name in CATEGORICAL_COLUMNS:
+            columns[name] = pyarrow.DictionaryArray.from_arrays(
+                pyarrow.array(self.column(name)),
+                pyarrow.array(self.categories(name), pyarrow.string()),
+            )
+        columns["run_time"] = pyarrow.array(
+            self.column("run_time"), mask=numpy.isnan(self.column("run_time"))
+        )
+        for name in ("start_at", "end_at"):
+            seconds = self.column(name)
+            missing = numpy.isnan(seconds)
+            micros = numpy.where(missing, 0, seconds * 1e6).astype(numpy.int64)
+            columns[name] = pyarrow.array(
+                micros, pyarrow.timestamp("us", tz="UTC"), mask=missing
+            )
+        version = self.column("version")
+        columns["version"] = pyarrow.array(version, mask=version < 0)
+        return pyarrow.table(columns)
+
+    def to_parquet(self, path: str) -> None:
+        """Write the runs to a Parquet file."""
+        table = self.to_arrow()
+        import pyarrow.parquet
+
+        pyarrow.parquet.write_table(table, path)
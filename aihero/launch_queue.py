@@ -0,0 +1,262 @@
+"""Priority launch queue with an in-flight cap and back-off on 402/429 responses."""
+
+import heapq
+import math
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextvars import Context, copy_context
+from dataclasses import dataclass
+from typing import Any, Deque, List, Optional, Tuple
+
+from .client import Client
+from .deadline import Deadline, sleep
+from .exceptions import AIHeroException
+from .schema import Workflow
+
+# (priority, sequence, queued at, project_id, workflow_id, future, context)
+Job = Tuple[int, int, float, str, str, "Future[Any]", Context]
+
+# Out of credits and rate limited: wait and retry instead of failing the run
+THROTTLE_STATUS_CODES = {402, 429}
+
+
+@dataclass
+class QueueMetrics:
+    """Snapshot of the queue state. Wait times are in seconds."""
+
+    depth: int
+    in_flight: int
+    paused_for: float
+    submitted: int
+    completed: int
+    failed: int
+    throttled: int
+    wait_p50: float
+    wait_p95: float
+    wait_max: float
+
+
+class LaunchQueue:
+    """Launch workflows in priority order with at most ``max_in_flight`` runs at a time.
+
+    Lower ``priority`` values run first; equal priorities run in submission
+    order. When a launch is refused with 402 (insufficient credits) or 429
+    (rate limited), the job goes back to the head of its priority, the
+    whole queue pauses for ``backoff`` seconds, doubling on every further
+    refusal up to ``max_backoff``, and resumes by itself. A 429 while
+    polling a run that already started pauses the queue the same way, and
+    the run is polled again after the pause, never launched again.
+    ``max_queued`` bounds the number of waiting jobs (admission control).
+    """
+
+    def __init__(
+        self,
+        client: Client,
+        max_in_flight: int = 4,
+        max_queued: Optional[int] = None,
+        backoff: float = 5.0,
+        max_backoff: float = 300.0,
+        timeout: int = 600,
+        poll_interval: float = 1.0,
+    ):
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight should be at least 1.")
+        self._client = client
+        self._max_queued = max_queued
+        self._base_backoff = backoff
+        self._max_backoff = max_backoff
+        self._backoff = backoff
+        self._timeout = timeout
+        self._poll_interval = poll_interval
+
+        self._heap: List[Job] = []
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._paused_until = 0.0
+        self._in_flight = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._throttled = 0
+        self._waits: Deque[float] = deque(maxlen=1000)
+
+        self._workers = [
+            threading.Thread(target=self._work, name=f"aihero-launch-{i}", daemon=True)
+            for i in range(max_in_flight)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(
+        self,
+        project_id: str,
+        workflow_id: str,
+        priority: int = 0,
+        block: bool = True,
+    ) -> "Future[Any]":
+        """Queue a launch; the future resolves to the finished Workflow.
+
+        When the queue holds ``max_queued`` jobs, waits for room, or raises
+        AIHeroException right away if ``block`` is False.
+        """
+        future: "Future[Any]" = Future()
+        with self._cond:
+            while self._max_queued is not None and len(self._heap) >= self._max_queued:
+                if not block:
+                    raise AIHeroException("Launch queue is full", status_code=429)
+                self._cond.wait()
+            if self._closed:
+                raise AIHeroException("Launch queue is closed")
+            heapq.heappush(
+                self._heap,
+                (
+                    priority,
+                    self._seq,
+                    time.monotonic(),
+                    project_id,
+                    workflow_id,
+                    future,
+                    # The job runs in the submitter's context, e.g. its Deadline
+                    copy_context(),
+                ),
+            )
+            self._seq += 1
+            self._submitted += 1
+            self._cond.notify_all()
+        return future
+
+    def _next_job(self) -> Optional[Job]:
+        """Wait for a job, honouring pauses. None once closed and drained."""
+        with self._cond:
+            while True:
+                if self._closed and not self._heap:
+                    return None
+                delay = self._paused_until - time.monotonic()
+                if self._heap and delay <= 0:
+                    job = heapq.heappop(self._heap)
+                    self._in_flight += 1
+                    self._waits.append(time.monotonic() - job[2])
+                    self._cond.notify_all()
+                    return job
+                self._cond.wait(timeout=delay if delay > 0 else None)
+
+    def _work(self) -> None:
+        """Worker loop: launch jobs until the queue is closed."""
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            future, context = job[5], job[6]
+            # Requeued jobs are already running; only fresh ones can be cancelled
+            if not future.running() and not future.set_running_or_notify_cancel():
+                with self._cond:
+                    self._in_flight -= 1
+                continue
+            try:
+                workflow = context.run(self._run, job)
+            except Exception as exc:  # pylint: disable=broad-except
+                self._finish(future, exc=exc)
+            else:
+                if workflow is not None:
+                    self._finish(future, result=workflow)
+
+    def _run(self, job: Job) -> Optional[Workflow]:
+        """Launch a job and wait for its run; None if the launch was refused and requeued."""
+        with Deadline(self._timeout):
+            try:
+                workflow = self._client._start_run(job[3], job[4])
+            except AIHeroException as exc:
+                if exc.status_code in THROTTLE_STATUS_CODES:
+                    self._throttle(job)
+                    return None
+                raise
+            # The run started: from here on it is only polled
+            while True:
+                try:
+                    return self._client._wait_for_run(workflow, self._poll_interval)
+                except AIHeroException as exc:
+                    if exc.status_code != 429:
+                        raise
+                    sleep(self._pause())
+
+    def _pause(self) -> float:
+        """Pause the queue for the current back-off, which doubles; returns the pause."""
+        with self._cond:
+            pause = self._backoff
+            self._throttled += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + pause)
+            self._backoff = min(self._backoff * 2, self._max_backoff)
+            self._cond.notify_all()
+        return pause
+
+    def _throttle(self, job: Job) -> None:
+        """Requeue a refused job and pause the queue."""
+        self._pause()
+        # The same future is requeued; it is already marked running and will
+        # not be cancelled meanwhile.
+        with self._cond:
+            self._in_flight -= 1
+            heapq.heappush(self._heap, job)
+            self._cond.notify_all()
+
+    def _finish(
+        self,
+        future: "Future[Any]",
+        result: Any = None,
+        exc: Optional[BaseException] = None,
+    ) -> None:
+        """Resolve a job and update the counters."""
+        with self._cond:
+            self._in_flight -= 1
+            if exc is None:
+                self._completed += 1
+                self._backoff = self._base_backoff
+            else:
+                self._failed += 1
+            self._cond.notify_all()
+        if exc is None:
+            future.set_result(result)
+        else:
+            future.set_exception(exc)
+
+    def metrics(self) -> QueueMetrics:
+        """Current queue depth, in-flight count, pause and wait-time metrics."""
+        with self._cond:
+            waits = sorted(self._waits)
+            return QueueMetrics(
+                depth=len(self._heap),
+                in_flight=self._in_flight,
+                paused_for=max(0.0, self._paused_until - time.monotonic()),
+                submitted=self._submitted,
+                completed=self._completed,
+                failed=self._failed,
+                throttled=self._throttled,
+                wait_p50=statistics.median(waits) if waits else 0.0,
+                # Nearest rank, so that p95 is never below p50
+                wait_p95=waits[math.ceil(0.95 * len(waits)) - 1] if waits else 0.0,
+                wait_max=waits[-1] if waits else 0.0,
+            )
+
+    def close(self, wait: bool = True, cancel_pending: bool = False) -> None:
+        """Stop accepting jobs; optionally cancel waiting ones and wait for the rest."""
+        with self._cond:
+            self._closed = True
+            if cancel_pending:
+                for job in self._heap:
+                    if not job[5].cancel():
+                        job[5].set_exception(AIHeroException("Launch queue closed"))
+                self._heap.clear()
+            self._cond.notify_all()
+        if wait:
+            for worker in self._workers:
+                worker.join()
+
+    def __enter__(self) -> "LaunchQueue":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
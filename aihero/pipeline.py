@@ -0,0 +1,270 @@
+"""Pipelines chaining workflows, where outputs of some workflows feed the steps of others."""
+
+import hashlib
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextvars import copy_context
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+from .client import Client
+from .exceptions import AIHeroException
+from .schema import JObject, Step, Workflow
+
+StepsBuilder = Callable[[Dict[str, Any]], List[Step]]
+
+
+def final_output(workflow: Workflow) -> Any:
+    """Output of a workflow: the last JObject.json_object or markdown in its steps."""
+    for step in reversed(workflow.steps):
+        if isinstance(step, JObject):
+            if step.json_object:
+                return step.json_object
+            continue
+        markdown = getattr(step, "markdown", None)
+        if markdown:
+            return markdown
+    return None
+
+
+@dataclass
+class Node:
+    """A workflow in a pipeline.
+
+    ``steps`` is either a list of steps or a function building them from
+    the outputs of the nodes in ``depends_on`` (a dict keyed by node name).
+    """
+
+    name: str
+    steps: Union[List[Step], StepsBuilder]
+    depends_on: List[str] = field(default_factory=list)
+    description: str = ""
+    output: Callable[[Workflow], Any] = final_output
+
+
+@dataclass
+class NodeResult:
+    """Outcome of one node, with times in seconds since the start of the run."""
+
+    name: str
+    output: Any
+    workflow_id: Optional[str]
+    cached: bool
+    started: float
+    finished: float
+
+    @property
+    def duration(self) -> float:
+        """Time spent running the node."""
+        return self.finished - self.started
+
+
+@dataclass
+class PipelineResult:
+    """Results of a pipeline run and its critical path."""
+
+    results: Dict[str, NodeResult]
+    critical_path: List[str]
+    critical_path_seconds: float
+    wall_seconds: float
+
+    @property
+    def outputs(self) -> Dict[str, Any]:
+        """Output of every node, by name."""
+        return {name: result.output for name, result in self.results.items()}
+
+
+class Pipeline:
+    """Run workflows as a DAG with as much parallelism as the dependencies allow.
+
+    Independent nodes run concurrently, at most ``max_concurrency`` at a
+    time. Each node's output is cached by a hash of its steps (which embed
+    its inputs), in memory and in ``cache_dir`` when given, so rerunning a
+    pipeline skips nodes whose inputs did not change.
+    """
+
+    def __init__(
+        self,
+        client: Client,
+        project_id: str,
+        max_concurrency: int = 4,
+        cache_dir: Optional[Union[str, Path]] = None,
+        timeout: int = 600,
+        poll_interval: float = 1.0,
+    ):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency should be at least 1.")
+        self._client = client
+        self._project_id = project_id
+        self._max_concurrency = max_concurrency
+        self._cache_dir = Path(cache_dir) if cache_dir else None
+        self._cache: Dict[str, Dict[str, Any]] = {}
+        self._timeout = timeout
+        self._poll_interval = poll_interval
+        self.nodes: Dict[str, Node] = {}
+        if self._cache_dir:
+            self._cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def add(
+        self,
+        name: str,
+        steps: Union[List[Step], StepsBuilder],
+        depends_on: Sequence[str] = (),
+        description: str = "",
+        output: Callable[[Workflow], Any] = final_output,
+    ) -> "Pipeline":
+        """Add a node to the pipeline."""
+        if name in self.nodes:
+            raise ValueError(f"Node {name} already exists.")
+        self.nodes[name] = Node(name, steps, list(depends_on), description, output)
+        return self
+
+    def _check(self) -> None:
+        """Check that dependencies exist and form no cycle."""
+        for node in self.nodes.values():
+            for dep in node.depends_on:
+                if dep not in self.nodes:
+                    raise ValueError(f"Node {node.name} depends on unknown node {dep}.")
+        visiting: Dict[str, bool] = {}
+
+        def visit(name: str) -> None:
+            if visiting.get(name) is False:
+                return
+            if visiting.get(name):
+                raise ValueError(f"Pipeline has a cycle through node {name}.")
+            visiting[name] = True
+            for dep in self.nodes[name].depends_on:
+                visit(dep)
+            visiting[name] = False
+
+        for name in self.nodes:
+            visit(name)
+
+    @staticmethod
+    def _cache_key(node: Node, steps: List[Step]) -> str:
+        """Hash of the node definition; step ids are generated, so left out."""
+        spec = [step.model_dump(mode="json", exclude={"step_id"}) for step in steps]
+        encoded = json.dumps(
+            [node.name, node.description, spec], sort_keys=True, default=str
+        )
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def _cached(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up a cached node result."""
+        if key in self._cache:
+            return self._cache[key]
+        if self._cache_dir:
+            path = self._cache_dir / f"{key}.json"
+            if path.exists():
+                self._cache[key] = json.loads(path.read_text(encoding="utf-8"))
+                return self._cache[key]
+        return None
+
+    def _store(self, key: str, entry: Dict[str, Any]) -> None:
+        """Cache a node result."""
+        self._cache[key] = entry
+        if self._cache_dir:
+            path = self._cache_dir / f"{key}.json"
+            path.write_text(json.dumps(entry, default=str), encoding="utf-8")
+
+    def _run_node(self, node: Node, inputs: Dict[str, Any], t0: float) -> NodeResult:
+        """Create and launch the node's workflow, unless its result is cached."""
+        started = time.perf_counter() - t0
+        steps = node.steps(inputs) if callable(node.steps) else node.steps
+        key = self._cache_key(node, steps)
+        entry = self._cached(key)
+        if entry is not None:
+            return NodeResult(
+                node.name,
+                entry["output"],
+                entry["workflow_id"],
+                True,
+                started,
+                time.perf_counter() - t0,
+            )
+
+        workflow = self._client.create_workflow(
+            self._project_id, node.name, node.description, steps
+        )
+        workflow = self._client.launch_workflow(
+            self._project_id,
+            workflow.workflow_id,
+            timeout=self._timeout,
+            poll_interval=self._poll_interval,
+        )
+        if workflow.status != "success":
+            raise AIHeroException(
+                f"Pipeline node {node.name} finished with status {workflow.status.value}"
+            )
+        output = node.output(workflow)
+        self._store(key, {"output": output, "workflow_id": workflow.workflow_id})
+        return NodeResult(
+            node.name,
+            output,
+            workflow.workflow_id,
+            False,
+            started,
+            time.perf_counter() - t0,
+        )
+
+    def _critical_path(self, results: Dict[str, NodeResult]) -> List[str]:
+        """Chain of dependent nodes with the longest total duration."""
+        finish: Dict[str, float] = {}
+        via: Dict[str, Optional[str]] = {}
+
+        def earliest_finish(name: str) -> float:
+            if name not in finish:
+                deps = self.nodes[name].depends_on
+                slowest = max(deps, key=earliest_finish) if deps else None
+                via[name] = slowest
+                finish[name] = results[name].duration + (
+                    earliest_finish(slowest) if slowest else 0.0
+                )
+            return finish[name]
+
+        if not results:
+            return []
+        name: Optional[str] = max(results, key=earliest_finish)
+        path = []
+        while name is not None:
+            path.append(name)
+            name = via[name]
+        return path[::-1]
+
+    def run(self) -> PipelineResult:
+        """Run every node once its dependencies are done."""
+        self._check()
+        t0 = time.perf_counter()
+        results: Dict[str, NodeResult] = {}
+        waiting = dict(self.nodes)
+        running: Dict["Future[NodeResult]", str] = {}
+
+        with ThreadPoolExecutor(max_workers=self._max_concurrency) as pool:
+            while waiting or running:
+                for name, node in list(waiting.items()):
+                    if all(dep in results for dep in node.depends_on):
+                        inputs = {dep: results[dep].output for dep in node.depends_on}
+                        future = pool.submit(
+                            copy_context().run, self._run_node, node, inputs, t0
+                        )
+                        running[future] = name
+                        del waiting[name]
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception:
+                        for pending in running:
+                            pending.cancel()
+                        raise
+
+        path = self._critical_path(results)
+        return PipelineResult(
+            results=results,
+            critical_path=path,
+            critical_path_seconds=sum(results[name].duration for name in path),
+            wall_seconds=time.perf_counter() - t0,
+        )
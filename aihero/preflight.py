@@ -0,0 +1,159 @@
+"""Local checks of workflow steps, to catch bad items before any request.
+
+Checks the mistakes the API answers with a 400 or a failed run: Files
+steps referencing files that were not uploaded, invalid Webpages URLs,
+empty instructions and queries, JSON schemas that do not compile and
+duplicate step ids. Schemas that only jsonschema can compile are not
+checked when it is not installed. Steps may be Step models or raw dicts
+(e.g. read from a JSONL file), so that bulk jobs can check items before
+parsing them::
+
+    preflight = client.preflight(project_id)
+    good, bad = preflight.split(items, steps=lambda item: item["steps"])
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, TypeVar
+
+import validators
+
+from .exceptions import SchemaDependencyError, SchemaError
+from .validation import compile_schema
+
+T = TypeVar("T")
+
+# Step types whose instruction should not be empty
+_INSTRUCTION_TYPES = {"instruction", "image"}
+
+_STEP_TYPES = {
+    "markdown",
+    "instruction",
+    "image",
+    "chat",
+    "note",
+    "webpages",
+    "files",
+    "object",
+    "query",
+}
+
+
+@dataclass
+class Issue:
+    """A problem found in a step (or in the step list when ``step`` is None)."""
+
+    step: Optional[int]
+    step_id: Optional[str]
+    message: str
+
+    def __str__(self) -> str:
+        if self.step is None:
+            return self.message
+        return f"step {self.step} ({self.step_id}): {self.message}"
+
+
+@lru_cache(maxsize=65536)
+def _valid_url(url: str) -> bool:
+    """Whether a URL is valid; each URL is only checked once per process."""
+    return bool(validators.url(url))
+
+
+def _field(step: Any, name: str) -> Any:
+    """Field of a Step or of a raw step dict."""
+    if isinstance(step, dict):
+        return step.get(name)
+    return getattr(step, name, None)
+
+
+class Preflight:
+    """Checks step lists without network calls.
+
+    ``uploaded`` lists the file names uploaded to the project; Files steps
+    are not checked against it when it is None.
+    """
+
+    def __init__(self, uploaded: Optional[Iterable[str]] = None):
+        self.uploaded: Optional[Set[str]] = None if uploaded is None else set(uploaded)
+
+    def _check_step(self, step: Any) -> List[str]:
+        """Problems of one step."""
+        step_type = _field(step, "type") or "markdown"
+        step_type = str(getattr(step_type, "value", step_type))
+        if step_type not in _STEP_TYPES:
+            return [f"Unknown step type {step_type}"]
+        problems = []
+        if step_type in _INSTRUCTION_TYPES:
+            if not (_field(step, "instruction") or "").strip():
+                problems.append("Empty instruction")
+        elif step_type == "query":
+            if not (_field(step, "query") or "").strip():
+                problems.append("Empty search query")
+        elif step_type == "webpages":
+            urls = _field(step, "urls") or []
+            if not urls:
+                problems.append("No webpages")
+            problems.extend(f"Invalid URL {url}" for url in urls if not _valid_url(url))
+        elif step_type == "files":
+            files = _field(step, "files") or []
+            if not files:
+                problems.append("No files")
+            if self.uploaded is not None:
+                problems.extend(
+                    f"File {name} was not uploaded"
+                    for name in files
+                    if Path(name).name not in self.uploaded
+                )
+        elif step_type == "object":
+            try:
+                compile_schema(_field(step, "json_schema") or {})
+            except SchemaDependencyError:
+                # Valid or not, it cannot be checked here: leave it to the API
+                pass
+            except SchemaError as exc:
+                problems.append(f"Invalid JSON schema: {exc.message}")
+        return problems
+
+    def check(self, steps: List[Any]) -> List[Issue]:
+        """Issues of a step list, empty if it can be sent."""
+        if not steps:
+            return [Issue(None, None, "No steps")]
+        issues = []
+        seen: Set[str] = set()
+        for i, step in enumerate(steps):
+            step_id = _field(step, "step_id")
+            for message in self._check_step(step):
+                issues.append(Issue(i, step_id, message))
+            if step_id:
+                if step_id in seen:
+                    issues.append(Issue(i, step_id, "Duplicate step_id"))
+                seen.add(step_id)
+        return issues
+
+    def check_many(self, step_lists: Iterable[List[Any]]) -> Dict[int, List[Issue]]:
+        """Issues of many step lists, by position; lists without issues are left out."""
+        failures = {}
+        for i, steps in enumerate(step_lists):
+            issues = self.check(steps)
+            if issues:
+                failures[i] = issues
+        return failures
+
+    def split(
+        self, items: Iterable[T], steps: Optional[Callable[[T], List[Any]]] = None
+    ) -> Tuple[List[T], List[Tuple[T, List[Issue]]]]:
+        """Items that pass, and the others with their issues.
+
+        ``steps`` gets the step list of an item, e.g. ``lambda obj: obj["steps"]``;
+        by default the items are step lists.
+        """
+        passed: List[T] = []
+        failed: List[Tuple[T, List[Issue]]] = []
+        for item in items:
+            issues = self.check(steps(item) if steps is not None else item)  # type: ignore[arg-type]
+            if issues:
+                failed.append((item, issues))
+            else:
+                passed.append(item)
+        return passed, failed
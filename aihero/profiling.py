@@ -0,0 +1,345 @@
+"""Sampling profiler for the time (and memory) spent in the SDK.
+
+A background thread samples the stacks of the threads running SDK code
+every ``interval`` seconds, so the overhead does not depend on how often
+the hot paths are called and stays low enough for production::
+
+    profiler = Profiler().start()
+    ...
+    print(profiler.summary())
+    profiler.dump("aihero.collapsed")  # for flamegraph.pl or speedscope
+
+Time is wall-clock: a thread waiting for a response counts as waiting on
+the network. With ``allocations=True``, tracemalloc also records which SDK
+functions allocated the memory still in use, at a much higher cost.
+
+Setting ``AI_HERO_PROFILE=1`` (or true, yes, on) starts a profiler when
+aihero.client is imported, sampling every ``AI_HERO_PROFILE_INTERVAL_MS``
+milliseconds (10 by default). The collapsed stacks are written at exit to
+``AI_HERO_PROFILE_OUTPUT`` if set, and ``AI_HERO_PROFILE_ALLOCATIONS=1``
+enables allocation tracking. Invalid settings are ignored with a warning.
+"""
+
+import ast
+import atexit
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import warnings
+from collections import defaultdict
+from functools import lru_cache
+from types import FrameType
+from typing import Dict, List, Optional, Tuple
+from weakref import WeakSet
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Where the time goes, by the top-level package of the innermost frame
+# belonging to one of them
+CATEGORIES = {
+    "httpx": "network",
+    "httpcore": "network",
+    "h11": "network",
+    "ssl": "network",
+    "socket": "network",
+    "selectors": "network",
+    "json": "JSON",
+    "pydantic": "pydantic",
+    "pydantic_core": "pydantic",
+    "validators": "validators",
+    "url_normalize": "validators",
+    "threading": "waiting",
+    "queue": "waiting",
+    "concurrent": "waiting",
+    "aihero": "aihero",
+}
+
+Stack = Tuple[str, ...]
+
+# Running profilers, restarted in forked children (threads do not survive a fork)
+_running: "WeakSet[Profiler]" = WeakSet()
+
+
+def _after_fork_in_child() -> None:
+    for profiler in list(_running):
+        profiler._thread = None
+        profiler._lock = threading.Lock()
+        profiler.start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def _label(frame: FrameType) -> str:
+    """module:function of a frame."""
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{frame.f_globals.get('__name__', '?')}:{name}"
+
+
+def _in_package(filename: str) -> bool:
+    return filename.startswith(PACKAGE_DIR)
+
+
+def _category(stack: Stack) -> str:
+    """Category of the code a sampled thread was running."""
+    for label in reversed(stack):
+        category = CATEGORIES.get(label.split(".", 1)[0].split(":", 1)[0])
+        if category is not None:
+            return category
+    return "other"
+
+
+@lru_cache(maxsize=None)
+def _functions(filename: str) -> List[Tuple[int, int, str]]:
+    """(first line, last line, qualified name) of the functions of a source file."""
+    try:
+        with open(filename, encoding="utf-8") as f:
+            tree = ast.parse(f.read())
+    except (OSError, SyntaxError):
+        return []
+    functions = []
+
+    def visit(node: ast.AST, prefix: str) -> None:
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                name = prefix + child.name
+                functions.append((child.lineno, child.end_lineno or child.lineno, name))
+                visit(child, name + ".<locals>.")
+            elif isinstance(child, ast.ClassDef):
+                visit(child, prefix + child.name + ".")
+
+    visit(tree, "")
+    return functions
+
+
+def _function_at(filename: str, lineno: int) -> str:
+    """module:function containing a line of a file of the package."""
+    module = "aihero." + os.path.splitext(os.path.relpath(filename, PACKAGE_DIR))[0]
+    module = module.replace(os.sep, ".")
+    name = "<module>"
+    span = None
+    for first, last, qualname in _functions(filename):
+        # The innermost function is the shortest one containing the line
+        if first <= lineno <= last and (span is None or last - first < span):
+            name, span = qualname, last - first
+    return f"{module}:{name}"
+
+
+class Profiler:
+    """Samples the stacks of the threads running SDK code.
+
+    Stacks are kept from the outermost SDK frame down, so that time spent
+    in libraries (httpx, json, pydantic, validators) is attributed to the
+    SDK function that called them.
+    """
+
+    def __init__(self, interval: float = 0.01, allocations: bool = False):
+        self.interval = interval
+        self.allocations = allocations
+        self.stacks: Dict[Stack, float] = defaultdict(float)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started_tracemalloc = False
+
+    def start(self) -> "Profiler":
+        """Start sampling in a background thread."""
+        if self._thread is not None:
+            return self
+        if self.allocations and not tracemalloc.is_tracing():
+            tracemalloc.start(32)
+            self._started_tracemalloc = True
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="aihero-profiler", daemon=True
+        )
+        self._thread.start()
+        _running.add(self)
+        return self
+
+    def stop(self) -> None:
+        """Stop sampling; the samples taken so far are kept."""
+        if self._thread is None:
+            return
+        _running.discard(self)
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def reset(self) -> None:
+        """Drop the samples taken so far."""
+        with self._lock:
+            self.stacks.clear()
+        if tracemalloc.is_tracing():
+            tracemalloc.clear_traces()
+
+    def __enter__(self) -> "Profiler":
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            # Weighted by the time since the last sample, which may be
+            # longer than the interval when the GIL is busy
+            weight = now - last
+            last = now
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = self._sdk_stack(frame)
+                if stack:
+                    with self._lock:
+                        self.stacks[stack] += weight
+
+    @staticmethod
+    def _sdk_stack(frame: Optional[FrameType]) -> Optional[Stack]:
+        """Labels of a thread's frames from the outermost SDK frame, None outside the SDK."""
+        frames = []
+        outermost = None
+        while frame is not None:
+            frames.append(frame)
+            if _in_package(frame.f_code.co_filename):
+                outermost = len(frames)
+            frame = frame.f_back
+        if outermost is None:
+            return None
+        return tuple(_label(f) for f in reversed(frames[:outermost]))
+
+    def _samples(self) -> Dict[Stack, float]:
+        with self._lock:
+            return dict(self.stacks)
+
+    def collapsed(self) -> str:
+        """Stacks in the collapsed format of flamegraph.pl, in microseconds."""
+        lines = [
+            f"{';'.join(stack)} {round(seconds * 1e6)}"
+            for stack, seconds in sorted(self._samples().items())
+        ]
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def dump(self, path: str) -> None:
+        """Write the collapsed stacks to a file."""
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.collapsed())
+
+    def summary(self, limit: int = 20) -> str:
+        """Tables of the time by SDK function and by category, and of the memory allocated."""
+        total: Dict[str, float] = defaultdict(float)
+        own: Dict[str, float] = defaultdict(float)
+        by_category: Dict[str, float] = defaultdict(float)
+        for stack, seconds in self._samples().items():
+            sdk = [label for label in stack if label.startswith("aihero.")]
+            for label in set(sdk):
+                total[label] += seconds
+            own[sdk[-1]] += seconds
+            by_category[_category(stack)] += seconds
+
+        lines = [f"{'SDK function':60} {'total ms':>10} {'own ms':>10}"]
+        for label in sorted(total, key=lambda label: -total[label])[:limit]:
+            lines.append(
+                f"{label:60} {total[label] * 1000:10.1f} {own[label] * 1000:10.1f}"
+            )
+        lines.append("")
+        lines.append(f"{'Running':60} {'ms':>10} {'share':>10}")
+        all_time = sum(by_category.values()) or 1.0
+        for category, seconds in sorted(by_category.items(), key=lambda kv: -kv[1]):
+            lines.append(
+                f"{category:60} {seconds * 1000:10.1f} {seconds / all_time:10.1%}"
+            )
+        if tracemalloc.is_tracing():
+            lines.append("")
+            lines.append(f"{'Allocated by (in use)':60} {'blocks':>10} {'kB':>10}")
+            for label, (count, size) in self.allocations_by_function()[:limit]:
+                lines.append(f"{label:60} {count:10d} {size / 1000:10.1f}")
+        return "\n".join(lines)
+
+    @staticmethod
+    def allocations_by_function() -> List[Tuple[str, Tuple[int, int]]]:
+        """Blocks and bytes in use by the innermost SDK function that allocated them."""
+        by_function: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+        for stat in tracemalloc.take_snapshot().statistics("traceback"):
+            # Frames are ordered from the oldest to the most recent call
+            for frame in reversed(stat.traceback):
+                if _in_package(frame.filename):
+                    totals = by_function[_function_at(frame.filename, frame.lineno)]
+                    totals[0] += stat.count
+                    totals[1] += stat.size
+                    break
+        return sorted(
+            ((label, (c, s)) for label, (c, s) in by_function.items()),
+            key=lambda item: -item[1][1],
+        )
+
+
+_profiler: Optional[Profiler] = None
+
+
+def get_profiler() -> Optional[Profiler]:
+    """The profiler started from the environment, if any."""
+    return _profiler
+
+
+_ON = ("1", "true", "yes", "on")
+_OFF = ("", "0", "false", "no", "off")
+DEFAULT_INTERVAL_MS = 10.0
+
+
+def _interval_from_env() -> float:
+    """Sampling interval in seconds from AI_HERO_PROFILE_INTERVAL_MS."""
+    setting = os.environ.get("AI_HERO_PROFILE_INTERVAL_MS", "").strip()
+    if not setting:
+        return DEFAULT_INTERVAL_MS / 1000
+    try:
+        milliseconds = float(setting)
+    except ValueError:
+        milliseconds = 0.0
+    if not 0 < milliseconds < float("inf"):
+        warnings.warn(
+            f"Ignoring AI_HERO_PROFILE_INTERVAL_MS={setting!r}, which is not a "
+            f"positive number of milliseconds; sampling every {DEFAULT_INTERVAL_MS:g} ms.",
+            RuntimeWarning,
+            stacklevel=3,
+        )
+        return DEFAULT_INTERVAL_MS / 1000
+    return milliseconds / 1000
+
+
+def start_from_env() -> Optional[Profiler]:
+    """Start a profiler if AI_HERO_PROFILE is on (once per process).
+
+    Never raises: it runs while aihero.client is imported, so an invalid
+    setting only warns.
+    """
+    global _profiler  # pylint: disable=global-statement
+    setting = os.environ.get("AI_HERO_PROFILE", "").strip().lower()
+    if setting in _OFF or _profiler is not None:
+        return _profiler
+    if setting not in _ON:
+        warnings.warn(
+            f"Ignoring AI_HERO_PROFILE={os.environ['AI_HERO_PROFILE']!r}: set it to 1 "
+            "to profile, and AI_HERO_PROFILE_INTERVAL_MS to change the interval.",
+            RuntimeWarning,
+            stacklevel=2,
+        )
+        return None
+    interval = _interval_from_env()
+    _profiler = Profiler(
+        interval=interval,
+        allocations=os.environ.get("AI_HERO_PROFILE_ALLOCATIONS") == "1",
+    ).start()
+    output = os.environ.get("AI_HERO_PROFILE_OUTPUT")
+    if output:
+        atexit.register(_profiler.dump, output)
+    return _profiler
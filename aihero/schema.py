@@ -12,18 +12,43 @@
 """Helper functions for pydantic schemas."""
 
 import json
+import re
+import weakref
 from abc import ABC
 from copy import deepcopy
 from datetime import datetime
 from enum import Enum
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Type,
+    TypeVar,
+    Union,
+)
 from uuid import uuid4
 
 import validators
-from pydantic import BaseModel, Field, SerializeAsAny, root_validator
+from pydantic import BaseModel, Field, PrivateAttr, SerializeAsAny, root_validator
 from url_normalize import url_normalize
 
+from .content_store import ContentRef
+
+if TYPE_CHECKING:
+    from .validation import Violation
+
+
+# {{name}} placeholders of aihero.template, left as they are by the validators
+PLACEHOLDER = re.compile(r"\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*\}\}")
+
+# Stand-in for the n-th placeholder of a title while it is normalized: no
+# cased characters, so capitalization leaves it alone.
+_HIDDEN = re.compile("\ue000([0-9]+)\ue000")
+
 
 def normalize_title(title: str) -> str:
     """Normalize the title."""
@@ -80,7 +105,18 @@ def normalize_markdown_titles(markdown: str) -> str:
         if line.startswith("#"):
             parts = line.split(" ", 1)
             if len(parts) > 1:
-                normalized_title = normalize_title(parts[1])
+                placeholders: List[str] = []
+
+                def hide(match: "re.Match[str]") -> str:
+                    placeholders.append(match.group(0))
+                    return f"\ue000{len(placeholders) - 1}\ue000"
+
+                normalized_title = normalize_title(PLACEHOLDER.sub(hide, parts[1]))
+                if placeholders:
+                    normalized_title = _HIDDEN.sub(
+                        lambda match: placeholders[int(match.group(1))],
+                        normalized_title,
+                    )
                 normalized_lines.append(f"{parts[0]} {normalized_title}")
             else:
                 normalized_lines.append(line)
@@ -115,6 +151,83 @@ class TypeEnum(str, Enum):
     QUERY = "query"
 
 
+S = TypeVar("S", bound="Step")
+
+
+def _pretty_json(obj: Any, content_cache: Optional[Dict[str, str]]) -> str:
+    """``json.dumps(obj, indent=2)``, memoized in content_cache.
+
+    The key is the compact dump, which runs in the C encoder and is about
+    five times faster than the indented one.
+    """
+    if content_cache is None:
+        return json.dumps(obj, indent=2)
+    key = "json:" + json.dumps(obj)
+    text = content_cache.get(key)
+    if text is None:
+        text = content_cache[key] = json.dumps(obj, indent=2)
+    return text
+
+
+def _documents(
+    tag: str, key: str, names: List[str], texts: Optional[Dict[str, Any]]
+) -> str:
+    """Processed texts of the documents of a step, each in its own tag."""
+    texts = texts or {}
+    return "\n".join(
+        f'<{tag} {key}="{name}">{texts.get(name) or ""}</{tag}>' for name in names
+    )
+
+
+# Step fields the Workflow indexes are keyed on
+_INDEXED_FIELDS = {"step_id", "type", "mode"}
+
+
+def _same_fields(model: BaseModel, other: Any) -> bool:
+    """Model equality on the fields only.
+
+    Private attributes hold parse, diff and index bookkeeping (``_source``,
+    ``_owners``, ``_index``), which pydantic would compare too.
+    """
+    if not isinstance(other, BaseModel):
+        return NotImplemented
+    return type(model) is type(other) and model.__dict__ == other.__dict__
+
+
+class _Owners:
+    """Step lists a step belongs to, told when an indexed field of the step is assigned.
+
+    Copies and unpickled steps start without owners (their new lists add
+    themselves).
+    """
+
+    __slots__ = ("refs",)
+
+    def __init__(self) -> None:
+        self.refs: List["weakref.ref[_StepList]"] = []
+
+    def add(self, steps: "_StepList") -> None:
+        if self.refs:
+            # Drop dead lists, and this one if already there
+            alive = ((ref, ref()) for ref in self.refs)
+            self.refs = [
+                ref for ref, owner in alive if owner is not None and owner is not steps
+            ]
+        self.refs.append(weakref.ref(steps))
+
+    def changed(self) -> None:
+        for ref in self.refs:
+            steps = ref()
+            if steps is not None:
+                steps.version += 1
+
+    def __reduce__(self) -> Any:
+        return (_Owners, ())
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "_Owners":
+        return _Owners()
+
+
 class Step(BaseModel, ABC):
     """Step schema defining a step in the workflow."""
 
@@ -144,6 +257,13 @@ class Step(BaseModel, ABC):
         description="Optional error message associated with the step",
     )
 
+    # Raw dict the step was parsed from, kept by Workflow.from_dict and
+    # aihero.diff.merge_workflow to detect unchanged steps, and parsed again
+    # by aihero.diff.workflow_patch as the fetched state. The step was parsed
+    # from a copy, so in-place edits of its fields leave it as fetched.
+    _source: Optional[Dict[str, Any]] = PrivateAttr(default=None)
+    _owners: _Owners = PrivateAttr(default_factory=_Owners)
+
     @root_validator(pre=True)
     def check_step_id(cls, values: Any) -> Any:
         """Check if step_id is present."""
@@ -151,6 +271,22 @@ class Step(BaseModel, ABC):
             values["step_id"] = str(uuid4())
         return values
 
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if name in _INDEXED_FIELDS:
+            self._owners.changed()
+
+    def __eq__(self, other: Any) -> bool:
+        return _same_fields(self, other)
+
+    def llm_string(self, content_cache: Optional[Dict[str, str]] = None) -> str:
+        """Return the string needed for LLM, empty for steps the agent doesn't see.
+
+        content_cache, if given, memoizes rendered fragments across calls
+        and steps (see aihero.context.ContextRenderer).
+        """
+        return ""
+
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "Step":
         """Generate child class object."""
@@ -192,6 +328,10 @@ class Markdown(Step):
         values["markdown"] = normalize_markdown_titles(values["markdown"])
         return values
 
+    def llm_string(self, content_cache: Optional[Dict[str, str]] = None) -> str:
+        """Return the string needed for LLM."""
+        return self.markdown
+
 
 class Instruction(Step):
     """Instruction step schema extending the Step schema."""
@@ -239,6 +379,13 @@ class Instruction(Step):
             values["markdown"] = normalize_markdown_titles(values["markdown"])
         return values
 
+    def llm_string(self, content_cache: Optional[Dict[str, str]] = None) -> str:
+        """Return the string needed for LLM."""
+        to_return = f"<instruction>{self.instruction}</instruction>"
+        if self.markdown:
+            to_return += f"\n{self.markdown}"
+        return to_return
+
 
 class Image(Step):
     """Image step schema extending the Step schema."""
@@ -254,6 +401,13 @@ class Image(Step):
         description="Filename of the image generated",
     )
 
+    def llm_string(self, content_cache: Optional[Dict[str, str]] = None) -> str:
+        """Return the string needed for LLM."""
+        to_return = f"<instruction>{self.instruction}</instruction>"
+        if self.filename:
+            to_return += f"<image>{self.filename}</image>"
+        return to_return
+
 
 class Webpages(Step):
     """Webpages step schema extending the Step schema."""
@@ -268,7 +422,7 @@ class Webpages(Step):
         title="Metadata Webpages",
         description="Optional metadata for the webpages",
     )
-    processed_webpages: Optional[Dict[str, str]] = Field(
+    processed_webpages: Optional[Dict[str, Union[str, ContentRef]]] = Field(
         None,
         title="Processed Webpages",
         description="Optional processed content of the webpages",
@@ -284,16 +438,28 @@ class Webpages(Step):
         """Normalize the webpage."""
         if "urls" not in values:
             values["urls"] = []
+        urls = []
         for url in values["urls"]:
+            if PLACEHOLDER.search(url):
+                # Template URL: checked with a sample value, normalized once rendered
+                if not validators.url(PLACEHOLDER.sub("x", url)):
+                    raise ValueError(f"Invalid URL {url}")
+                urls.append(url)
+                continue
             if not validators.url(url):
                 raise ValueError(f"Invalid URL {url}")
-        values["urls"] = [url_normalize(url) for url in values["urls"]]
+            urls.append(url_normalize(url))
+        values["urls"] = urls
         if "processed_webpages" not in values:
             values["processed_webpages"] = {}
         if "metadata_webpages" not in values:
             values["metadata_webpages"] = {}
         return values
 
+    def llm_string(self, content_cache: Optional[Dict[str, str]] = None) -> str:
+        """Return the string needed for LLM, with the processed webpages."""
+        return _documents("webpage", "url", self.urls, self.processed_webpages)
+
 
 class Files(Step):
     """Files step schema extending the Step schema."""
@@ -303,7 +469,7 @@ class Files(Step):
         title="Files",
         description="List of filenames to analyze.",
     )
-    processed_files: Optional[Dict[str, str]] = Field(
+    processed_files: Optional[Dict[str, Union[str, ContentRef]]] = Field(
         None,
         title="Processed Files",
         description="Optional processed content of the files",
@@ -338,6 +504,10 @@ class Files(Step):
 
         return values
 
+    def llm_string(self, content_cache: Optional[Dict[str, str]] = None) -> str:
+        """Return the string needed for LLM, with the processed files."""
+        return _documents("file", "name", self.files, self.processed_files)
+
 
 class JObject(Step):
     """JSON step schema extending the Step schema."""
@@ -372,11 +542,22 @@ class JObject(Step):
             values["json_object"] = {}
         return values
 
-    def llm_string(self, content_cache: Optional[Dict[str, str]]) -> str:
+    def validate_result(self) -> List["Violation"]:
+        """Check json_object against json_schema; returns the violations, empty if valid.
+
+        The compiled schema is cached, see aihero.validation.
+        """
+        from .validation import compile_schema
+
+        return compile_schema(self.json_schema).errors(self.json_object)
+
+    def llm_string(self, content_cache: Optional[Dict[str, str]] = None) -> str:
         """Return the string needed for LLM."""
-        to_return = f"<schema>{json.dumps(self.json_schema, indent=2)}<schema>"
+        schema = _pretty_json(self.json_schema, content_cache)
+        to_return = f"<schema>{schema}<schema>"
         if self.json_object:
-            to_return += f"<object>{json.dumps(self.json_object, indent=2)}<objcet>"
+            obj = _pretty_json(self.json_object, content_cache)
+            to_return += f"<object>{obj}<objcet>"
         return to_return
 
 
@@ -406,6 +587,14 @@ class Chat(Step):
             values["messages"] = []
         return values
 
+    def llm_string(self, content_cache: Optional[Dict[str, str]] = None) -> str:
+        """Return the string needed for LLM."""
+        lines = []
+        for message in self.messages:
+            role = message.get("role", "user")
+            lines.append(f"<{role}>{message.get('content', '')}</{role}>")
+        return "\n".join(lines)
+
 
 class Search(Step):
     """Search step schema extending the Step schema."""
@@ -438,6 +627,13 @@ class Search(Step):
             values["query"] = ""
         return values
 
+    def llm_string(self, content_cache: Optional[Dict[str, str]] = None) -> str:
+        """Return the string needed for LLM."""
+        to_return = f"<query>{self.query}</query>"
+        if self.result:
+            to_return += f"<result>{_pretty_json(self.result, content_cache)}</result>"
+        return to_return
+
 
 class Note(Step):
     """Documentation that the agent doesn't see. For humans."""
@@ -579,14 +775,170 @@ class Workflow(BaseModel):
         description="Version of the workflow",
     )
 
+    # Raw dict of the workflow as last fetched
+    _source: Optional[Dict[str, Any]] = PrivateAttr(default=None)
+    _index: Optional["_StepIndex"] = PrivateAttr(default=None)
+
+    def model_post_init(self, __context: Any) -> None:
+        self.steps = self.steps
+
+    def __eq__(self, other: Any) -> bool:
+        return _same_fields(self, other)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name == "steps" and type(value) is not _StepList:
+            value = _StepList(value)
+        super().__setattr__(name, value)
+
+    def _step_index(self) -> "_StepIndex":
+        """Indexes of the steps, rebuilt after the steps changed."""
+        index = self._index
+        if index is None or not index.matches(self.steps):
+            index = self._index = _StepIndex(self.steps)
+        return index
+
+    def get_step(self, step_id: str, step_type: Type[S] = Step) -> Optional[S]:  # type: ignore[assignment]
+        """Step with the given id, None if there is none.
+
+        Raises TypeError if the step is not a ``step_type``, e.g.
+        ``workflow.get_step(step_id, Instruction)``.
+        """
+        step = self._step_index().by_id.get(step_id)
+        if step is not None and not isinstance(step, step_type):
+            raise TypeError(
+                f"Step {step_id} is a {type(step).__name__}, not a {step_type.__name__}"
+            )
+        return step  # type: ignore[return-value]
+
+    def steps_of(self, step_type: Type[S]) -> List[S]:
+        """Steps of a class, e.g. ``workflow.steps_of(Files)``, in order."""
+        return list(self._step_index().by_class.get(step_type, ()))  # type: ignore[arg-type]
+
+    def steps_by_type(self, step_type: Union[TypeEnum, str]) -> List[Step]:
+        """Steps with the given ``type``, in order."""
+        return list(self._step_index().by_type.get(step_type, ()))
+
+    def steps_by_mode(self, mode: Union[ModeEnum, str]) -> List[Step]:
+        """Steps in the given ``mode``, e.g. ModeEnum.OUTPUT, in order."""
+        return list(self._step_index().by_mode.get(mode, ()))
+
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "Workflow":
         """Create a Workflow instance from a dictionary."""
         data_copy = deepcopy(data)
-        steps_data = data_copy.get("steps", [])
-        steps = [Step.from_dict(step) for step in steps_data]
+        steps = [Step.from_dict(step) for step in data_copy.get("steps", [])]
+        # The models share nested containers with the copy only, so the
+        # original is kept as the fetched state
+        for step, step_data in zip(steps, data.get("steps", [])):
+            step._source = step_data
         data_copy["steps"] = steps
-        return cls(**data_copy)
+        workflow = cls(**data_copy)
+        workflow._source = data
+        return workflow
+
+
+class _StepList(list):  # type: ignore[type-arg]
+    """Steps of a workflow, counting the changes that invalidate its index.
+
+    ``version`` is bumped by every mutation of the list and, through
+    ``Step._owners``, whenever the step_id, type or mode of one of its
+    steps is assigned.
+    """
+
+    # A class default, since unpickling extends the list before restoring it
+    version = 0
+
+    def __init__(self, steps: Iterable[Step] = ()):
+        super().__init__(steps)
+        self._adopt(self)
+
+    def _adopt(self, steps: Iterable[Any]) -> None:
+        for step in steps:
+            if isinstance(step, Step):
+                # Not step._owners: private attributes go through a slow __getattr__
+                step.__pydantic_private__["_owners"].add(self)
+
+    def _changed(self, added: Iterable[Any] = ()) -> None:
+        self.version += 1
+        self._adopt(added)
+
+    def __setitem__(self, index: Any, value: Any) -> None:
+        added = list(value) if isinstance(index, slice) else [value]
+        super().__setitem__(index, added if isinstance(index, slice) else value)
+        self._changed(added)
+
+    def __delitem__(self, index: Any) -> None:
+        super().__delitem__(index)
+        self._changed()
+
+    def __iadd__(self, steps: Iterable[Step]) -> "_StepList":  # type: ignore[override]
+        self.extend(steps)
+        return self
+
+    def __imul__(self, n: int) -> "_StepList":  # type: ignore[override]
+        super().__imul__(n)
+        self._changed()
+        return self
+
+    def append(self, step: Step) -> None:
+        super().append(step)
+        self._changed((step,))
+
+    def extend(self, steps: Iterable[Step]) -> None:
+        steps = list(steps)
+        super().extend(steps)
+        self._changed(steps)
+
+    def insert(self, index: Any, step: Step) -> None:
+        super().insert(index, step)
+        self._changed((step,))
+
+    def pop(self, index: Any = -1) -> Step:
+        step = super().pop(index)
+        self._changed()
+        return step
+
+    def remove(self, step: Step) -> None:
+        super().remove(step)
+        self._changed()
+
+    def clear(self) -> None:
+        super().clear()
+        self._changed()
+
+    def sort(self, *args: Any, **kwargs: Any) -> None:
+        super().sort(*args, **kwargs)
+        self._changed()
+
+    def reverse(self) -> None:
+        super().reverse()
+        self._changed()
+
+
+class _StepIndex:
+    """Steps of a workflow by step_id, class, type and mode.
+
+    The index is valid while the workflow holds the same step list (by
+    identity) and the list's version is unchanged, an O(1) check.
+    """
+
+    def __init__(self, steps: _StepList):
+        self.steps = steps
+        self.version = steps.version
+        self.by_id: Dict[Optional[str], Step] = {}
+        self.by_class: Dict[type, List[Step]] = {}
+        self.by_type: Dict[str, List[Step]] = {}
+        self.by_mode: Dict[str, List[Step]] = {}
+        for step in steps:
+            self.by_id.setdefault(step.step_id, step)
+            self.by_class.setdefault(type(step), []).append(step)
+            # str-valued enums hash like their values, so both work as keys
+            self.by_type.setdefault(step.type, []).append(step)
+            self.by_mode.setdefault(step.mode, []).append(step)
+
+    def matches(self, steps: _StepList) -> bool:
+        """Whether the index is still valid for the step list."""
+        return steps is self.steps and steps.version == self.version
 
 
 class Project(BaseModel):
@@ -0,0 +1,114 @@
+"""Step level events derived from successive polls of a running workflow."""
+
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, List, Optional, Set
+
+from .schema import ModeEnum, StatusEnum, Step, TypeEnum, Workflow
+
+# Modes in which the server is still working on a step
+_RUNNING_MODES = {ModeEnum.PROCESSING, ModeEnum.IMPROVING}
+# Workflow statuses of a run that is not over
+_ACTIVE_STATUSES = {StatusEnum.RUNNING, StatusEnum.PENDING}
+# Steps the server processes in a run without setting computed_at; other
+# steps without it (markdown, notes, images) are static
+_PROCESSED_TYPES = {TypeEnum.FILES, TypeEnum.WEBPAGES}
+
+
+class EventKind(str, Enum):
+    """Kind of a workflow stream event."""
+
+    STARTED = "started"
+    PARTIAL = "partial"
+    COMPLETED = "completed"
+    FINISHED = "finished"
+
+
+@dataclass
+class StepEvent:
+    """Event emitted while streaming a workflow run.
+
+    ``step`` and ``index`` are None for the final FINISHED event, whose
+    ``workflow`` is the completed workflow.
+    """
+
+    kind: EventKind
+    workflow: Workflow
+    step: Optional[Step] = None
+    index: Optional[int] = None
+
+    @property
+    def computed_at(self) -> Optional[int]:
+        """computed_at of the step, for steps that carry one."""
+        return getattr(self.step, "computed_at", None)
+
+
+def _is_running(step: Step) -> bool:
+    """Whether the server is still producing the step."""
+    return bool(getattr(step, "partial", False)) or step.mode in _RUNNING_MODES
+
+
+class StepDiffer:
+    """Turn successive snapshots of a workflow into step events.
+
+    The differ starts from the workflow as it was before the run, so steps
+    computed by an earlier run are only reported once their ``computed_at``
+    changes. Files and Webpages steps, which have no ``computed_at``,
+    complete when they leave a processing mode, or else when the run is
+    over. Static steps (Markdown, Note, Image) get no events.
+    """
+
+    def __init__(self, baseline: Workflow):
+        self._previous: Dict[str, Step] = {
+            step.step_id: step for step in baseline.steps if step.step_id
+        }
+        self._started: Set[str] = set()
+        # Steps without computed_at already reported COMPLETED in this run
+        self._completed: Set[str] = set()
+
+    def update(self, workflow: Workflow) -> List[StepEvent]:
+        """Events between the previous snapshot and this one."""
+        events: List[StepEvent] = []
+        finished = workflow.status not in _ACTIVE_STATUSES
+        for index, step in enumerate(workflow.steps):
+            step_id = step.step_id or ""
+            previous = self._previous.get(step_id)
+
+            def emit(kind: EventKind) -> None:
+                events.append(StepEvent(kind, workflow, step, index))
+
+            if _is_running(step):
+                if step_id not in self._started:
+                    self._started.add(step_id)
+                    emit(EventKind.STARTED)
+                    if getattr(step, "partial", False):
+                        emit(EventKind.PARTIAL)
+                elif previous is not None and previous is not step and previous != step:
+                    emit(EventKind.PARTIAL)
+                continue
+
+            computed_at = getattr(step, "computed_at", None)
+            if computed_at is None:
+                if step_id in self._started or (
+                    finished
+                    and step.type in _PROCESSED_TYPES
+                    and step_id not in self._completed
+                ):
+                    if step_id not in self._started:
+                        emit(EventKind.STARTED)
+                    emit(EventKind.COMPLETED)
+                    self._started.discard(step_id)
+                    self._completed.add(step_id)
+                continue
+            if (
+                previous is None
+                or getattr(previous, "computed_at", None) != computed_at
+                or _is_running(previous)
+            ):
+                if step_id not in self._started:
+                    emit(EventKind.STARTED)
+                emit(EventKind.COMPLETED)
+                self._started.discard(step_id)
+
+        self._previous = {step.step_id: step for step in workflow.steps if step.step_id}
+        return events
@@ -0,0 +1,196 @@
+"""Workflow templates for creating many similar workflows from parameter sets.
+
+Text in a template may contain ``{{name}}`` placeholders, e.g. in the
+workflow name or in step instructions::
+
+    template = WorkflowTemplate(
+        "ESG analysis - {{company}}",
+        "Extract ESG information from a 10-k filing.",
+        [Files(files=["{{filing}}"], ...), Instruction(instruction="...", ...)],
+    )
+    client.create_workflows(project_id, template, [{"company": ..., "filing": ...}])
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set
+from uuid import uuid4
+
+from .schema import PLACEHOLDER as _PLACEHOLDER
+from .schema import Step
+
+# Step fields set by the server when the workflow runs. They are left out of
+# fingerprints, so that a workflow which already ran is still a duplicate.
+_OUTPUT_FIELDS = {
+    "step_id",
+    "mode",
+    "error",
+    "partial",
+    "computed_at",
+    "feedback",
+    "json_object",
+    "result",
+    "processed_files",
+    "metadata_files",
+    "processed_webpages",
+    "metadata_webpages",
+}
+
+# Step types whose markdown is written by the user rather than computed
+_MARKDOWN_INPUT_TYPES = {"markdown", "note"}
+
+
+class _Compiled:
+    """Text split into literal chunks around its placeholders."""
+
+    def __init__(self, text: str):
+        self.chunks: List[str] = []
+        self.names: List[str] = []
+        start = 0
+        for match in _PLACEHOLDER.finditer(text):
+            self.chunks.append(text[start : match.start()])
+            self.names.append(match.group(1))
+            start = match.end()
+        self.chunks.append(text[start:])
+
+    def render(self, values: Dict[str, str]) -> str:
+        """Join the chunks with the values of the placeholders."""
+        parts = [self.chunks[0]]
+        for name, chunk in zip(self.names, self.chunks[1:]):
+            parts.append(values[name])
+            parts.append(chunk)
+        return "".join(parts)
+
+
+def _input_keys(step: Dict[str, Any]) -> List[str]:
+    """Keys of a dumped step that the user sets."""
+    keys = [key for key in step if key not in _OUTPUT_FIELDS]
+    if step.get("type") not in _MARKDOWN_INPUT_TYPES and "markdown" in keys:
+        keys.remove("markdown")
+    return sorted(keys)
+
+
+def _without_id(step: Dict[str, Any]) -> str:
+    """JSON of a step without its step_id and opening brace, to follow a new step_id."""
+    return json.dumps({k: v for k, v in step.items() if k != "step_id"})[1:]
+
+
+def _spec(
+    name: Any, description: Any, kind: Any, steps: List[Dict[str, Any]], keys: Any
+) -> Dict[str, Any]:
+    """Part of a workflow that identifies duplicates."""
+    return {
+        "name": name,
+        "description": description,
+        "kind": kind,
+        "steps": [
+            {key: step.get(key) for key in step_keys}
+            for step, step_keys in zip(steps, keys)
+        ],
+    }
+
+
+@dataclass
+class RenderedWorkflow:
+    """Workflow rendered from a template, ready to be posted."""
+
+    name: str
+    body: bytes
+    fingerprint: str
+    params: Dict[str, Any]
+
+
+class WorkflowTemplate:
+    """Base workflow whose text is filled in from a parameter set.
+
+    The workflow is serialized to JSON once. Rendering escapes the
+    parameter values and joins them with the pre-serialized chunks; only
+    the steps with placeholders are parsed again, so that the step
+    validators check and normalize the values filled in. Every rendered
+    workflow gets fresh step ids and a fingerprint of its content (without
+    outputs and ids) that identifies duplicates.
+    """
+
+    def __init__(
+        self, name: str, description: str, steps: List[Step], kind: str = "simple"
+    ):
+        kind = str(getattr(kind, "value", kind))
+        dumped = [step.model_dump(mode="json") for step in steps]
+        self._keys = [_input_keys(step) for step in dumped]
+        self._dumped = dumped
+        self._name = _Compiled(name)
+        self._description = _Compiled(description)
+        self._header = _Compiled(
+            json.dumps({"name": name, "kind": kind, "description": description})[:-1]
+        )
+        self._steps = [_Compiled(json.dumps(step)) for step in dumped]
+        # Serialized steps without their step id, for the steps without placeholders
+        self._static = [_without_id(step) for step in dumped]
+        self.kind = kind
+        self.parameters: Set[str] = set(self._header.names)
+        for step in self._steps:
+            self.parameters.update(step.names)
+
+    def _render_step(
+        self, i: int, raw: Dict[str, str], escaped: Dict[str, str]
+    ) -> Dict[str, Any]:
+        """Step i with the parameters filled in, validated if it has any."""
+        compiled = self._steps[i]
+        if not compiled.names:
+            return self._dumped[i]
+        data = json.loads(compiled.render(escaped))
+        try:
+            step = Step.from_dict(data)
+        except ValueError as exc:
+            params = {name: raw[name] for name in compiled.names}
+            raise ValueError(
+                f"Invalid step {i} with parameters {params}: {exc}"
+            ) from exc
+        return step.model_dump(mode="json")
+
+    def render(self, params: Dict[str, Any]) -> RenderedWorkflow:
+        """Fill in the placeholders; values are converted with str().
+
+        Raises ValueError if a parameter is missing or makes a step invalid.
+        """
+        missing = self.parameters - set(params)
+        if missing:
+            raise ValueError(f"Missing template parameters: {sorted(missing)}")
+        raw = {name: str(params[name]) for name in self.parameters}
+        # Values are JSON-escaped into string literals of the serialized body
+        escaped = {name: json.dumps(value)[1:-1] for name, value in raw.items()}
+        steps = [self._render_step(i, raw, escaped) for i in range(len(self._steps))]
+        name = self._name.render(raw)
+        spec = _spec(name, self._description.render(raw), self.kind, steps, self._keys)
+        body = [self._header.render(escaped), ', "steps": [']
+        for i, step in enumerate(steps):
+            if i:
+                body.append(", ")
+            # Fresh step ids, spliced in front of the other fields
+            body.append(f'{{"step_id": "{uuid4()}", ')
+            body.append(_without_id(step) if self._steps[i].names else self._static[i])
+        body.append("]}")
+        return RenderedWorkflow(
+            name=name,
+            body="".join(body).encode("utf-8"),
+            fingerprint=hashlib.sha256(
+                json.dumps(spec, sort_keys=True).encode("utf-8")
+            ).hexdigest(),
+            params=params,
+        )
+
+    def fingerprint_of(self, obj: Dict[str, Any]) -> Optional[str]:
+        """Fingerprint of a raw workflow dict, None if its steps do not fit the template."""
+        steps = obj.get("steps") or []
+        if len(steps) != len(self._keys):
+            return None
+        spec = _spec(
+            obj.get("name"),
+            obj.get("description", ""),
+            obj.get("kind", "simple"),
+            steps,
+            self._keys,
+        )
+        encoded = json.dumps(spec, sort_keys=True)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
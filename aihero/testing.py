@@ -0,0 +1,484 @@
+"""In-memory stand-in for the AI Hero API, for tests, benchmarks and offline development.
+
+Plug it into a client with ``Client(api_key, transport=StandInServer().transport())``,
+or serve it over HTTP with ``StandInServer().serve()``, e.g. behind several
+gateways for ``Client(api_key, endpoints=[...])``.
+"""
+
+import json
+import socket
+import threading
+import time
+from copy import deepcopy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Set, Tuple
+from uuid import uuid4
+
+import httpx
+
+from .compression import compress, decompress
+
+API_PREFIX = "/api/v1"
+
+# Responses smaller than this are sent uncompressed
+COMPRESS_RESPONSES_OVER = 1024
+
+
+def _json(status_code: int, obj: Any) -> httpx.Response:
+    """JSON response helper."""
+    return httpx.Response(status_code, json=obj)
+
+
+def _pointer(doc: Any, path: str) -> Tuple[Any, Any]:
+    """Container and key (or list index) that a JSON Pointer refers to."""
+    keys = [k.replace("~1", "/").replace("~0", "~") for k in path.split("/")[1:]]
+    for key in keys[:-1]:
+        doc = doc[int(key)] if isinstance(doc, list) else doc[key]
+    last = keys[-1]
+    if isinstance(doc, list):
+        return doc, len(doc) if last == "-" else int(last)
+    return doc, last
+
+
+def _apply(doc: Any, operation: Dict[str, Any]) -> None:
+    """Apply one JSON Patch (RFC 6902) operation in place; test and copy are not needed."""
+    op = operation["op"]
+    if op == "move":
+        parent, key = _pointer(doc, operation["from"])
+        value = parent.pop(key)
+        operation = {"op": "add", "path": operation["path"], "value": value}
+        op = "add"
+    parent, key = _pointer(doc, operation["path"])
+    if op == "add":
+        if isinstance(parent, list):
+            parent.insert(key, operation["value"])
+        else:
+            parent[key] = operation["value"]
+    elif op == "replace":
+        if isinstance(parent, dict) and key not in parent:
+            raise KeyError(key)
+        parent[key] = operation["value"]
+    elif op == "remove":
+        del parent[key]
+    else:
+        raise ValueError(f"Unsupported operation {op}")
+
+
+def _body(request: httpx.Request) -> bytes:
+    """Request body, decompressed according to its Content-Encoding."""
+    return decompress(request.read(), request.headers.get("Content-Encoding", ""))
+
+
+def _encode(request: httpx.Request, response: httpx.Response) -> httpx.Response:
+    """Compress a response body if the client accepts gzip or zstd, like a real server."""
+    accepted = [
+        e.strip() for e in request.headers.get("Accept-Encoding", "").split(",")
+    ]
+    body = response.content
+    if len(body) < COMPRESS_RESPONSES_OVER:
+        return response
+    for encoding in ("zstd", "gzip"):
+        if encoding in accepted:
+            headers = dict(response.headers)
+            headers.pop("content-length", None)
+            headers["Content-Encoding"] = encoding
+            return httpx.Response(
+                response.status_code,
+                headers=headers,
+                content=compress(body, encoding),
+            )
+    return response
+
+
+class StandInServer:
+    """Stand-in implementing the subset of the AI Hero API used by the Client.
+
+    ``pagination`` selects how the workflow list is paged: "offset" honours
+    ``limit``/``offset`` query params, "cursor" returns a ``next_cursor``,
+    and "none" ignores paging like the current production endpoint.
+    Launched workflows advance one step per status poll, which exercises
+    the client's polling paths, or with ``step_seconds`` one step every
+    ``step_seconds`` in a background thread, like a real run. When a run
+    finishes, the ``callback_url`` given at launch (if any) is POSTed the
+    workflow id, run id and status. ``latency`` adds a delay (seconds) to
+    every request.
+    """
+
+    def __init__(
+        self,
+        pagination: str = "offset",
+        latency: float = 0.0,
+        max_page_size: int = 1000,
+        step_seconds: Optional[float] = None,
+    ):
+        if pagination not in ("offset", "cursor", "none"):
+            raise ValueError("pagination should be 'offset', 'cursor' or 'none'.")
+        self.pagination = pagination
+        self.latency = latency
+        self.max_page_size = max_page_size
+        self.step_seconds = step_seconds
+        self.projects: Dict[str, Dict[str, Any]] = {}
+        self.workflows: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.files: Dict[str, Dict[str, bytes]] = {}
+        self.requests: List[Tuple[str, str]] = []
+        self._runs: Dict[str, int] = {}
+        self._callbacks: Dict[str, str] = {}
+        self._faults: List[List[Any]] = []
+        self._lock = threading.RLock()
+
+    def transport(self) -> httpx.MockTransport:
+        """httpx transport routing requests to this stand-in."""
+        return httpx.MockTransport(self.handle)
+
+    def serve(self, latency: float = 0.0, host: str = "127.0.0.1") -> "Gateway":
+        """Serve this stand-in over real HTTP, like one gateway in front of the API."""
+        return Gateway(self, latency=latency, host=host)
+
+    def fail_next(
+        self, method: str, path_suffix: str, status_code: int, times: int = 1
+    ) -> None:
+        """Answer the next ``times`` matching requests with an error status."""
+        with self._lock:
+            self._faults.append([method, path_suffix, status_code, times])
+
+    def _fault(self, method: str, path: str) -> Optional[httpx.Response]:
+        """Consume an injected fault matching the request, if any."""
+        for fault in self._faults:
+            if fault[0] == method and path.endswith(fault[1]):
+                fault[3] -= 1
+                if fault[3] <= 0:
+                    self._faults.remove(fault)
+                return _json(fault[2], {"detail": f"Injected {fault[2]}"})
+        return None
+
+    def add_project(self, project_id: str, **fields: Any) -> Dict[str, Any]:
+        """Create a project."""
+        project = {
+            "project_id": project_id,
+            "name": fields.pop("name", project_id),
+            "description": fields.pop("description", ""),
+            **fields,
+        }
+        with self._lock:
+            self.projects[project_id] = project
+            self.workflows.setdefault(project_id, {})
+        return project
+
+    def add_workflow(self, project_id: str, **fields: Any) -> Dict[str, Any]:
+        """Create a workflow, filling in the required fields."""
+        now = time.strftime("%Y-%m-%dT%H:%M:%S")
+        workflow = {
+            "project_id": project_id,
+            "workflow_id": fields.pop("workflow_id", None) or str(uuid4()),
+            "name": fields.pop("name", "Workflow"),
+            "description": fields.pop("description", ""),
+            "kind": fields.pop("kind", "simple"),
+            "status": fields.pop("status", "success"),
+            "archived": fields.pop("archived", False),
+            "steps": fields.pop("steps", []),
+            "created_at": now,
+            "updated_at": now,
+            "version": 1,
+            **fields,
+        }
+        for step in workflow["steps"]:
+            if not step.get("step_id"):
+                step["step_id"] = str(uuid4())
+        with self._lock:
+            if project_id not in self.projects:
+                self.add_project(project_id)
+            self.workflows[project_id][workflow["workflow_id"]] = workflow
+        return workflow
+
+    # Routing
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        """Handle one request."""
+        if self.latency:
+            time.sleep(self.latency)
+        path = request.url.path
+        if path.startswith(API_PREFIX):
+            path = path[len(API_PREFIX) :]
+        if path.startswith("/v1/"):
+            # upload_file uses a /v1 prefix on top of the API base url
+            path = path[len("/v1") :]
+        parts = [p for p in path.split("/") if p]
+        with self._lock:
+            self.requests.append((request.method, path))
+            fault = self._fault(request.method, path)
+            if fault is not None:
+                return fault
+            if len(parts) < 2 or parts[0] != "projects":
+                return _json(404, {"detail": "Not found"})
+            project_id = parts[1]
+            if project_id not in self.projects:
+                return _json(404, {"detail": "Could not find the project"})
+            response = self._route(request, project_id, parts[2:])
+        return _encode(request, response)
+
+    def _route(
+        self, request: httpx.Request, project_id: str, parts: List[str]
+    ) -> httpx.Response:
+        """Dispatch a request within a project."""
+        method = request.method
+        if not parts and method == "GET":
+            return _json(200, self.projects[project_id])
+        if parts[:2] == ["files", "uploads"] and len(parts) == 3 and method == "PUT":
+            self.files.setdefault(project_id, {})[parts[2]] = _body(request)
+            return _json(200, {"filename": parts[2]})
+        if parts[:2] != ["autonomous", "workflows"]:
+            return _json(404, {"detail": "Not found"})
+        parts = parts[2:]
+        if not parts:
+            if method == "GET":
+                return self._list(request, project_id)
+            if method == "POST":
+                return self._create(request, project_id)
+            return _json(405, {"detail": "Method not allowed"})
+        workflow = self.workflows[project_id].get(parts[0])
+        if workflow is None:
+            return _json(404, {"detail": "Could not find the workflow"})
+        if len(parts) == 1 and method == "GET":
+            if self.step_seconds is None:
+                self._advance(workflow)
+            return _json(200, workflow)
+        if len(parts) == 1 and method == "PATCH":
+            return self._patch(request, workflow)
+        if parts[1:] == ["launch"] and method == "POST":
+            return self._launch(request, workflow)
+        return _json(404, {"detail": "Not found"})
+
+    # Handlers
+
+    def _list(self, request: httpx.Request, project_id: str) -> httpx.Response:
+        """List workflows, filtered and paged according to the query params."""
+        params = request.url.params
+        workflows = list(self.workflows[project_id].values())
+        if "status" in params:
+            workflows = [w for w in workflows if w["status"] == params["status"]]
+        if "kind" in params:
+            workflows = [w for w in workflows if w["kind"] == params["kind"]]
+        if "archived" in params:
+            archived = params["archived"] == "true"
+            workflows = [w for w in workflows if bool(w["archived"]) == archived]
+        if self.pagination == "none" or "limit" not in params:
+            return _json(200, {"workflows": workflows})
+
+        limit = min(int(params["limit"]), self.max_page_size)
+        if self.pagination == "cursor":
+            start = int(params.get("cursor") or 0)
+            page = workflows[start : start + limit]
+            next_cursor = str(start + limit) if start + limit < len(workflows) else None
+            return _json(200, {"workflows": page, "next_cursor": next_cursor})
+        start = int(params.get("offset", 0))
+        page = workflows[start : start + limit]
+        return _json(200, {"workflows": page, "total": len(workflows)})
+
+    def _create(self, request: httpx.Request, project_id: str) -> httpx.Response:
+        """Create a workflow from the posted definition."""
+        body = json.loads(_body(request))
+        if not body.get("name"):
+            return _json(400, {"detail": "Please provide a name"})
+        workflow = self.add_workflow(project_id, **deepcopy(body))
+        return _json(200, workflow)
+
+    def _patch(
+        self, request: httpx.Request, workflow: Dict[str, Any]
+    ) -> httpx.Response:
+        """Apply JSON Patch operations, refusing them if the version is stale."""
+        body = json.loads(_body(request))
+        if "version" in body and body["version"] != workflow.get("version"):
+            return _json(409, {"detail": "Version mismatch"})
+        patched = deepcopy(workflow)
+        try:
+            for operation in body.get("operations", []):
+                _apply(patched, operation)
+        except (KeyError, IndexError, TypeError, ValueError) as exc:
+            return _json(400, {"detail": f"Invalid operation: {exc}"})
+        for step in patched["steps"]:
+            if not step.get("step_id"):
+                step["step_id"] = str(uuid4())
+        patched["version"] = (workflow.get("version") or 0) + 1
+        patched["updated_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        workflow.clear()
+        workflow.update(patched)
+        return _json(200, workflow)
+
+    def _launch(
+        self, request: httpx.Request, workflow: Dict[str, Any]
+    ) -> httpx.Response:
+        """Start a run; it progresses one step per status poll or per step_seconds."""
+        body = json.loads(_body(request) or b"{}")
+        workflow_id = workflow["workflow_id"]
+        workflow["status"] = "running"
+        workflow["run_id"] = str(uuid4())
+        workflow["start_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        workflow["end_at"] = None
+        self._runs[workflow_id] = 0
+        if body.get("callback_url"):
+            self._callbacks[workflow_id] = body["callback_url"]
+        else:
+            self._callbacks.pop(workflow_id, None)
+        if self.step_seconds is not None:
+            threading.Thread(
+                target=self._run, args=(workflow, workflow["run_id"]), daemon=True
+            ).start()
+        return _json(200, {"run_id": workflow["run_id"]})
+
+    def _run(self, workflow: Dict[str, Any], run_id: str) -> None:
+        """Advance a run in the background until it finishes or is relaunched."""
+        while True:
+            time.sleep(self.step_seconds or 0.0)
+            with self._lock:
+                if (
+                    workflow.get("run_id") != run_id
+                    or workflow["workflow_id"] not in self._runs
+                ):
+                    return
+                self._advance(workflow)
+
+    def _call_back(self, workflow: Dict[str, Any]) -> None:
+        """POST the outcome of a finished run to its callback URL, if any."""
+        url = self._callbacks.pop(workflow["workflow_id"], None)
+        if url is None:
+            return
+        payload = {
+            "workflow_id": workflow["workflow_id"],
+            "run_id": workflow.get("run_id"),
+            "status": workflow["status"],
+        }
+
+        def post() -> None:
+            try:
+                httpx.post(url, json=payload, timeout=5)
+            except httpx.HTTPError:
+                pass  # The client falls back to polling
+
+        # Not from the request handler: a callback must not delay the response
+        threading.Thread(target=post, daemon=True).start()
+
+    def _advance(self, workflow: Dict[str, Any]) -> None:
+        """Compute the next step of a running workflow.
+
+        Instruction steps first show up as partial output for one poll.
+        """
+        workflow_id = workflow["workflow_id"]
+        if workflow_id not in self._runs:
+            return
+        index = self._runs[workflow_id]
+        steps = workflow["steps"]
+        if index < len(steps):
+            step = steps[index]
+            output = f"Output for: {step.get('instruction', '')}"
+            if step.get("type") == "instruction" and not step.get("partial"):
+                step["partial"] = True
+                step["markdown"] = output[: len(output) // 2]
+            else:
+                if step.get("type") == "instruction":
+                    step["markdown"] = output
+                step["computed_at"] = int(time.time() * 1000)
+                step["partial"] = False
+                self._runs[workflow_id] = index + 1
+        if self._runs[workflow_id] >= len(steps):
+            del self._runs[workflow_id]
+            workflow["status"] = "success"
+            workflow["end_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+            workflow["run_time"] = 1.0
+            self._call_back(workflow)
+        workflow["updated_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+class _GatewayHandler(BaseHTTPRequestHandler):
+    """Forwards each request to the stand-in behind the gateway."""
+
+    server: "_GatewayServer"
+    protocol_version = "HTTP/1.1"
+    # Small responses would otherwise wait for the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    def _forward(self) -> None:
+        gateway = self.server.gateway
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        if gateway.latency:
+            time.sleep(gateway.latency)
+        if gateway.status_code is not None:
+            response = _json(gateway.status_code, {"detail": "Gateway unavailable"})
+        else:
+            request = httpx.Request(
+                self.command,
+                f"http://{self.headers.get('Host', 'gateway')}{self.path}",
+                headers=dict(self.headers.items()),
+                content=body,
+            )
+            response = gateway.stand_in.handle(request)
+        content = b"".join(response.stream)  # type: ignore[arg-type]
+        self.send_response(response.status_code)
+        for name, value in response.headers.items():
+            if name.lower() not in ("content-length", "transfer-encoding"):
+                self.send_header(name, value)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _forward
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        """Keep the gateway quiet."""
+
+
+class _GatewayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Any, gateway: "Gateway"):
+        self.gateway = gateway
+        self.connections: Set[socket.socket] = set()
+        super().__init__(address, _GatewayHandler)
+
+    def process_request(self, request: Any, client_address: Any) -> None:
+        self.connections.add(request)
+        super().process_request(request, client_address)
+
+    def shutdown_request(self, request: Any) -> None:
+        self.connections.discard(request)
+        super().shutdown_request(request)
+
+
+class Gateway:
+    """Local HTTP server in front of a StandInServer, e.g. one of several regions.
+
+    Change ``latency`` (seconds added to each request) or set
+    ``status_code`` (e.g. 503, answered to every request) to degrade it,
+    and close it to refuse connections.
+    """
+
+    def __init__(
+        self, stand_in: StandInServer, latency: float = 0.0, host: str = "127.0.0.1"
+    ):
+        self.stand_in = stand_in
+        self.latency = latency
+        self.status_code: Optional[int] = None
+        self._server = _GatewayServer((host, 0), self)
+        self.host, self.port = self._server.server_address[:2]
+        self.url = f"http://{self.host}:{self.port}/"
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="aihero-gateway", daemon=True
+        )
+        self._thread.start()
+
+    def close(self) -> None:
+        """Stop serving, drop the open connections and release the port."""
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        for connection in list(self._server.connections):
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def __enter__(self) -> "Gateway":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
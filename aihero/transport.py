@@ -0,0 +1,275 @@
+"""Record/replay transports for running Client traffic offline."""
+
+import asyncio
+import base64
+import gzip
+import hashlib
+import json
+import threading
+import time
+import weakref
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, Optional, Tuple, Union
+
+import httpx
+
+from .exceptions import AIHeroException
+
+# Headers that describe the wire encoding rather than the payload; the recorded
+# body is always stored decoded, so these would be wrong on replay.
+_DROPPED_HEADERS = {
+    "content-encoding",
+    "content-length",
+    "transfer-encoding",
+    "connection",
+    "date",
+    "set-cookie",
+}
+
+
+def _open_trace(path: Path, mode: str) -> Any:
+    """Open a trace file, gzip compressed if it ends with .gz"""
+    if path.suffix == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _body_digest(content: bytes) -> str:
+    """Short digest of a request body, used to tell apart requests to the same path."""
+    if not content:
+        return ""
+    return hashlib.sha1(content).hexdigest()[:16]
+
+
+def _request_path(request: httpx.Request) -> str:
+    """Host independent path (with query) of the request."""
+    return request.url.raw_path.decode("ascii")
+
+
+class RecordingTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """Transport that forwards requests and appends every exchange to a trace file.
+
+    The trace is JSONL (gzip compressed when the path ends with .gz), one
+    exchange per line. Pass it to ``Client(api_key, transport=...)`` or to any
+    ``httpx.Client``/``httpx.AsyncClient``.
+
+    The trace is kept open and written as a single stream until ``close()``
+    (called when the client closes, or at exit), so it is complete only then.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        transport: Optional[httpx.BaseTransport] = None,
+        async_transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self._path = Path(path)
+        self._transport = transport
+        self._async_transport = async_transport
+        # Given by the caller, as opposed to the defaults created on first use
+        self._custom = (transport, async_transport)
+        self._lock = threading.Lock()
+        self._file: Any = None
+        self._finalizer: Optional[weakref.finalize] = None
+
+    def __reduce__(self) -> Any:
+        """Pickle the path and the given transports; the default ones are rebuilt."""
+        return (RecordingTransport, (str(self._path), *self._custom))
+
+    def _write(
+        self, request: httpx.Request, response: httpx.Response, elapsed: float
+    ) -> None:
+        """Append one exchange to the trace."""
+        content = response.content
+        entry: Dict[str, Any] = {
+            "method": request.method,
+            "path": _request_path(request),
+            "body": _body_digest(request.content),
+            "status": response.status_code,
+            "headers": [
+                [k, v]
+                for k, v in response.headers.items()
+                if k.lower() not in _DROPPED_HEADERS
+            ],
+            "elapsed": round(elapsed, 4),
+        }
+        try:
+            entry["text"] = content.decode("utf-8")
+        except UnicodeDecodeError:
+            entry["b64"] = base64.b64encode(content).decode("ascii")
+        line = json.dumps(entry, separators=(",", ":"))
+        with self._lock:
+            if self._file is None:
+                # One gzip member per session rather than per exchange
+                self._file = _open_trace(self._path, "a")
+                self._finalizer = weakref.finalize(self, self._file.close)
+            self._file.write(line + "\n")
+
+    def flush(self) -> None:
+        """Finish the trace written so far; later exchanges are appended to it."""
+        with self._lock:
+            if self._finalizer is not None:
+                self._finalizer()
+            self._file = self._finalizer = None
+
+    def _replayable(self, response: httpx.Response) -> httpx.Response:
+        """Build a response with the decoded body already loaded."""
+        headers = [
+            (k, v)
+            for k, v in response.headers.items()
+            if k.lower() not in _DROPPED_HEADERS
+        ]
+        return httpx.Response(
+            response.status_code,
+            headers=headers,
+            content=response.content,
+            extensions=response.extensions,
+        )
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        """Forward the request and record the exchange."""
+        if self._transport is None:
+            self._transport = httpx.HTTPTransport()
+        request.read()
+        tic = time.perf_counter()
+        response = self._transport.handle_request(request)
+        try:
+            response.read()
+        finally:
+            response.close()
+        self._write(request, response, time.perf_counter() - tic)
+        return self._replayable(response)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Forward the request and record the exchange."""
+        if self._async_transport is None:
+            self._async_transport = httpx.AsyncHTTPTransport()
+        await request.aread()
+        tic = time.perf_counter()
+        response = await self._async_transport.handle_async_request(request)
+        try:
+            await response.aread()
+        finally:
+            await response.aclose()
+        self._write(request, response, time.perf_counter() - tic)
+        return self._replayable(response)
+
+    def close(self) -> None:
+        """Close pooled connections and the trace. The transport stays usable afterwards."""
+        self.flush()
+        if self._transport is not None:
+            self._transport.close()
+
+    async def aclose(self) -> None:
+        """Close pooled connections and the trace. The transport stays usable afterwards."""
+        self.flush()
+        if self._async_transport is not None:
+            await self._async_transport.aclose()
+
+
+class ReplayTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """Transport that answers requests from a trace written by RecordingTransport.
+
+    Exchanges are matched on method, path and request body digest, falling
+    back to method and path when the body differs (e.g. generated step ids).
+    Repeated requests to the same endpoint get the recorded responses in
+    order; once exhausted, the last one is repeated, so polling loops settle on
+    the final recorded state. ``time_scale`` multiplies the recorded latencies:
+    0 replays instantly, 1 in real time, 0.1 ten times faster.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        time_scale: float = 0.0,
+        match_body: bool = True,
+    ):
+        if time_scale < 0:
+            raise ValueError("time_scale should be >= 0.")
+        self._path = str(path)
+        self._time_scale = time_scale
+        self._match_body = match_body
+        self._lock = threading.Lock()
+        self._exact: Dict[Tuple[str, str, str], Deque[Dict[str, Any]]] = {}
+        self._loose: Dict[Tuple[str, str], Deque[Dict[str, Any]]] = {}
+        with _open_trace(Path(path), "r") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                key = (entry["method"], entry["path"])
+                self._exact.setdefault(key + (entry["body"],), deque()).append(entry)
+                self._loose.setdefault(key, deque()).append(entry)
+
+    def __reduce__(self) -> Any:
+        """Pickle the configuration; an unpickled copy replays the trace from the start."""
+        return (ReplayTransport, (self._path, self._time_scale, self._match_body))
+
+    @staticmethod
+    def _next(queue: Deque[Dict[str, Any]]) -> Dict[str, Any]:
+        """Pop the next recorded exchange, keeping the last one for repeats."""
+        if len(queue) > 1:
+            return queue.popleft()
+        return queue[0]
+
+    @staticmethod
+    def _discard(queue: Deque[Dict[str, Any]], entry: Dict[str, Any]) -> None:
+        """Remove a served exchange from another queue, keeping its last one."""
+        if len(queue) > 1:
+            for i, candidate in enumerate(queue):
+                if candidate is entry:
+                    del queue[i]
+                    return
+
+    def _lookup(self, request: httpx.Request) -> Dict[str, Any]:
+        """Find the recorded exchange for a request."""
+        path = _request_path(request)
+        with self._lock:
+            if self._match_body:
+                exact = self._exact.get(
+                    (request.method, path, _body_digest(request.content))
+                )
+                if exact:
+                    entry = self._next(exact)
+                    # Keep the loose queue in step with what was served
+                    self._discard(self._loose[(request.method, path)], entry)
+                    return entry
+            loose = self._loose.get((request.method, path))
+            if not loose:
+                raise AIHeroException(
+                    f"No recorded response for {request.method} {path}"
+                )
+            entry = self._next(loose)
+            # Served once: an exact match must not serve it again
+            self._discard(self._exact[(request.method, path, entry["body"])], entry)
+            return entry
+
+    @staticmethod
+    def _response(entry: Dict[str, Any]) -> httpx.Response:
+        """Rebuild the recorded response."""
+        if "b64" in entry:
+            content = base64.b64decode(entry["b64"])
+        else:
+            content = entry.get("text", "").encode("utf-8")
+        return httpx.Response(
+            entry["status"],
+            headers=[tuple(h) for h in entry["headers"]],
+            content=content,
+        )
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        """Answer the request from the trace."""
+        request.read()
+        entry = self._lookup(request)
+        if self._time_scale:
+            time.sleep(entry["elapsed"] * self._time_scale)
+        return self._response(entry)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Answer the request from the trace."""
+        await request.aread()
+        entry = self._lookup(request)
+        if self._time_scale:
+            await asyncio.sleep(entry["elapsed"] * self._time_scale)
+        return self._response(entry)
@@ -0,0 +1,536 @@
+"""Local validation of JObject outputs against their JSON schemas.
+
+Schemas are compiled once and cached process-wide by a hash of their
+content, so validating thousands of objects generated from the same schema
+does not interpret (or even parse) the schema again.
+
+Schemas using only the keywords common in structured outputs are compiled
+into nested checks, several times faster than a general validator: type,
+enum, const, properties, required, additionalProperties,
+patternProperties, min/maxProperties, items, prefixItems, min/maxItems,
+uniqueItems, min/maxLength, pattern, minimum, maximum, exclusiveMinimum,
+exclusiveMaximum, multipleOf, allOf, anyOf, oneOf, not and local $ref.
+Schemas using other keywords of the specification (contains, if/then/else,
+propertyNames, dependentRequired, ...) are validated with the jsonschema
+package (``pip install aihero[validation]``); without it they raise
+SchemaError rather than being checked partially. Annotations (title,
+format, ...) and unknown keywords are ignored, as the specification
+requires.
+"""
+
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from fractions import Fraction
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from .exceptions import SchemaDependencyError, SchemaError
+from .schema import JObject, Workflow
+
+
+@dataclass
+class Violation:
+    """A place where an object does not match its schema."""
+
+    path: str
+    message: str
+
+    def __str__(self) -> str:
+        return f"{self.path or '/'}: {self.message}"
+
+
+Check = Callable[[Any, str, List[Violation]], None]
+
+_TYPE_NAMES = {
+    dict: "object",
+    list: "array",
+    str: "string",
+    bool: "boolean",
+    type(None): "null",
+    int: "integer",
+    float: "number",
+}
+
+
+def _is_type(value: Any, name: str) -> bool:
+    """Whether a JSON value is of a JSON Schema type."""
+    if name == "integer":
+        if isinstance(value, float):
+            return value.is_integer()
+        return isinstance(value, int) and not isinstance(value, bool)
+    if name == "number":
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    if name == "object":
+        return isinstance(value, dict)
+    if name == "array":
+        return isinstance(value, list)
+    if name == "string":
+        return isinstance(value, str)
+    if name == "boolean":
+        return isinstance(value, bool)
+    if name == "null":
+        return value is None
+    raise SchemaError(f"Unknown type {name}")
+
+
+def _same(a: Any, b: Any) -> bool:
+    """JSON equality, where true is not 1."""
+    if isinstance(a, bool) or isinstance(b, bool):
+        return type(a) is type(b) and a == b
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(map(_same, a, b))
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_same(a[k], b[k]) for k in a)
+    return a == b
+
+
+# Keywords of the specification that the compiler does not implement
+_DELEGATED_KEYWORDS = {
+    "contains",
+    "minContains",
+    "maxContains",
+    "if",
+    "then",
+    "else",
+    "propertyNames",
+    "dependentRequired",
+    "dependentSchemas",
+    "dependencies",
+    "unevaluatedProperties",
+    "unevaluatedItems",
+    "$dynamicRef",
+    "$recursiveRef",
+}
+
+
+class _Unsupported(Exception):
+    """Raised by the compiler for a schema it cannot check on its own."""
+
+
+def _jsonschema() -> Any:
+    """The jsonschema package, None if it is not installed."""
+    try:
+        import jsonschema
+    except ImportError:
+        return None
+    return jsonschema
+
+
+def _multiple_of(value: Any, multiple: Any) -> bool:
+    """Whether value is a multiple of multiple, exactly: 0.3 is a multiple of 0.1."""
+    if isinstance(value, int) and isinstance(multiple, int):
+        return value % multiple == 0
+    try:
+        # From the shortest repr, the decimal the JSON text had
+        return Fraction(repr(value)) % Fraction(repr(multiple)) == 0
+    except (ValueError, OverflowError):
+        return False  # inf or nan
+
+
+def _pointer(path: str, key: Any) -> str:
+    """JSON Pointer of a child of the value at path."""
+    return f"{path}/{str(key).replace('~', '~0').replace('/', '~1')}"
+
+
+class _Compiler:
+    """Turns a schema into checks, resolving local $refs lazily to allow recursion."""
+
+    def __init__(self, root: Any):
+        self.root = root
+        self.refs: Dict[str, List[Check]] = {}
+
+    def ref(self, ref: str) -> Check:
+        if not ref.startswith("#"):
+            raise _Unsupported(f"$ref {ref}")
+        if ref not in self.refs:
+            cell: List[Check] = []
+            self.refs[ref] = cell
+            target = self.root
+            for part in ref[1:].split("/")[1:]:
+                part = part.replace("~1", "/").replace("~0", "~")
+                try:
+                    target = target[int(part) if isinstance(target, list) else part]
+                except (KeyError, IndexError, ValueError) as exc:
+                    raise SchemaError(f"Unresolvable $ref {ref}") from exc
+            cell.append(self.compile(target))
+        cell = self.refs[ref]
+
+        def check(value: Any, path: str, errors: List[Violation]) -> None:
+            cell[0](value, path, errors)
+
+        return check
+
+    def compile(self, schema: Any) -> Check:
+        """Checks of one schema node, combined into one function."""
+        if schema is True or schema == {}:
+            return lambda value, path, errors: None
+        if schema is False:
+            return lambda value, path, errors: errors.append(
+                Violation(path, "no value is allowed here")
+            )
+        if not isinstance(schema, dict):
+            raise SchemaError(
+                f"A schema should be an object or a boolean, got {schema!r}"
+            )
+        delegated = _DELEGATED_KEYWORDS.intersection(schema)
+        if delegated:
+            raise _Unsupported(sorted(delegated)[0])
+
+        checks: List[Check] = []
+        if "$ref" in schema:
+            checks.append(self.ref(schema["$ref"]))
+        if "type" in schema:
+            checks.append(self._type(schema["type"]))
+        if "enum" in schema:
+            checks.append(self._enum(schema["enum"]))
+        if "const" in schema:
+            checks.append(self._enum([schema["const"]]))
+        checks.extend(self._object(schema))
+        checks.extend(self._array(schema))
+        checks.extend(self._string(schema))
+        checks.extend(self._number(schema))
+        checks.extend(self._combinators(schema))
+
+        if len(checks) == 1:
+            return checks[0]
+
+        def check(value: Any, path: str, errors: List[Violation]) -> None:
+            for c in checks:
+                c(value, path, errors)
+
+        return check
+
+    def _type(self, types: Any) -> Check:
+        names = [types] if isinstance(types, str) else list(types)
+        for name in names:
+            _is_type(None, name)  # Raise on unknown types now
+        expected = " or ".join(names)
+
+        def check(value: Any, path: str, errors: List[Violation]) -> None:
+            for name in names:
+                if _is_type(value, name):
+                    return
+            found = _TYPE_NAMES.get(type(value), type(value).__name__)
+            errors.append(Violation(path, f"expected {expected}, got {found}"))
+
+        return check
+
+    def _enum(self, options: List[Any]) -> Check:
+        def check(value: Any, path: str, errors: List[Violation]) -> None:
+            for option in options:
+                if _same(value, option):
+                    return
+            errors.append(Violation(path, f"{value!r} is not one of {options!r}"))
+
+        return check
+
+    def _object(self, schema: Dict[str, Any]) -> List[Check]:
+        checks: List[Check] = []
+        properties = {
+            key: self.compile(sub) for key, sub in schema.get("properties", {}).items()
+        }
+        patterns = [
+            (re.compile(pattern), self.compile(sub))
+            for pattern, sub in schema.get("patternProperties", {}).items()
+        ]
+        additional = schema.get("additionalProperties", True)
+        additional_check = None if additional is True else self.compile(additional)
+        required = list(schema.get("required", []))
+        min_props = schema.get("minProperties")
+        max_props = schema.get("maxProperties")
+        if not (
+            properties
+            or patterns
+            or additional_check
+            or required
+            or min_props is not None
+            or max_props is not None
+        ):
+            return checks
+
+        def check(value: Any, path: str, errors: List[Violation]) -> None:
+            if not isinstance(value, dict):
+                return
+            for key in required:
+                if key not in value:
+                    errors.append(Violation(path, f"missing required property {key!r}"))
+            if min_props is not None and len(value) < min_props:
+                errors.append(Violation(path, f"fewer than {min_props} properties"))
+            if max_props is not None and len(value) > max_props:
+                errors.append(Violation(path, f"more than {max_props} properties"))
+            for key, item in value.items():
+                matched = False
+                sub = properties.get(key)
+                if sub is not None:
+                    matched = True
+                    sub(item, _pointer(path, key), errors)
+                for pattern, pattern_check in patterns:
+                    if pattern.search(key):
+                        matched = True
+                        pattern_check(item, _pointer(path, key), errors)
+                if not matched and additional_check is not None:
+                    if additional is False:
+                        errors.append(Violation(path, f"unexpected property {key!r}"))
+                    else:
+                        additional_check(item, _pointer(path, key), errors)
+
+        checks.append(check)
+        return checks
+
+    def _array(self, schema: Dict[str, Any]) -> List[Check]:
+        items = schema.get("items")
+        prefix = schema.get("prefixItems")
+        if isinstance(items, list):
+            # Draft 4-7 tuple validation
+            prefix, items = items, schema.get("additionalItems")
+        prefix_checks = [self.compile(sub) for sub in prefix or []]
+        items_check = self.compile(items) if items is not None else None
+        min_items = schema.get("minItems")
+        max_items = schema.get("maxItems")
+        unique = schema.get("uniqueItems", False)
+        if not (
+            prefix_checks
+            or items_check
+            or min_items is not None
+            or max_items is not None
+            or unique
+        ):
+            return []
+
+        def check(value: Any, path: str, errors: List[Violation]) -> None:
+            if not isinstance(value, list):
+                return
+            if min_items is not None and len(value) < min_items:
+                errors.append(Violation(path, f"fewer than {min_items} items"))
+            if max_items is not None and len(value) > max_items:
+                errors.append(Violation(path, f"more than {max_items} items"))
+            for i, item in enumerate(value):
+                if i < len(prefix_checks):
+                    prefix_checks[i](item, _pointer(path, i), errors)
+                elif items_check is not None:
+                    items_check(item, _pointer(path, i), errors)
+            if unique:
+                for i in range(1, len(value)):
+                    if any(_same(value[i], earlier) for earlier in value[:i]):
+                        errors.append(Violation(path, "items are not unique"))
+                        break
+
+        return [check]
+
+    def _string(self, schema: Dict[str, Any]) -> List[Check]:
+        min_length = schema.get("minLength")
+        max_length = schema.get("maxLength")
+        pattern = re.compile(schema["pattern"]) if "pattern" in schema else None
+        if min_length is None and max_length is None and pattern is None:
+            return []
+
+        def check(value: Any, path: str, errors: List[Violation]) -> None:
+            if not isinstance(value, str):
+                return
+            if min_length is not None and len(value) < min_length:
+                errors.append(Violation(path, f"shorter than {min_length} characters"))
+            if max_length is not None and len(value) > max_length:
+                errors.append(Violation(path, f"longer than {max_length} characters"))
+            if pattern is not None and not pattern.search(value):
+                errors.append(
+                    Violation(path, f"does not match pattern {pattern.pattern!r}")
+                )
+
+        return [check]
+
+    def _number(self, schema: Dict[str, Any]) -> List[Check]:
+        bounds: List[Tuple[Callable[[Any], bool], str]] = []
+        minimum, maximum = schema.get("minimum"), schema.get("maximum")
+        exclusive_min = schema.get("exclusiveMinimum")
+        exclusive_max = schema.get("exclusiveMaximum")
+        # Draft 4 spelled exclusive bounds as booleans next to minimum/maximum
+        if exclusive_min is True:
+            exclusive_min, minimum = minimum, None
+        if exclusive_max is True:
+            exclusive_max, maximum = maximum, None
+        if isinstance(exclusive_min, bool):
+            exclusive_min = None
+        if isinstance(exclusive_max, bool):
+            exclusive_max = None
+        if minimum is not None:
+            bounds.append((lambda v: v >= minimum, f"less than {minimum}"))
+        if maximum is not None:
+            bounds.append((lambda v: v <= maximum, f"greater than {maximum}"))
+        if exclusive_min is not None:
+            bounds.append(
+                (lambda v: v > exclusive_min, f"not greater than {exclusive_min}")
+            )
+        if exclusive_max is not None:
+            bounds.append(
+                (lambda v: v < exclusive_max, f"not less than {exclusive_max}")
+            )
+        multiple = schema.get("multipleOf")
+        if multiple is not None:
+            bounds.append(
+                (lambda v: _multiple_of(v, multiple), f"not a multiple of {multiple}")
+            )
+        if not bounds:
+            return []
+
+        def check(value: Any, path: str, errors: List[Violation]) -> None:
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                return
+            for test, message in bounds:
+                if not test(value):
+                    errors.append(Violation(path, message))
+
+        return [check]
+
+    def _combinators(self, schema: Dict[str, Any]) -> List[Check]:
+        checks = [self.compile(sub) for sub in schema.get("allOf", [])]
+        if "anyOf" in schema:
+            checks.append(
+                self._choice([self.compile(s) for s in schema["anyOf"]], False)
+            )
+        if "oneOf" in schema:
+            checks.append(
+                self._choice([self.compile(s) for s in schema["oneOf"]], True)
+            )
+        if "not" in schema:
+            negated = self.compile(schema["not"])
+
+            def not_(value: Any, path: str, errors: List[Violation]) -> None:
+                if _valid(negated, value):
+                    errors.append(Violation(path, "matches a schema it should not"))
+
+            checks.append(not_)
+        return checks
+
+    @staticmethod
+    def _choice(options: List[Check], exactly_one: bool) -> Check:
+        """anyOf, or oneOf when exactly_one."""
+        keyword = "oneOf" if exactly_one else "anyOf"
+
+        def check(value: Any, path: str, errors: List[Violation]) -> None:
+            matches = 0
+            for option in options:
+                if _valid(option, value):
+                    matches += 1
+                    if not exactly_one:
+                        return
+            if matches == 0:
+                errors.append(
+                    Violation(path, f"does not match any schema of {keyword}")
+                )
+            elif matches > 1:
+                errors.append(Violation(path, f"matches {matches} schemas of oneOf"))
+
+        return check
+
+
+def _valid(check: Check, value: Any) -> bool:
+    """Whether a value passes a check."""
+    errors: List[Violation] = []
+    check(value, "", errors)
+    return not errors
+
+
+def _jsonschema_path(error: Any) -> str:
+    """JSON Pointer of the value a jsonschema error is about."""
+    path = ""
+    for key in error.absolute_path:
+        path = _pointer(path, key)
+    return path
+
+
+class CompiledSchema:
+    """A JSON schema compiled into nested checks, or a jsonschema validator."""
+
+    def __init__(self, schema: Any):
+        self.schema = schema
+        self._validator: Any = None
+        try:
+            self._check = _Compiler(schema).compile(schema)
+        except _Unsupported as exc:
+            jsonschema = _jsonschema()
+            if jsonschema is None:
+                raise SchemaDependencyError(
+                    f"Schemas using {exc} need jsonschema: pip install aihero[validation]"
+                ) from None
+            cls = jsonschema.validators.validator_for(
+                schema, default=jsonschema.Draft202012Validator
+            )
+            try:
+                cls.check_schema(schema)
+            except jsonschema.SchemaError as error:
+                raise SchemaError(f"Invalid schema: {error.message}") from error
+            self._validator = cls(schema)
+
+    def errors(self, instance: Any) -> List[Violation]:
+        """Every violation of the schema by the instance."""
+        if self._validator is not None:
+            return [
+                Violation(_jsonschema_path(error), error.message)
+                for error in self._validator.iter_errors(instance)
+            ]
+        errors: List[Violation] = []
+        self._check(instance, "", errors)
+        return errors
+
+    def is_valid(self, instance: Any) -> bool:
+        """Whether the instance matches the schema."""
+        if self._validator is not None:
+            return bool(self._validator.is_valid(instance))
+        return _valid(self._check, instance)
+
+
+# Compiled schemas by content hash, least recently used first
+_cache: "OrderedDict[str, CompiledSchema]" = OrderedDict()
+_cache_lock = threading.Lock()
+CACHE_SIZE = 1024
+
+
+def schema_key(schema: Any) -> str:
+    """Hash of a schema's content, independent of key order."""
+    encoded = json.dumps(schema, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+
+
+def compile_schema(schema: Any) -> CompiledSchema:
+    """Compiled validator for a schema, from the process-wide cache when possible."""
+    key = schema_key(schema)
+    with _cache_lock:
+        compiled = _cache.get(key)
+        if compiled is not None:
+            _cache.move_to_end(key)
+            return compiled
+    compiled = CompiledSchema(schema)
+    with _cache_lock:
+        _cache[key] = compiled
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return compiled
+
+
+def validate_workflows(
+    workflows: Iterable[Workflow],
+) -> Dict[Tuple[str, str], List[Violation]]:
+    """Validate the output of every JObject step of the workflows.
+
+    Returns the violations of the steps whose object does not match its
+    schema, keyed by (workflow_id, step_id). Steps without an output yet
+    are skipped.
+    """
+    failures: Dict[Tuple[str, str], List[Violation]] = {}
+    # Schemas seen in this call by id, holding on to them so ids are not reused
+    compiled: Dict[int, Tuple[Any, CompiledSchema]] = {}
+    for workflow in workflows:
+        for step in workflow.steps_of(JObject):
+            if not step.json_object:
+                continue
+            schema = step.json_schema
+            if id(schema) not in compiled:
+                compiled[id(schema)] = (schema, compile_schema(schema))
+            validator = compiled[id(schema)][1]
+            errors = validator.errors(step.json_object)
+            if errors:
+                failures[(workflow.workflow_id, step.step_id or "")] = errors
+    return failures
@@ -0,0 +1,52 @@
+"""Benchmark waiting for runs with completion callbacks against polling.
+
+The stand-in runs workflows in the background, one step every
+``step_seconds``, and POSTs to the callback URL of a launch over real HTTP
+when the run finishes.
+"""
+
+import statistics
+import time
+
+import httpx
+from fire import Fire
+
+from aihero.callbacks import CallbackListener
+from aihero.client import Client
+from aihero.schema import Instruction, TypeEnum
+from aihero.testing import StandInServer
+
+
+def main(runs: int = 5, n_steps: int = 3, step_seconds: float = 0.25) -> None:
+    """Launch workflows with and without a callback listener"""
+    steps = [
+        Instruction(type=TypeEnum.INSTRUCTION, instruction=f"Step {i}")
+        for i in range(n_steps)
+    ]
+    run_time = n_steps * 2 * step_seconds  # Instructions are partial for one step
+    print(f"{n_steps} steps, runs take {run_time:.2f} s")
+
+    for mode in ("polling", "callbacks"):
+        server = StandInServer(step_seconds=step_seconds)
+        server.add_project("project")
+        client = Client("benchmark", transport=httpx.MockTransport(server.handle))
+        with CallbackListener() as listener:
+            latencies = []
+            for _ in range(runs):
+                workflow = client.create_workflow("project", "Run", "", steps)
+                tic = time.perf_counter()
+                client.launch_workflow(
+                    "project",
+                    workflow.workflow_id,
+                    callbacks=listener if mode == "callbacks" else None,
+                )
+                latencies.append(time.perf_counter() - tic - run_time)
+        polls = sum(1 for method, path in server.requests if method == "GET") / runs
+        print(
+            f"{mode:10} {polls:5.1f} GETs per run"
+            f"  median latency after the run {statistics.median(latencies) * 1000:6.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    Fire(main)
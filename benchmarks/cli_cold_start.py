@@ -0,0 +1,37 @@
+"""Benchmark the cold start time of the aihero CLI."""
+
+import statistics
+import subprocess
+import sys
+import time
+
+from fire import Fire
+
+
+def main(runs: int = 20) -> None:
+    """Time `python -m aihero.cli --help` in fresh interpreters"""
+    timings = []
+    for _ in range(runs):
+        tic = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-m", "aihero.cli", "--help"],
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        timings.append(time.perf_counter() - tic)
+
+    baseline = []
+    for _ in range(runs):
+        tic = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        baseline.append(time.perf_counter() - tic)
+
+    print(f"aihero --help:\tmedian {statistics.median(timings) * 1000:.1f} ms")
+    print(f"python -c pass:\tmedian {statistics.median(baseline) * 1000:.1f} ms")
+    print(
+        f"CLI overhead:\t{(statistics.median(timings) - statistics.median(baseline)) * 1000:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    Fire(main)
@@ -0,0 +1,120 @@
+"""Benchmark request and response compression against the stand-in server.
+
+The stand-in sits behind a simulated link (round-trip time plus bandwidth),
+so that payload sizes show up in the timings the way they do on slow
+cross-region links.
+"""
+
+import statistics
+import time
+from typing import Any, List
+
+import httpx
+from fire import Fire
+
+from aihero.client import Client
+from aihero.compression import accept_encoding
+from aihero.schema import Instruction, JObject, Markdown, Step, TypeEnum
+from aihero.testing import StandInServer
+
+
+def _steps(n_steps: int) -> List[Step]:
+    """Steps with long markdown, instructions and JSON schemas."""
+    steps: List[Step] = []
+    for i in range(n_steps):
+        steps.append(
+            Markdown(
+                type=TypeEnum.MARKDOWN,
+                markdown=f"## Section {i}\n\n"
+                + "The company reported revenue growth in every segment. " * 40,
+            )
+        )
+        steps.append(
+            Instruction(
+                type=TypeEnum.INSTRUCTION,
+                instruction=f"Summarize section {i} and list the key risks. " * 10,
+            )
+        )
+        steps.append(
+            JObject(
+                type=TypeEnum.OBJECT,
+                json_schema={
+                    "type": "object",
+                    "properties": {
+                        f"field_{j}": {"type": "string", "description": f"Field {j}"}
+                        for j in range(30)
+                    },
+                },
+            )
+        )
+    return steps
+
+
+class Link:
+    """httpx transport adding round trips and transfer time in front of a handler."""
+
+    def __init__(
+        self, server: StandInServer, rtt: float, mbps: float, negotiate: bool = True
+    ):
+        self.server = server
+        self.negotiate = negotiate
+        self.rtt = rtt
+        self.bytes_per_second = mbps * 1e6 / 8
+        self.sent = 0
+        self.received = 0
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        if not self.negotiate:
+            # What the client got before asking for compressed responses
+            request.headers["Accept-Encoding"] = "identity"
+        response = self.server.handle(request)
+        # Size on the wire, before httpx decodes the response
+        received = len(b"".join(response.stream))  # type: ignore[arg-type]
+        sent = len(request.content)
+        self.sent += sent
+        self.received += received
+        time.sleep(self.rtt + (sent + received) / self.bytes_per_second)
+        return response
+
+
+def main(
+    n_steps: int = 50, runs: int = 5, rtt_ms: float = 80.0, mbps: float = 20.0
+) -> None:
+    """Create and fetch a large workflow with each request encoding"""
+    steps = _steps(n_steps)
+    print(f"{len(steps)} steps, link {rtt_ms:.0f} ms RTT, {mbps:.0f} Mbit/s")
+    print(f"Accept-Encoding: {accept_encoding()}")
+    encodings: List[Any] = [None, "gzip"]
+    if "zstd" in accept_encoding():
+        encodings.append("zstd")
+
+    for encoding in encodings:
+        for accept in (False, True):
+            server = StandInServer()
+            server.add_project("project")
+            link = Link(server, rtt_ms / 1000, mbps, negotiate=accept)
+            client = Client(
+                "benchmark",
+                transport=httpx.MockTransport(link.handle),
+                compression=encoding,
+            )
+            create, fetch = [], []
+            for _ in range(runs):
+                tic = time.perf_counter()
+                workflow = client.create_workflow("project", "Report", "", steps)
+                create.append(time.perf_counter() - tic)
+                tic = time.perf_counter()
+                client.get_workflow("project", workflow.workflow_id)
+                fetch.append(time.perf_counter() - tic)
+
+            print(
+                f"request {encoding or 'identity':8} response {'negotiated' if accept else 'identity':10}"
+                f"  sent {link.sent / runs / 1000:7.1f} kB"
+                f"  received {link.received / runs / 1000:7.1f} kB"
+                f"  create {statistics.median(create) * 1000:6.1f} ms"
+                f"  get {statistics.median(fetch) * 1000:6.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    Fire(main)
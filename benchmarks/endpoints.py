@@ -0,0 +1,66 @@
+"""Benchmark an endpoint pool against a single server URL.
+
+Three local gateways serve the same stand-in over HTTP with different
+latencies. Requests are timed while the fastest gateway is healthy, after
+it slows down, and after it goes down; requests that fail are counted.
+"""
+
+import statistics
+import time
+
+import httpx
+from fire import Fire
+
+from aihero.client import Client
+from aihero.endpoints import EndpointPool
+from aihero.exceptions import AIHeroException
+from aihero.testing import StandInServer
+
+
+def _phase(client: Client, requests: int) -> str:
+    latencies = []
+    errors = 0
+    for _ in range(requests):
+        tic = time.perf_counter()
+        try:
+            client.get_project("project")
+        except (AIHeroException, httpx.HTTPError):
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - tic)
+    median = statistics.median(latencies) * 1000 if latencies else float("nan")
+    return f"median {median:6.1f} ms, {errors:3d} errors"
+
+
+def main(
+    requests: int = 50,
+    latencies: str = "0.03,0.01,0.002",
+    probe_interval: float = 0.2,
+) -> None:
+    """Time GETs through the fastest gateway only, then through a pool of all of them"""
+    delays = [float(latency) for latency in str(latencies).split(",")]
+    for mode in ("single URL", "pool"):
+        server = StandInServer()
+        server.add_project("project")
+        gateways = [server.serve(latency=delay) for delay in delays]
+        urls = [gateway.url for gateway in gateways]
+        pool = EndpointPool(
+            urls if mode == "pool" else urls[-1:], probe_interval=probe_interval
+        )
+        client = Client("benchmark", endpoints=pool)
+        client.get_project("project")
+        time.sleep(probe_interval * 3)
+        print(f"{mode:10} healthy   {_phase(client, requests)}")
+        # The fastest gateway, the only one of the single URL mode
+        gateways[-1].latency = 0.05
+        time.sleep(probe_interval * 5)
+        print(f"{mode:10} slow      {_phase(client, requests)}")
+        gateways[-1].close()
+        print(f"{mode:10} down      {_phase(client, requests)}")
+        client.close()
+        for gateway in gateways[:-1]:
+            gateway.close()
+
+
+if __name__ == "__main__":
+    Fire(main)
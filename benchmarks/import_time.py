@@ -0,0 +1,74 @@
+"""Benchmark the import time of the aihero package with `python -X importtime`."""
+
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+from fire import Fire
+
+STATEMENTS = [
+    "import aihero",
+    "import aihero.cli",
+    "from aihero import Client",
+    "import aihero.schema",
+]
+
+
+def import_times(statement: str) -> List[Tuple[str, int, int]]:
+    """Run the statement in a fresh interpreter and parse the importtime report.
+
+    Returns (module, self us, cumulative us) rows; nested imports keep the
+    report's indentation in the module name.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:") :].split("|")
+        rows.append((module[1:].rstrip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def package_rows(rows: List[Tuple[str, int, int]]) -> List[Tuple[str, int, int]]:
+    """Keep the rows imported on behalf of aihero.
+
+    The report lists nested imports before their parent and does not indent
+    top level imports. Everything from the subtree of the first top level
+    aihero entry onwards is ours: modules loaded lazily through
+    ``aihero.__getattr__`` are reported as further top level entries.
+    """
+    group: List[Tuple[str, int, int]] = []
+    for index, row in enumerate(rows):
+        group.append(row)
+        if row[0] == row[0].lstrip():
+            if row[0].startswith("aihero"):
+                return group + rows[index + 1 :]
+            group = []
+    return []
+
+
+def main(top: int = 5, budget_ms: float = 0.0) -> None:
+    """Report the cumulative import time of each statement and the slowest modules"""
+    over_budget: Dict[str, float] = {}
+    for statement in STATEMENTS:
+        rows = package_rows(import_times(statement))
+        total_us = sum(
+            cumulative for module, _, cumulative in rows if module == module.lstrip()
+        )
+        print(f"{statement}:\t{total_us / 1000:.1f} ms")
+        for module, self_us, _ in sorted(rows, key=lambda r: -r[1])[:top]:
+            print(f"\t{self_us / 1000:6.1f} ms\t{module.strip()}")
+        if statement == "import aihero" and budget_ms and total_us / 1000 > budget_ms:
+            over_budget[statement] = total_us / 1000
+    if over_budget:
+        raise SystemExit(f"Import time over budget of {budget_ms} ms: {over_budget}")
+
+
+if __name__ == "__main__":
+    Fire(main)
@@ -0,0 +1,19 @@
+"""Fixtures: a client talking to an in-memory stand-in of the API."""
+
+import pytest
+
+from aihero.client import Client
+from aihero.testing import StandInServer
+
+
+@pytest.fixture
+def server() -> StandInServer:
+    server = StandInServer()
+    server.add_project("project")
+    return server
+
+
+@pytest.fixture
+def client(server: StandInServer) -> Client:
+    with Client("test-key", transport=server.transport()) as client:
+        yield client
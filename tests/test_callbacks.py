@@ -0,0 +1,58 @@
+import threading
+import time
+
+import httpx
+
+from aihero.callbacks import CallbackListener
+from aihero.client import Client
+from aihero.schema import Instruction, TypeEnum
+from aihero.testing import StandInServer
+
+
+def test_launches_of_the_same_workflow_are_woken_separately():
+    with CallbackListener() as listener:
+        first = listener.expect("workflow")
+        second = listener.expect("workflow")
+        assert first.url != second.url
+
+        listener.discard(first)
+        assert httpx.post(second.url).status_code == 204
+
+        assert second.event.is_set()
+        assert not first.event.is_set()
+
+
+def test_concurrent_launches_get_their_callbacks():
+    server = StandInServer(step_seconds=0.02)
+    server.add_project("project")
+    steps = [Instruction(type=TypeEnum.INSTRUCTION, instruction="Step")]
+    results = {}
+    with Client("test-key", transport=server.transport()) as client:
+        workflows = [
+            client.create_workflow("project", f"Run {i}", "", steps).workflow_id
+            for i in range(3)
+        ]
+
+        with CallbackListener() as listener:
+
+            def launch(workflow_id: str) -> None:
+                results[workflow_id] = client.launch_workflow(
+                    "project",
+                    workflow_id,
+                    timeout=10,
+                    callbacks=listener,
+                    fallback_interval=30,
+                )
+
+            tic = time.perf_counter()
+            threads = [threading.Thread(target=launch, args=(w,)) for w in workflows]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+    # Woken up by the callbacks, not by the 30 s fallback polls
+    assert time.perf_counter() - tic < 5
+    assert {w: r.status for w, r in results.items()} == dict.fromkeys(
+        workflows, "success"
+    )
@@ -0,0 +1,25 @@
+import pytest
+
+from aihero.context import ContextRenderer, step_key
+from aihero.schema import Search, TypeEnum
+
+
+@pytest.mark.parametrize(
+    "first, second",
+    [({"score": -1}, {"score": -2}), ({"ok": True}, {"ok": 1}), ({"n": 1}, {"n": 1.0})],
+)
+def test_equal_hashing_values_do_not_share_a_rendering(first, second):
+    renderer = ContextRenderer()
+    a = Search(type=TypeEnum.QUERY, query="q", result=first)
+    b = Search(type=TypeEnum.QUERY, query="q", result=second)
+
+    assert step_key(a) != step_key(b)
+    assert renderer.render_step(a) == a.llm_string()
+    assert renderer.render_step(b) == b.llm_string()
+
+
+def test_unchanged_step_reuses_its_rendering():
+    renderer = ContextRenderer()
+    step = Search(type=TypeEnum.QUERY, query="q", result={"score": 1})
+
+    assert renderer.render_step(step) is renderer.render_step(step)
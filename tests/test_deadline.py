@@ -0,0 +1,67 @@
+import threading
+import time
+
+import httpx
+from aihero.client import Client
+from aihero.deadline import Deadline, _request_executor
+from aihero.exceptions import Cancelled
+
+
+def _occupy_workers(seconds: float) -> None:
+    """Keep every request worker busy, so that the next request waits in the queue."""
+    executor = _request_executor()
+    release = threading.Event()
+    for _ in range(executor._max_workers):
+        executor.submit(release.wait)
+    threading.Timer(seconds, release.set).start()
+
+
+def test_request_timeouts_are_capped_by_the_budget_left_when_sent(server):
+    timeouts = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        timeouts.append(request.extensions["timeout"])
+        return server.handle(request)
+
+    with Client("test-key", transport=httpx.MockTransport(handle)) as client:
+        with Deadline(1.0):
+            _occupy_workers(0.5)
+            client.get_project("project")
+
+    assert all(0 < value <= 0.5 for value in timeouts[0].values())
+
+
+def test_request_queued_past_cancellation_is_not_sent(server):
+    sent = threading.Event()
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        sent.set()
+        return server.handle(request)
+
+    executor = _request_executor()
+    release = threading.Event()
+    # Occupy every worker so that the next request waits in the queue
+    busy = [executor.submit(release.wait) for _ in range(executor._max_workers)]
+    deadline = Deadline(10)
+    errors = []
+
+    def create(client: Client) -> None:
+        with deadline:
+            try:
+                client.create_workflow("project", "Late", "", [])
+            except Cancelled as exc:
+                errors.append(exc)
+
+    with Client("test-key", transport=httpx.MockTransport(handle)) as client:
+        thread = threading.Thread(target=create, args=(client,))
+        thread.start()
+        while executor._work_queue.qsize() == 0:
+            time.sleep(0.001)
+        deadline.cancel()
+        thread.join()
+        release.set()
+        for future in busy:
+            future.result()
+
+        assert errors
+        assert not sent.wait(0.5)
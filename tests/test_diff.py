@@ -0,0 +1,78 @@
+from aihero.client import Client
+from aihero.content_store import ContentRef, ContentStore
+from aihero.testing import StandInServer
+
+
+def _patches(server: StandInServer) -> list:
+    return [path for method, path in server.requests if method == "PATCH"]
+
+
+def _add_workflow(server: StandInServer) -> str:
+    workflow = server.add_workflow(
+        "project",
+        steps=[
+            {"type": "markdown", "markdown": "# quarterly report of the company"},
+            {"type": "webpages", "urls": ["HTTPS://Example.com:443/a/../b"]},
+            {"type": "files", "files": ["reports/q1.pdf"]},
+            {
+                "type": "object",
+                "step_id": "schema",
+                "instruction": "Extract",
+                "json_schema": {
+                    "type": "object",
+                    "properties": {"a": {"type": "string"}},
+                },
+            },
+        ],
+    )
+    return workflow["workflow_id"]
+
+
+def test_unmodified_workflow_sends_no_patch(client, server):
+    workflow_id = _add_workflow(server)
+    workflow = client.get_workflow("project", workflow_id)
+
+    updated = client.update_workflow(workflow)
+
+    assert updated is workflow
+    assert _patches(server) == []
+
+
+def test_nested_in_place_edit_is_sent(client, server):
+    workflow_id = _add_workflow(server)
+    workflow = client.get_workflow("project", workflow_id)
+
+    workflow.steps[3].json_schema["properties"]["a"]["type"] = "integer"
+    updated = client.update_workflow(workflow)
+
+    assert len(_patches(server)) == 1
+    stored = server.workflows["project"][workflow_id]["steps"][3]
+    assert stored["json_schema"]["properties"]["a"]["type"] == "integer"
+    # The saved state is the new baseline
+    client.update_workflow(updated)
+    assert len(_patches(server)) == 1
+
+
+def test_spilled_texts_are_compared_without_loading_them(server, monkeypatch):
+    text = "x" * 100_000
+    workflow_id = server.add_workflow(
+        "project",
+        steps=[
+            {"type": "files", "files": ["a.pdf"], "processed_files": {"a.pdf": text}},
+            {"type": "markdown", "markdown": "# notes"},
+        ],
+    )["workflow_id"]
+    store = ContentStore(threshold=1000)
+    with Client("test-key", transport=server.transport(), content_store=store) as c:
+        workflow = c.get_workflow("project", workflow_id)
+        files = workflow.steps[0]
+        assert isinstance(files.processed_files["a.pdf"], ContentRef)
+        assert isinstance(files._source["processed_files"]["a.pdf"], ContentRef)
+
+        loads = []
+        monkeypatch.setattr(ContentRef, "load", lambda ref: loads.append(ref) or text)
+        workflow.steps[1].markdown = "# Other notes"
+        c.update_workflow(workflow)
+
+    assert loads == []
+    assert len(_patches(server)) == 1
@@ -0,0 +1,41 @@
+import pytest
+
+from aihero.client import Client
+from aihero.endpoints import EndpointPool
+from aihero.testing import StandInServer
+
+
+@pytest.fixture
+def gateways(server: StandInServer):
+    gateways = [server.serve(), server.serve()]
+    yield gateways
+    for gateway in gateways:
+        gateway.close()
+
+
+def _localhost(gateway) -> str:
+    return f"http://localhost:{gateway.port}/"
+
+
+def test_localhost_endpoints_fail_over(server, gateways):
+    first, second = gateways
+    pool = EndpointPool([_localhost(first), _localhost(second)], probe_interval=60)
+    with Client("test-key", endpoints=pool) as client:
+        assert client.get_project("project").project_id == "project"
+        assert pool.choose().url == _localhost(first)
+
+        first.status_code = 503
+        assert client.get_project("project").project_id == "project"
+        assert pool.choose().url == _localhost(second)
+
+        second.close()
+        first.status_code = None
+        # A refused connection fails over whatever the method
+        workflow = client.create_workflow("project", "Created", "", [])
+        assert workflow.name == "Created"
+        assert pool.choose().url == _localhost(first)
+
+
+def test_invalid_endpoint_url_is_rejected():
+    with pytest.raises(ValueError):
+        EndpointPool(["localhost:8080"])
@@ -0,0 +1,55 @@
+import httpx
+
+from aihero.client import Client
+from aihero.launch_queue import LaunchQueue
+from aihero.testing import StandInServer
+
+
+def _workflow(server: StandInServer) -> str:
+    steps = [{"type": "instruction", "instruction": "Sum up"}]
+    return server.add_workflow("project", steps=steps)["workflow_id"]
+
+
+def _launches(server: StandInServer) -> list:
+    return [path for method, path in server.requests if path.endswith("/launch")]
+
+
+def test_refused_launch_is_requeued(client, server):
+    workflow_id = _workflow(server)
+    server.fail_next("POST", "/launch", 429)
+
+    with LaunchQueue(client, backoff=0.01, poll_interval=0) as queue:
+        workflow = queue.submit("project", workflow_id).result(timeout=10)
+
+    assert workflow.status == "success"
+    assert len(_launches(server)) == 2
+    assert queue.metrics().throttled == 1
+
+
+def test_throttled_poll_does_not_launch_again(server):
+    workflow_id = _workflow(server)
+    throttled = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        if request.method == "GET" and _launches(server) and not throttled:
+            throttled.append(request)
+            return httpx.Response(429, json={"detail": "Too many requests"})
+        return server.handle(request)
+
+    with Client("test-key", transport=httpx.MockTransport(handle)) as client:
+        with LaunchQueue(client, backoff=0.01, poll_interval=0) as queue:
+            workflow = queue.submit("project", workflow_id).result(timeout=10)
+
+    assert workflow.status == "success"
+    assert len(throttled) == 1
+    assert len(_launches(server)) == 1
+    assert queue.metrics().throttled == 1
+
+
+def test_wait_p95_is_not_below_p50(client):
+    with LaunchQueue(client) as queue:
+        queue._waits.extend([0.062, 0.000027])
+        metrics = queue.metrics()
+
+    assert metrics.wait_p95 == 0.062
+    assert metrics.wait_p50 <= metrics.wait_p95 <= metrics.wait_max
@@ -0,0 +1,67 @@
+import pickle
+
+import pytest
+
+from aihero.client import Client
+from aihero.endpoints import EndpointPool
+from aihero.transport import RecordingTransport, ReplayTransport
+
+
+@pytest.fixture
+def trace(tmp_path, server):
+    path = tmp_path / "trace.jsonl.gz"
+    recording = RecordingTransport(path, transport=server.transport())
+    with Client("test-key", transport=recording) as client:
+        client.get_project("project")
+    return path
+
+
+def test_client_with_replay_transport_round_trips(trace):
+    with Client("test-key", transport=ReplayTransport(trace)) as client:
+        copy = pickle.loads(pickle.dumps(client))
+
+    with copy:
+        assert copy._api_key == "test-key"
+        assert copy.get_project("project").project_id == "project"
+
+
+def test_client_with_recording_transport_round_trips(tmp_path):
+    client = Client("test-key", transport=RecordingTransport(tmp_path / "t.jsonl"))
+
+    copy = pickle.loads(pickle.dumps(client))
+
+    assert isinstance(copy._pool.custom_transport, RecordingTransport)
+    assert copy._pool.custom_transport._path == tmp_path / "t.jsonl"
+
+
+def test_client_with_endpoints_round_trips():
+    pool = EndpointPool(["http://localhost:1/", "http://localhost:2/"])
+    copy = pickle.loads(pickle.dumps(Client("test-key", endpoints=pool)))
+
+    assert copy._pool.endpoints.urls == pool.urls
+
+
+def test_unpicklable_transport_is_a_clear_error(client):
+    with pytest.raises(TypeError, match="Cannot pickle a Client using a MockTransport"):
+        pickle.dumps(client)
+
+
+def test_custom_transport_rebuilt_after_fork(tmp_path):
+    recording = RecordingTransport(tmp_path / "t.jsonl")
+    client = Client("test-key", transport=recording)
+
+    client._pool.reset_after_fork()
+
+    rebuilt = client._pool.custom_transport
+    assert isinstance(rebuilt, RecordingTransport) and rebuilt is not recording
+    assert client._pool.transport is rebuilt
+    assert rebuilt._path == tmp_path / "t.jsonl"
+
+
+def test_transport_not_rebuilt_after_fork_warns(client):
+    transport = client._pool.custom_transport
+
+    with pytest.warns(RuntimeWarning, match="Cannot rebuild the MockTransport"):
+        client._pool.reset_after_fork()
+
+    assert client._pool.transport is transport
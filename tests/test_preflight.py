@@ -0,0 +1,48 @@
+from pathlib import Path
+
+from aihero import validation
+from aihero.schema import Files, JObject, TypeEnum
+
+
+def _files_step(name: str) -> Files:
+    return Files(type=TypeEnum.FILES, files=[name])
+
+
+def test_no_manifest_check_without_uploads(client):
+    preflight = client.preflight("project")
+
+    assert preflight.check([_files_step("uploaded-earlier.pdf")]) == []
+
+
+def test_files_checked_against_uploads(client, tmp_path: Path):
+    path = tmp_path / "a.pdf"
+    path.write_bytes(b"%PDF")
+    client.upload_file("project", path)
+    preflight = client.preflight("project")
+
+    assert preflight.check([_files_step("a.pdf")]) == []
+    issues = preflight.check([_files_step("b.pdf")])
+    assert [issue.message for issue in issues] == ["File b.pdf was not uploaded"]
+
+
+def test_files_checked_against_explicit_names(client):
+    preflight = client.preflight("project", uploaded=["a.pdf"])
+
+    assert preflight.check([_files_step("a.pdf")]) == []
+    assert len(preflight.check([_files_step("b.pdf")])) == 1
+
+
+def test_schema_needing_jsonschema_skipped_without_it(client, server, monkeypatch):
+    monkeypatch.setattr(validation, "_jsonschema", lambda: None)
+    schema = {"type": "object", "propertyNames": {"pattern": "^skipped_"}}
+    step = JObject(type=TypeEnum.OBJECT, json_schema=schema)
+    preflight = client.preflight("project")
+
+    assert preflight.check([step]) == []
+    workflow = client.create_workflow(
+        "project", "names", "", [step], preflight=preflight
+    )
+    assert workflow.workflow_id in server.workflows["project"]
+    invalid = JObject(type=TypeEnum.OBJECT, json_schema={"type": "nope"})
+    issues = preflight.check([invalid])
+    assert [issue.message[:19] for issue in issues] == ["Invalid JSON schema"]
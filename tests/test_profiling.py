@@ -0,0 +1,43 @@
+import pytest
+
+from aihero import profiling
+
+
+@pytest.fixture(autouse=True)
+def no_profiler(monkeypatch):
+    monkeypatch.setattr(profiling, "_profiler", None)
+    yield
+    if profiling._profiler is not None:
+        profiling._profiler.stop()
+
+
+@pytest.mark.parametrize("setting", ["true", "yes", "ON", "1"])
+def test_switch_starts_the_default_profiler(monkeypatch, setting):
+    monkeypatch.setenv("AI_HERO_PROFILE", setting)
+
+    profiler = profiling.start_from_env()
+
+    assert profiler is not None and profiler.interval == 0.01
+
+
+def test_interval_is_in_milliseconds(monkeypatch):
+    monkeypatch.setenv("AI_HERO_PROFILE", "1")
+    monkeypatch.setenv("AI_HERO_PROFILE_INTERVAL_MS", "5")
+
+    assert profiling.start_from_env().interval == 0.005
+
+
+@pytest.mark.parametrize("setting", ["fast", "20"])
+def test_invalid_switch_warns_without_profiling(monkeypatch, setting):
+    monkeypatch.setenv("AI_HERO_PROFILE", setting)
+
+    with pytest.warns(RuntimeWarning, match="AI_HERO_PROFILE"):
+        assert profiling.start_from_env() is None
+
+
+def test_invalid_interval_warns_and_uses_the_default(monkeypatch):
+    monkeypatch.setenv("AI_HERO_PROFILE", "1")
+    monkeypatch.setenv("AI_HERO_PROFILE_INTERVAL_MS", "soon")
+
+    with pytest.warns(RuntimeWarning, match="AI_HERO_PROFILE_INTERVAL_MS"):
+        assert profiling.start_from_env().interval == 0.01
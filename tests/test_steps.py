@@ -0,0 +1,69 @@
+import pickle
+
+from aihero.schema import Markdown, Step, Workflow
+
+
+def _workflow(workflow_id: str) -> Workflow:
+    return Workflow.from_dict(
+        {
+            "workflow_id": workflow_id,
+            "project_id": "project",
+            "name": "Workflow",
+            "description": "",
+            "steps": [
+                {"type": "markdown", "markdown": "# A", "step_id": "a"},
+                {"type": "markdown", "markdown": "# B", "step_id": "b"},
+            ],
+        }
+    )
+
+
+def test_index_follows_step_and_list_changes():
+    workflow = _workflow("w")
+    assert workflow.get_step("a").step_id == "a"
+
+    workflow.steps[0].step_id = "renamed"
+    assert workflow.get_step("a") is None
+    assert workflow.get_step("renamed") is workflow.steps[0]
+
+    workflow.steps.append(Markdown(markdown="# C", step_id="c"))
+    assert workflow.get_step("c") is workflow.steps[2]
+
+    workflow.steps = [Markdown(markdown="# D", step_id="d")]
+    assert workflow.get_step("c") is None
+    workflow.steps[0] = Markdown(markdown="# E", step_id="e")
+    assert workflow.get_step("e") is workflow.steps[0]
+
+
+def test_step_change_only_invalidates_its_workflow():
+    first, second = _workflow("first"), _workflow("second")
+    first.get_step("a")
+    second.get_step("a")
+    index = second._index
+
+    first.steps[0].step_id = "renamed"
+
+    assert first.get_step("renamed") is first.steps[0]
+    second.get_step("a")
+    assert second._index is index
+
+
+def test_unpickled_workflow_tracks_its_steps():
+    workflow = pickle.loads(pickle.dumps(_workflow("w")))
+
+    workflow.steps[1].step_id = "renamed"
+
+    assert workflow.get_step("renamed") is workflow.steps[1]
+
+
+def test_bookkeeping_does_not_change_equality(client, server):
+    raw = {"type": "markdown", "markdown": "# A", "step_id": "a"}
+    workflow_id = server.add_workflow("project", steps=[raw])["workflow_id"]
+
+    workflow = client.get_workflow("project", workflow_id)
+    workflow.get_step("a")
+
+    assert workflow.steps[0] == Step.from_dict(raw)
+    assert workflow.steps[0] != Step.from_dict({**raw, "markdown": "# B"})
+    data = server.workflows["project"][workflow_id]
+    assert workflow == Workflow(**{**data, "steps": [Step.from_dict(raw)]})
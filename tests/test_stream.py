@@ -0,0 +1,57 @@
+from aihero.schema import Workflow
+from aihero.stream import EventKind, StepDiffer
+
+
+def _events(client, server, steps):
+    workflow = server.add_workflow("project", steps=steps)
+    events = client.stream_workflow("project", workflow["workflow_id"], poll_interval=0)
+    return [(event.kind, event.step and event.step.step_id) for event in events]
+
+
+def test_steps_without_computed_at_complete_when_the_run_is_over(client, server):
+    events = _events(
+        client,
+        server,
+        [
+            {"type": "markdown", "step_id": "intro", "markdown": "# Report"},
+            {"type": "note", "step_id": "note", "markdown": "Static"},
+            {"type": "files", "step_id": "files", "files": ["a.pdf"]},
+            {"type": "instruction", "step_id": "answer", "instruction": "Sum up"},
+        ],
+    )
+
+    assert [kind for kind, step_id in events if step_id == "files"] == [
+        EventKind.STARTED,
+        EventKind.COMPLETED,
+    ]
+    assert (EventKind.COMPLETED, "answer") in events
+    # Static steps are not processed by the run
+    assert not [step_id for _, step_id in events if step_id in ("intro", "note")]
+    assert events[-1] == (EventKind.FINISHED, None)
+
+
+def _snapshot(mode: str, status: str) -> Workflow:
+    return Workflow.from_dict(
+        {
+            "workflow_id": "w",
+            "project_id": "project",
+            "name": "Workflow",
+            "description": "",
+            "status": status,
+            "steps": [
+                {"type": "webpages", "step_id": "pages", "urls": [], "mode": mode}
+            ],
+        }
+    )
+
+
+def test_step_without_computed_at_completes_when_it_stops_processing():
+    differ = StepDiffer(_snapshot("output", "success"))
+
+    assert [e.kind for e in differ.update(_snapshot("processing", "running"))] == [
+        EventKind.STARTED
+    ]
+    assert [e.kind for e in differ.update(_snapshot("output", "running"))] == [
+        EventKind.COMPLETED
+    ]
+    assert differ.update(_snapshot("output", "success")) == []
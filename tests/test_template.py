@@ -0,0 +1,44 @@
+import pytest
+
+from aihero.schema import Files, Markdown, TypeEnum, Webpages
+from aihero.template import WorkflowTemplate
+
+
+def _template() -> WorkflowTemplate:
+    return WorkflowTemplate(
+        "Filing of {{companyName}}",
+        "",
+        [
+            Markdown(type=TypeEnum.MARKDOWN, markdown="# report for {{companyName}}"),
+            Files(type=TypeEnum.FILES, files=["{{filing}}"]),
+            Webpages(type=TypeEnum.WEBPAGES, urls=["https://example.com/{{ticker}}"]),
+        ],
+    )
+
+
+PARAMS = {"companyName": "ACME Corp", "filing": "reports/q1.pdf", "ticker": "ACME"}
+
+
+def test_placeholders_survive_normalization():
+    assert _template().parameters == {"companyName", "filing", "ticker"}
+
+
+def test_substituted_values_are_validated_and_normalized(client, server):
+    [workflow] = client.create_workflows("project", _template(), [PARAMS])
+
+    markdown, files, webpages = workflow.steps
+    assert markdown.markdown == "# Report for ACME Corp"
+    assert files.files == ["q1.pdf"]
+    assert webpages.urls == ["https://example.com/ACME"]
+    # The posted workflow is what the server stores, so it is found again
+    again = client.create_workflows("project", _template(), [PARAMS])
+    assert again[0].workflow_id == workflow.workflow_id
+    assert [m for m, _ in server.requests].count("POST") == 1
+
+
+def test_invalid_parameter_is_rejected_before_posting(client, server):
+    with pytest.raises(ValueError, match="filing"):
+        client.create_workflows(
+            "project", _template(), [{**PARAMS, "filing": "../../b.pdf"}]
+        )
+    assert [m for m, _ in server.requests if m == "POST"] == []
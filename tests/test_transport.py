@@ -0,0 +1,49 @@
+import gzip
+import json
+import zlib
+
+import httpx
+
+from aihero.client import Client
+from aihero.transport import RecordingTransport, ReplayTransport, _body_digest
+
+
+def test_recording_writes_one_gzip_stream(tmp_path, server):
+    path = tmp_path / "trace.jsonl.gz"
+    with Client(
+        "test-key", transport=RecordingTransport(path, server.transport())
+    ) as c:
+        for _ in range(3):
+            c.get_project("project")
+
+    data = path.read_bytes()
+    stream = zlib.decompressobj(wbits=31)
+    stream.decompress(data)
+    assert stream.eof and stream.unused_data == b""
+    assert len(gzip.decompress(data).decode().splitlines()) == 3
+
+
+def _entry(content: bytes, text: str) -> dict:
+    return {
+        "method": "POST",
+        "path": "/run",
+        "body": _body_digest(content),
+        "status": 200,
+        "headers": [],
+        "elapsed": 0.0,
+        "text": text,
+    }
+
+
+def test_exchange_served_by_loose_match_is_not_replayed(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    entries = [_entry(b"a", "first"), _entry(b"a", "second"), _entry(b"b", "third")]
+    path.write_text("".join(json.dumps(entry) + "\n" for entry in entries))
+
+    with httpx.Client(transport=ReplayTransport(path)) as http:
+        answers = [
+            http.post("http://test/run", content=content).text
+            for content in (b"unrecorded", b"a", b"b")
+        ]
+
+    assert answers == ["first", "second", "third"]
@@ -0,0 +1,44 @@
+import pytest
+
+from aihero import validation
+from aihero.exceptions import SchemaError
+from aihero.schema import JObject, TypeEnum
+from aihero.validation import compile_schema
+
+
+@pytest.mark.parametrize(
+    "value, multiple, valid",
+    [(0.3, 0.1, True), (19.99, 0.01, True), (0.35, 0.1, False), (10, 3, False)],
+)
+def test_multiple_of_is_exact(value, multiple, valid):
+    assert compile_schema({"multipleOf": multiple}).is_valid(value) is valid
+
+
+def test_delegated_keywords_are_checked_with_jsonschema():
+    pytest.importorskip("jsonschema")
+    schema = {"type": "array", "contains": {"const": "x"}}
+
+    compiled = compile_schema(schema)
+
+    assert compiled.is_valid(["a", "x"])
+    [violation] = compiled.errors(["a"])
+    assert violation.path == ""
+
+
+def test_delegated_keywords_raise_without_jsonschema(monkeypatch):
+    monkeypatch.setattr(validation, "_jsonschema", lambda: None)
+    with pytest.raises(SchemaError, match="propertyNames"):
+        validation.CompiledSchema({"propertyNames": {"maxLength": 3}})
+
+
+def test_validate_result_does_not_shadow_pydantic():
+    step = JObject(
+        type=TypeEnum.OBJECT,
+        json_schema={"type": "object", "required": ["a"]},
+        json_object={"b": 1},
+    )
+
+    assert [v.message for v in step.validate_result()] == [
+        "missing required property 'a'"
+    ]
+    assert "validate" not in JObject.__dict__